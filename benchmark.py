@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки пути записи ответов.
+
+    python benchmark.py indexes   # запись в users: старая схема индексов против новой (PostgreSQL)
+    python benchmark.py answers --url sqlite+aiosqlite:///bench.db --url postgresql+asyncpg://...
+                                  # полный путь ответов TaskManager на разных бэкендах
+    python benchmark.py epi-pages --page-size 5
+                                  # запросы к Telegram и записи состояния на прохождение EPI:
+                                  # по вопросу на экран и страницами (без БД)
+    python benchmark.py versioning --workers 4
+                                  # состояние в памяти одного воркера против записи с проверкой
+                                  # state_version на нескольких воркерах (по умолчанию временная SQLite)
+
+Бенчмарк индексов работает с отдельной таблицей bench_users, бенчмарк ответов - с пользователями
+с user_id от BENCH_USER_ID_BASE, которые удаляются после прогона.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config.settings import DATABASE_URL
+
+BENCH_TABLE = """
+CREATE TABLE bench_users (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT UNIQUE NOT NULL,
+    username VARCHAR(255),
+    answers_json JSONB,
+    inq_scores_json JSONB,
+    epi_scores_json JSONB,
+    priorities_json JSONB,
+    current_task_type INTEGER DEFAULT 1,
+    current_question INTEGER DEFAULT 0,
+    current_step INTEGER DEFAULT 0,
+    test_completed BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+INDEX_SETS = {
+    "legacy": [
+        "CREATE INDEX ON bench_users(user_id)",
+        "CREATE INDEX ON bench_users(username)",
+        "CREATE INDEX ON bench_users(test_completed)",
+        "CREATE INDEX ON bench_users(created_at)",
+        "CREATE INDEX ON bench_users(current_task_type)",
+        "CREATE INDEX ON bench_users USING GIN (answers_json)",
+        "CREATE INDEX ON bench_users USING GIN (inq_scores_json)",
+        "CREATE INDEX ON bench_users USING GIN (epi_scores_json)",
+        "CREATE INDEX ON bench_users USING GIN (priorities_json)",
+    ],
+    "optimized": [
+        "CREATE INDEX ON bench_users(username)",
+        "CREATE INDEX ON bench_users(created_at)",
+        "CREATE INDEX ON bench_users(updated_at) WHERE test_completed = false",
+        "CREATE INDEX ON bench_users(current_task_type, updated_at) WHERE test_completed = false",
+        "CREATE INDEX ON bench_users USING GIN (inq_scores_json)",
+        "CREATE INDEX ON bench_users USING GIN (epi_scores_json)",
+        "CREATE INDEX ON bench_users USING GIN (priorities_json)",
+    ],
+}
+
+ANSWER_UPDATE = text(
+    "UPDATE bench_users SET answers_json = CAST(:answers AS JSONB), current_question = :question, "
+    "current_step = :step, updated_at = now() WHERE user_id = :user_id"
+)
+
+
+def random_inq_answers(questions: int) -> dict:
+    answers = {}
+    for question_num in range(1, questions + 1):
+        options = ["1", "2", "3", "4", "5"]
+        random.shuffle(options)
+        answers[f"question_{question_num}"] = {option: 5 - i for i, option in enumerate(options)}
+    return {"inq": answers}
+
+
+async def prepare_table(engine, index_set: str, rows: int):
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS bench_users"))
+        await conn.execute(text(BENCH_TABLE))
+        for statement in INDEX_SETS[index_set]:
+            await conn.execute(text(statement))
+
+        await conn.execute(
+            text(
+                "INSERT INTO bench_users (user_id, username, answers_json, test_completed) "
+                "SELECT g, 'user_' || g, CAST(:answers AS JSONB), g % 3 = 0 FROM generate_series(1, :rows) g"
+            ),
+            {"answers": json.dumps(random_inq_answers(18)), "rows": rows},
+        )
+        await conn.execute(text("ANALYZE bench_users"))
+
+
+async def run_updates(engine, users: int, updates: int, concurrency: int) -> float:
+    queue = asyncio.Queue()
+    for i in range(updates):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            user_id = random.randint(1, users)
+            question = i % 18
+            async with engine.begin() as conn:
+                await conn.execute(
+                    ANSWER_UPDATE,
+                    {
+                        "answers": json.dumps(random_inq_answers(question + 1)),
+                        "question": question,
+                        "step": i % 5,
+                        "user_id": user_id,
+                    },
+                )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def table_stats(engine) -> dict:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT n_tup_upd, n_tup_hot_upd, pg_indexes_size('bench_users') "
+                "FROM pg_stat_user_tables WHERE relname = 'bench_users'"
+            )
+        )
+        updated, hot_updated, index_size = result.one()
+    return {"updated": updated, "hot_updated": hot_updated, "index_size": index_size}
+
+
+async def bench_indexes(args):
+    if not DATABASE_URL.startswith("postgresql"):
+        print("❌ Бенчмарк индексов требует PostgreSQL (DATABASE_URL)")
+        return
+
+    engine = create_async_engine(DATABASE_URL, pool_size=args.concurrency)
+    results = {}
+    try:
+        for index_set in ("legacy", "optimized"):
+            await prepare_table(engine, index_set, args.rows)
+            await run_updates(engine, args.rows, args.updates // 10, args.concurrency)  # прогрев
+            elapsed = await run_updates(engine, args.rows, args.updates, args.concurrency)
+            stats = await table_stats(engine)
+            results[index_set] = (args.updates / elapsed, stats)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE IF EXISTS bench_users"))
+        await engine.dispose()
+
+    print(f"\n📊 Запись ответов: {args.updates} UPDATE, {args.rows} строк, {args.concurrency} соединений\n")
+    for index_set, (throughput, stats) in results.items():
+        print(
+            f"{index_set:>10}: {throughput:8.0f} записей/с, "
+            f"индексы {stats['index_size'] / 1024 / 1024:.1f} МБ, "
+            f"HOT обновлений {stats['hot_updated']}/{stats['updated']}"
+        )
+    speedup = results["optimized"][0] / results["legacy"][0]
+    print(f"\n🚀 Ускорение записи: x{speedup:.2f}")
+
+
+BENCH_USER_ID_BASE = 9_000_000_000
+
+
+async def simulate_session(task_manager, user, latencies: list):
+    from config.const import TaskEntity, AnswerOptions, PRIORITY_CATEGORIES
+
+    async def timed(coro):
+        started = time.perf_counter()
+        result = await coro
+        latencies.append(time.perf_counter() - started)
+        return result
+
+    await timed(task_manager.start_tasks(user))
+
+    for category, score in zip(PRIORITY_CATEGORIES, random.sample([4, 3, 2, 1], 4)):
+        await timed(task_manager.process_priorities_answer(user, category, score))
+    await timed(task_manager.move_to_next_task(user.user_id))
+
+    total_inq = TaskEntity.inq.value.get_total_questions()
+    for question_num in range(total_inq):
+        for option in random.sample(AnswerOptions.inq.value, 5):
+            await timed(task_manager.process_inq_answer(user, option))
+        if question_num + 1 < total_inq:
+            await timed(task_manager.move_to_next_question(user.user_id))
+    await timed(task_manager.move_to_next_task(user.user_id))
+
+    for _ in range(TaskEntity.epi.value.get_total_questions()):
+        await timed(task_manager.process_epi_answer(user, random.choice(AnswerOptions.epi.value)))
+
+    await timed(task_manager.complete_all_tasks(user))
+
+
+async def bench_answers_run(args):
+    """
+    Один прогон на текущем DATABASE_URL; результат печатается последней строкой в JSON
+    """
+    import logging
+
+    logging.disable(logging.CRITICAL)
+
+    from sqlalchemy import delete
+
+    from config.const import MESSAGES, TaskEntity
+    from config.settings import DATABASE_URL as url
+    from src.core.task_manager import TaskManager
+    from src.database import operations
+    from src.database.models import AsyncSessionLocal, User, engine
+    from src.database.operations import init_db, get_or_create_user
+
+    engine.echo = False
+    with open("config/constants.json", "r", encoding="utf-8") as f:
+        MESSAGES.update(json.load(f))
+    for entity in TaskEntity:
+        await entity.value.load_questions()
+
+    await init_db()
+    task_manager = TaskManager()
+    users = [await get_or_create_user(BENCH_USER_ID_BASE + i, f"bench_{i}") for i in range(args.users)]
+
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_user(user):
+        async with semaphore:
+            await simulate_session(task_manager, user, latencies)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_user(user) for user in users))
+    elapsed = time.perf_counter() - started
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(User).where(User.user_id >= BENCH_USER_ID_BASE))
+        await session.commit()
+    if operations.write_queue is not None:
+        await operations.write_queue.stop()
+    await engine.dispose()
+
+    latencies.sort()
+    print(
+        json.dumps(
+            {
+                "backend": url.split(":", 1)[0],
+                "writes": len(latencies),
+                "elapsed": elapsed,
+                "throughput": len(latencies) / elapsed,
+                "p50_ms": statistics.median(latencies) * 1000,
+                "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+            }
+        )
+    )
+
+
+async def bench_answers(args):
+    results = []
+    for url in args.url:
+        command = [
+            sys.executable,
+            __file__,
+            "answers-run",
+            "--users",
+            str(args.users),
+            "--concurrency",
+            str(args.concurrency),
+        ]
+        completed = subprocess.run(
+            command, env={**os.environ, "DATABASE_URL": url}, capture_output=True, text=True, check=False
+        )
+        if completed.returncode != 0:
+            print(f"❌ {url}: {completed.stderr.strip().splitlines()[-1] if completed.stderr else 'ошибка'}")
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print(f"\n📊 Путь ответов: {args.users} пользователей, {args.concurrency} одновременно\n")
+    for result in results:
+        print(
+            f"{result['backend']:>20}: {result['throughput']:8.0f} записей/с, "
+            f"p50 {result['p50_ms']:.2f} мс, p99 {result['p99_ms']:.2f} мс ({result['writes']} операций)"
+        )
+
+
+class CountingMessage:
+    """
+    Сообщение бота, которое только считает запросы редактирования к Telegram
+    """
+
+    def __init__(self, message_id: int):
+        from types import SimpleNamespace
+
+        self.chat = SimpleNamespace(id=BENCH_USER_ID_BASE)
+        self.message_id = message_id
+        self.text = None
+        self.calls = {"editMessageText": 0, "editMessageReplyMarkup": 0}
+
+    async def edit_text(self, text, reply_markup=None):
+        self.calls["editMessageText"] += 1
+
+    async def edit_reply_markup(self, reply_markup=None):
+        self.calls["editMessageReplyMarkup"] += 1
+
+
+class CountingLog:
+    """
+    Вместо лога ответов: каждая запись состояния TaskManager - одна запись в БД
+    """
+
+    def __init__(self):
+        self.writes = 0
+        self.events = 0
+
+    async def append_many(self, events):
+        self.writes += 1
+        self.events += len(events)
+
+
+async def run_epi_mode(page_size: int, answers: list) -> dict:
+    from types import SimpleNamespace
+
+    from config.const import TaskType
+    from src.bot.message_editor import message_editor
+    from src.bot.sender import send_epi_page, send_epi_question
+    from src.core.metrics import metrics
+    from src.core.task_manager import TaskManager
+
+    log = CountingLog()
+    task_manager = TaskManager(answer_log=log, epi_page_size=page_size)
+    user = SimpleNamespace(user_id=BENCH_USER_ID_BASE, abandoned_at=None)
+    task_manager.active_tasks[user.user_id] = {
+        "current_task_type": TaskType.epi.value,
+        "current_question": 0,
+        "current_step": 0,
+        "answers": {},
+        "history": [],
+    }
+    message = CountingMessage(page_size)
+    message_editor.forget(message)
+    metrics.reset()
+    callbacks = 0
+
+    # Кнопка "Тест 3" одинакова в обоих режимах и в подсчет не входит; экран результата - тоже
+    if page_size > 1:
+        await send_epi_page(message, task_manager, user.user_id, 0)
+        page = task_manager.epi_page(0)
+        while page:
+            for question_num in page:
+                callbacks += 1
+                await task_manager.select_epi_page_answer(user, page.start, question_num, answers[question_num])
+                await send_epi_page(message, task_manager, user.user_id, page.start)
+            callbacks += 1
+            await task_manager.submit_epi_page(user, page.start)
+            page = task_manager.epi_page(page.stop)
+            if page:
+                await send_epi_page(message, task_manager, user.user_id, page.start)
+    else:
+        await send_epi_question(message, user.user_id, 0)
+        for question_num, answer in enumerate(answers):
+            callbacks += 1
+            await task_manager.process_epi_answer(user, answer)
+            if question_num + 1 < len(answers):
+                await send_epi_question(message, user.user_id, question_num + 1)
+
+    return {
+        "page_size": page_size,
+        "callbacks": callbacks,
+        "telegram_calls": callbacks + sum(message.calls.values()),
+        **message.calls,
+        "telegram_bytes": metrics.get("telegram_bytes_sent"),
+        "state_writes": log.writes,
+        "answers": task_manager.get_task_state(user.user_id)["answers"],
+    }
+
+
+async def bench_epi_pages(args):
+    from config.const import MESSAGES, AnswerOptions, TaskEntity
+
+    with open("config/constants.json", "r", encoding="utf-8") as json_file:
+        MESSAGES.update(json.load(json_file))
+    await TaskEntity.epi.value.load_questions()
+    answers = [random.choice(AnswerOptions.epi.value) for _ in range(TaskEntity.epi.value.get_total_questions())]
+
+    results = [await run_epi_mode(1, answers), await run_epi_mode(args.page_size, answers)]
+    scores = {
+        json.dumps(TaskEntity.epi.value.calculate_scores(result["answers"]), sort_keys=True) for result in results
+    }
+
+    print(f"\n📊 EPI: {len(answers)} вопросов на пользователя\n")
+    for result in results:
+        mode = "по вопросу" if result["page_size"] == 1 else f"по {result['page_size']} на экран"
+        print(
+            f"{mode:>16}: {result['callbacks']} нажатий, {result['telegram_calls']} запросов к Telegram "
+            f"(answerCallbackQuery {result['callbacks']}, editMessageText {result['editMessageText']}, "
+            f"editMessageReplyMarkup {result['editMessageReplyMarkup']}; {result['telegram_bytes']} байт), "
+            f"{result['state_writes']} записей состояния"
+        )
+    print(f"\nБаллы EPI в обоих режимах {'совпадают' if len(scores) == 1 else 'РАЗЛИЧАЮТСЯ'}")
+
+
+async def simulate_stateless_session(task_managers: list, user_id: int, latencies: list, duplicate: float):
+    """
+    Сессия, ответы которой обрабатывают случайные воркеры; строка пользователя читается
+    на каждое обновление, как в хендлерах. С вероятностью duplicate ответ приходит дважды
+    одновременно на два воркера (двойное нажатие); при одном воркере повтор не моделируется
+    """
+    from config.const import TaskEntity, AnswerOptions, PRIORITY_CATEGORIES
+    from src.database.operations import get_or_create_user
+
+    last_worker = [task_managers[0]]
+
+    async def step(method: str, *args, by_id: bool = False, may_repeat: bool = False):
+        started = time.perf_counter()
+        count = 2 if may_repeat and random.random() < duplicate else 1
+
+        # Переход к следующему вопросу делает тот же хендлер, что принял последний ответ
+        if by_id:
+            await getattr(last_worker[0], method)(user_id, *args)
+        else:
+            # Повторы обрабатываются разными воркерами, прочитавшими строку одновременно
+            workers = random.sample(task_managers, min(count, len(task_managers)))
+            last_worker[0] = workers[0]
+            user = await get_or_create_user(user_id)
+            await asyncio.gather(*(getattr(worker, method)(user, *args) for worker in workers))
+        latencies.append(time.perf_counter() - started)
+
+    await step("start_tasks")
+    for category, score in zip(PRIORITY_CATEGORIES, random.sample([4, 3, 2, 1], 4)):
+        await step("process_priorities_answer", category, score, may_repeat=True)
+    await step("move_to_next_task", by_id=True)
+
+    total_inq = TaskEntity.inq.value.get_total_questions()
+    for question_num in range(total_inq):
+        for option in random.sample(AnswerOptions.inq.value, 5):
+            await step("process_inq_answer", option, may_repeat=True)
+        if question_num + 1 < total_inq:
+            await step("move_to_next_question", by_id=True)
+    await step("move_to_next_task", by_id=True)
+
+    for _ in range(TaskEntity.epi.value.get_total_questions()):
+        await step("process_epi_answer", random.choice(AnswerOptions.epi.value))
+    await step("complete_all_tasks")
+
+
+async def bench_versioning_run(args):
+    """
+    Оба режима состояния на текущем DATABASE_URL; результаты печатаются строками JSON
+    """
+    import logging
+
+    logging.disable(logging.CRITICAL)
+
+    from sqlalchemy import delete, select
+
+    from config.const import MESSAGES, TaskEntity
+    from src.core.metrics import metrics
+    from src.core.task_manager import TaskManager
+    from src.database import operations
+    from src.database.models import AsyncSessionLocal, User, engine
+    from src.database.operations import init_db
+
+    with open("config/constants.json", "r", encoding="utf-8") as f:
+        MESSAGES.update(json.load(f))
+    for entity in TaskEntity:
+        await entity.value.load_questions()
+    await init_db()
+
+    modes = [("memory", 1), ("versioned", args.workers)]
+    for state_mode, workers in modes:
+        task_managers = [TaskManager(state_mode=state_mode) for _ in range(workers)]
+        user_ids = [BENCH_USER_ID_BASE + i for i in range(args.users)]
+        latencies = []
+        semaphore = asyncio.Semaphore(args.concurrency)
+        metrics.reset()
+
+        async def run_user(user_id):
+            async with semaphore:
+                await simulate_stateless_session(task_managers, user_id, latencies, args.duplicate)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_user(user_id) for user_id in user_ids))
+        elapsed = time.perf_counter() - started
+
+        async with AsyncSessionLocal() as session:
+            bench_users = User.user_id >= BENCH_USER_ID_BASE
+            completed = (await session.execute(select(User.user_id).where(bench_users, User.test_completed))).all()
+            await session.execute(delete(User).where(bench_users))
+            await session.commit()
+
+        latencies.sort()
+        print(
+            json.dumps(
+                {
+                    "mode": state_mode,
+                    "workers": workers,
+                    "updates": len(latencies),
+                    "throughput": len(latencies) / elapsed,
+                    "p50_ms": statistics.median(latencies) * 1000,
+                    "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+                    "state_writes": metrics.get("state_writes"),
+                    "conflicts": metrics.get("state_conflicts"),
+                    "retries": metrics.get("state_conflict_retries"),
+                    "failures": metrics.get("state_conflict_failures"),
+                    "stale_reads": metrics.get("state_cache_stale"),
+                    "completed": len(completed),
+                }
+            )
+        )
+
+    if operations.write_queue is not None:
+        await operations.write_queue.stop()
+    await engine.dispose()
+
+
+async def bench_versioning(args):
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = args.url or f"sqlite+aiosqlite:///{Path(tmp_dir) / 'bench.db'}"
+        command = [
+            sys.executable,
+            __file__,
+            "versioning-run",
+            "--users",
+            str(args.users),
+            "--concurrency",
+            str(args.concurrency),
+            "--workers",
+            str(args.workers),
+            "--duplicate",
+            str(args.duplicate),
+        ]
+        completed = subprocess.run(
+            command, env={**os.environ, "DATABASE_URL": url}, capture_output=True, text=True, check=False
+        )
+    if completed.returncode != 0:
+        print(f"❌ {url}: {completed.stderr.strip().splitlines()[-1] if completed.stderr else 'ошибка'}")
+        return
+    results = [json.loads(line) for line in completed.stdout.strip().splitlines() if line.startswith("{")]
+
+    print(
+        f"\n📊 Состояние теста: {url.split(':', 1)[0]}, {args.users} пользователей, {args.concurrency} одновременно, "
+        f"двойных нажатий {args.duplicate:.0%}\n"
+    )
+    for result in results:
+        conflict_rate = result["conflicts"] / result["state_writes"] if result["state_writes"] else 0
+        print(
+            f"{result['mode']:>10} x{result['workers']}: {result['throughput']:8.0f} обновлений/с, "
+            f"p50 {result['p50_ms']:.2f} мс, p99 {result['p99_ms']:.2f} мс; записей {result['state_writes']}, "
+            f"конфликтов {result['conflicts']} ({conflict_rate:.2%}), повторов {result['retries']}, "
+            f"неудач {result['failures']}, перечитано устаревших {result['stale_reads']}; "
+            f"завершено {result['completed']}/{args.users}"
+        )
+    if len(results) == 2:
+        ratio = results[1]["throughput"] / results[0]["throughput"]
+        print(f"\nПропускная способность versioned x{results[1]['workers']} / memory x1: {ratio:.2f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарки пути записи ответов")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    indexes = subparsers.add_parser("indexes", help="Старая и новая схема индексов users")
+    indexes.add_argument("--rows", type=int, default=50_000)
+    indexes.add_argument("--updates", type=int, default=20_000)
+    indexes.add_argument("--concurrency", type=int, default=8)
+    indexes.set_defaults(handler=bench_indexes)
+
+    answers = subparsers.add_parser("answers", help="Путь ответов TaskManager на разных бэкендах")
+    answers.add_argument("--url", action="append", required=True, help="DATABASE_URL бэкенда (можно несколько)")
+    answers.add_argument("--users", type=int, default=20)
+    answers.add_argument("--concurrency", type=int, default=20)
+    answers.set_defaults(handler=bench_answers)
+
+    answers_run = subparsers.add_parser("answers-run", help=argparse.SUPPRESS)
+    answers_run.add_argument("--users", type=int, default=20)
+    answers_run.add_argument("--concurrency", type=int, default=20)
+    answers_run.set_defaults(handler=bench_answers_run)
+
+    epi_pages = subparsers.add_parser("epi-pages", help="EPI по вопросу на экран против страниц")
+    epi_pages.add_argument("--page-size", type=int, default=5)
+    epi_pages.set_defaults(handler=bench_epi_pages)
+
+    versioning = subparsers.add_parser("versioning", help="Состояние в памяти против state_version на воркерах")
+    versioning.add_argument("--url", help="DATABASE_URL (по умолчанию временная SQLite)")
+    versioning.add_argument("--users", type=int, default=20)
+    versioning.add_argument("--concurrency", type=int, default=20)
+    versioning.add_argument("--workers", type=int, default=4)
+    versioning.add_argument("--duplicate", type=float, default=0.05, help="доля ответов, пришедших дважды")
+    versioning.set_defaults(handler=bench_versioning)
+
+    versioning_run = subparsers.add_parser("versioning-run", help=argparse.SUPPRESS)
+    versioning_run.add_argument("--users", type=int, default=20)
+    versioning_run.add_argument("--concurrency", type=int, default=20)
+    versioning_run.add_argument("--workers", type=int, default=4)
+    versioning_run.add_argument("--duplicate", type=float, default=0.05)
+    versioning_run.set_defaults(handler=bench_versioning_run)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    asyncio.run(arguments.handler(arguments))
@@ -19,6 +19,10 @@ INQ_LENGTH_SCORES_PER_QUESTION = len(INQ_SCORES_PER_QUESTION)
 
 TOTAL_QUESTIONS = 18
 
+INQ_STYLES = ["Синтетический", "Идеалистический", "Прагматический", "Аналитический", "Реалистический"]
+EPI_SCALES = ["E", "N", "L"]
+PRIORITY_CATEGORIES = ["personal_wellbeing", "material_career", "relationships", "self_realization"]
+
 AGE_MIN = 12
 AGE_MAX = 99
 
@@ -25,6 +25,7 @@ CREATE TABLE IF NOT EXISTS users (
     
     -- JSON данные ответов
     answers_json JSONB,
+    answers_packed BYTEA,
     
     -- Результаты тестов
     inq_scores_json JSONB,
@@ -37,6 +38,9 @@ CREATE TABLE IF NOT EXISTS users (
     current_question INTEGER DEFAULT 0,
     current_step INTEGER DEFAULT 0,
     test_completed BOOLEAN DEFAULT FALSE,
+    abandoned_at TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE,
+    state_version INTEGER NOT NULL DEFAULT 0,
     
     -- Служебные поля
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
@@ -44,18 +48,58 @@ CREATE TABLE IF NOT EXISTS users (
 );
 
 -- Создание индексов для быстрого поиска
-CREATE INDEX IF NOT EXISTS idx_users_user_id ON users(user_id);
+-- Схема индексов ведётся миграциями Alembic (migrations/versions), этот скрипт повторяет её.
+-- answers_json переписывается на каждый ответ, поэтому GIN индекса на нём нет,
+-- а индексы по updated_at частичные - только по незавершённым сессиям.
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
-CREATE INDEX IF NOT EXISTS idx_users_test_completed ON users(test_completed);
 CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at);
-CREATE INDEX IF NOT EXISTS idx_users_current_task_type ON users(current_task_type);
+CREATE INDEX IF NOT EXISTS idx_users_in_progress_updated_at ON users(updated_at) WHERE test_completed = false;
+CREATE INDEX IF NOT EXISTS idx_users_task_type_updated_at ON users(current_task_type, updated_at) WHERE test_completed = false;
+-- Завершенные строки, ответы которых еще не перенесены в user_attempts (src/database/archive.py)
+CREATE INDEX IF NOT EXISTS idx_users_completed_payload ON users(id)
+    WHERE test_completed = true AND (answers_json IS NOT NULL OR answers_packed IS NOT NULL);
 
--- Индексы для JSON полей
-CREATE INDEX IF NOT EXISTS idx_users_answers_json ON users USING GIN (answers_json);
+-- Индексы для JSON полей результатов (пишутся один раз при завершении)
 CREATE INDEX IF NOT EXISTS idx_users_inq_scores_json ON users USING GIN (inq_scores_json);
 CREATE INDEX IF NOT EXISTS idx_users_epi_scores_json ON users USING GIN (epi_scores_json);
 CREATE INDEX IF NOT EXISTS idx_users_priorities_json ON users USING GIN (priorities_json);
 
+-- Архив завершенных попыток: ответы и результаты одним сжатым JSON
+CREATE TABLE IF NOT EXISTS user_attempts (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    test_start TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    temperament VARCHAR(50),
+    payload BYTEA NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_attempts_user_id ON user_attempts(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_attempts_completed_at ON user_attempts(completed_at);
+
+-- Гистограммы баллов выборки для "топ X%": число завершений с баллом value по показателю metric
+CREATE TABLE IF NOT EXISTS score_norms (
+    metric VARCHAR(50) NOT NULL,
+    value INTEGER NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, value)
+);
+
+-- Очередь передачи завершивших тест пользователей в Senler (src/core/handoff.py)
+CREATE TABLE IF NOT EXISTS handoff_queue (
+    id SERIAL PRIMARY KEY,
+    endpoint VARCHAR NOT NULL,
+    user_id BIGINT NOT NULL,
+    payload JSON NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL,
+    next_attempt_at TIMESTAMP NOT NULL,
+    failed_at TIMESTAMP,
+    last_error VARCHAR
+);
+
+CREATE INDEX IF NOT EXISTS idx_handoff_queue_due ON handoff_queue(next_attempt_at) WHERE failed_at IS NULL;
+
 -- Создание функции для автоматического обновления updated_at
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -83,6 +127,7 @@ COMMENT ON COLUMN users.age IS 'Возраст пользователя';
 COMMENT ON COLUMN users.test_start IS 'Время начала тестирования';
 COMMENT ON COLUMN users.test_end IS 'Время завершения тестирования';
 COMMENT ON COLUMN users.answers_json IS 'JSON с ответами на все тесты';
+COMMENT ON COLUMN users.answers_packed IS 'Упакованные ответы (ANSWERS_STORAGE=packed), answers_json тогда NULL';
 COMMENT ON COLUMN users.inq_scores_json IS 'JSON с результатами INQ теста';
 COMMENT ON COLUMN users.epi_scores_json IS 'JSON с результатами EPI теста';
 COMMENT ON COLUMN users.priorities_json IS 'JSON с результатами теста приоритетов';
@@ -91,6 +136,12 @@ COMMENT ON COLUMN users.current_task_type IS 'Текущий тип теста (
 COMMENT ON COLUMN users.current_question IS 'Номер текущего вопроса';
 COMMENT ON COLUMN users.current_step IS 'Текущий шаг в вопросе';
 COMMENT ON COLUMN users.test_completed IS 'Флаг завершения всех тестов';
+COMMENT ON COLUMN users.abandoned_at IS 'Время пометки незавершённого теста как брошенного';
+COMMENT ON COLUMN users.archived_at IS 'Время записи завершенной попытки в user_attempts';
+COMMENT ON COLUMN users.state_version IS 'Версия состояния теста для записи compare-and-swap (SESSION_STATE_MODE=versioned)';
+COMMENT ON TABLE user_attempts IS 'Архив завершенных попыток (сжатый JSON ответов и результатов)';
+COMMENT ON TABLE score_norms IS 'Гистограммы баллов выборки по стилям INQ и шкалам EPI';
+COMMENT ON TABLE handoff_queue IS 'Очередь передачи пользователей в Senler после завершения тестов';
 
 -- Проверка созданных объектов
 SELECT 
@@ -98,7 +149,7 @@ SELECT
     COUNT(*) as tables_count
 FROM information_schema.tables 
 WHERE table_schema = 'public' 
-    AND table_name = 'users';
+    AND table_name IN ('users', 'user_attempts', 'score_norms', 'handoff_queue');
 
 -- Показать структуру таблицы
 \d+ users;
\ No newline at end of file
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Потоковая выгрузка результатов тестирования в CSV или Parquet.
+
+Примеры:
+    python export_results.py results.csv
+    python export_results.py results.parquet --format parquet --checkpoint export.ckpt
+    python export_results.py results.csv --database-url postgresql+asyncpg://reader@replica/mind_style
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from config.settings import EXPORT_CHUNK_SIZE
+from src.database.export import EXPORT_FORMATS, export_results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Выгрузка таблицы users с ответами и результатами")
+    parser.add_argument(
+        "output", help="Путь к файлу выгрузки (Parquet: продолжение и каждые 100 тыс. строк - <имя>.partNNNN)"
+    )
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="Формат выгрузки")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Размер чанка в строках")
+    parser.add_argument("--checkpoint", default=None, help="Файл чекпоинта для продолжения выгрузки")
+    parser.add_argument("--database-url", default=None, help="База для чтения (например, реплика)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger("sqlalchemy.engine.Engine").setLevel(logging.WARNING)
+
+    exported = asyncio.run(
+        export_results(
+            args.output,
+            fmt=args.format,
+            chunk_size=args.chunk_size,
+            checkpoint_path=args.checkpoint,
+            database_url=args.database_url,
+        )
+    )
+    print(f"✅ Выгружено строк: {exported}")
+
+
+if __name__ == "__main__":
+    main()
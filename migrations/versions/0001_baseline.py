@@ -0,0 +1,92 @@
+"""Базовая схема users (database/create_tables.sql до перехода на миграции)
+
+Для уже развёрнутой базы, созданной скриптом create_tables.sql:
+    alembic stamp 0001_baseline && alembic upgrade head
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0001_baseline"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSON_TYPE = sa.JSON().with_variant(postgresql.JSONB(), "postgresql")
+GIN_INDEXES = {
+    "idx_users_answers_json": "answers_json",
+    "idx_users_inq_scores_json": "inq_scores_json",
+    "idx_users_epi_scores_json": "epi_scores_json",
+    "idx_users_priorities_json": "priorities_json",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.BigInteger(), nullable=False, unique=True),
+        sa.Column("username", sa.String(255)),
+        sa.Column("first_name", sa.String(255)),
+        sa.Column("last_name", sa.String(255)),
+        sa.Column("age", sa.Integer()),
+        sa.Column("test_start", sa.DateTime(timezone=True)),
+        sa.Column("test_end", sa.DateTime(timezone=True)),
+        sa.Column("answers_json", JSON_TYPE),
+        sa.Column("inq_scores_json", JSON_TYPE),
+        sa.Column("epi_scores_json", JSON_TYPE),
+        sa.Column("priorities_json", JSON_TYPE),
+        sa.Column("temperament", sa.String(50)),
+        sa.Column("current_task_type", sa.Integer(), server_default="1"),
+        sa.Column("current_question", sa.Integer(), server_default="0"),
+        sa.Column("current_step", sa.Integer(), server_default="0"),
+        sa.Column("test_completed", sa.Boolean(), server_default=sa.false()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    op.create_index("idx_users_user_id", "users", ["user_id"])
+    op.create_index("idx_users_username", "users", ["username"])
+    op.create_index("idx_users_test_completed", "users", ["test_completed"])
+    op.create_index("idx_users_created_at", "users", ["created_at"])
+    op.create_index("idx_users_current_task_type", "users", ["current_task_type"])
+
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    for index_name, column in GIN_INDEXES.items():
+        op.create_index(index_name, "users", [column], postgresql_using="gin")
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION update_updated_at_column()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.updated_at = CURRENT_TIMESTAMP;
+            RETURN NEW;
+        END;
+        $$ language 'plpgsql'
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER update_users_updated_at
+            BEFORE UPDATE ON users
+            FOR EACH ROW
+            EXECUTE FUNCTION update_updated_at_column()
+        """
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS update_users_updated_at ON users")
+        op.execute("DROP FUNCTION IF EXISTS update_updated_at_column()")
+    op.drop_table("users")
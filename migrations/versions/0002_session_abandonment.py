@@ -0,0 +1,25 @@
+"""Колонка users.abandoned_at для пометки брошенных тестов
+
+Revision ID: 0002_session_abandonment
+Revises: 0001_baseline
+Create Date: 2026-10-19 10:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0002_session_abandonment"
+down_revision: Union[str, None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("abandoned_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("abandoned_at")
@@ -0,0 +1,79 @@
+"""Индексы users под нагрузку на запись
+
+Каждый ответ переписывает answers_json, current_* и updated_at, поэтому:
+- удаляется GIN индекс на answers_json (самая дорогая часть обновления строки);
+- удаляются дублирующий idx_users_user_id (есть уникальный индекс) и низкоселективные
+  индексы по test_completed и current_task_type;
+- добавляются частичные индексы только по незавершённым сессиям.
+
+GIN индексы на *_scores_json остаются: эти колонки пишутся один раз при завершении.
+Все операции выполняются через CONCURRENTLY вне транзакции и не блокируют запись.
+
+Revision ID: 0003_write_optimized_indexes
+Revises: 0002_session_abandonment
+Create Date: 2026-10-19 10:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0003_write_optimized_indexes"
+down_revision: Union[str, None] = "0002_session_abandonment"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DROPPED_INDEXES = [
+    "idx_users_answers_json",
+    "idx_users_user_id",
+    "idx_users_test_completed",
+    "idx_users_current_task_type",
+]
+
+IN_PROGRESS = sa.text("test_completed = false")
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name in DROPPED_INDEXES:
+            op.drop_index(index_name, table_name="users", postgresql_concurrently=True, if_exists=True)
+
+        op.create_index(
+            "idx_users_in_progress_updated_at",
+            "users",
+            ["updated_at"],
+            postgresql_where=IN_PROGRESS,
+            sqlite_where=IN_PROGRESS,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "idx_users_task_type_updated_at",
+            "users",
+            ["current_task_type", "updated_at"],
+            postgresql_where=IN_PROGRESS,
+            sqlite_where=IN_PROGRESS,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == "postgresql"
+
+    with op.get_context().autocommit_block():
+        op.drop_index("idx_users_task_type_updated_at", table_name="users", postgresql_concurrently=True)
+        op.drop_index("idx_users_in_progress_updated_at", table_name="users", postgresql_concurrently=True)
+
+        op.create_index("idx_users_user_id", "users", ["user_id"], postgresql_concurrently=True)
+        op.create_index("idx_users_test_completed", "users", ["test_completed"], postgresql_concurrently=True)
+        op.create_index("idx_users_current_task_type", "users", ["current_task_type"], postgresql_concurrently=True)
+        if is_postgresql:
+            op.create_index(
+                "idx_users_answers_json",
+                "users",
+                ["answers_json"],
+                postgresql_using="gin",
+                postgresql_concurrently=True,
+            )
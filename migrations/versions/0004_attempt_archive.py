@@ -0,0 +1,61 @@
+"""Архив завершенных попыток user_attempts и перенос answers_json из users
+
+Каждая завершенная попытка записывается в user_attempts одним сжатым JSON (ответы и результаты),
+а answers_json завершенных строк users фоном обнуляется (src/database/archive.py). Частичный индекс
+idx_users_completed_payload находит строки, ответы которых еще не перенесены.
+
+Revision ID: 0004_attempt_archive
+Revises: 0003_write_optimized_indexes
+Create Date: 2026-10-19 10:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004_attempt_archive"
+down_revision: Union[str, None] = "0003_write_optimized_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COMPLETED_PAYLOAD = sa.text("test_completed = true AND answers_json IS NOT NULL")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_attempts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("test_start", sa.DateTime(timezone=True)),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("temperament", sa.String(50)),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index("idx_user_attempts_user_id", "user_attempts", ["user_id"])
+    op.create_index("idx_user_attempts_completed_at", "user_attempts", ["completed_at"])
+
+    op.add_column("users", sa.Column("archived_at", sa.DateTime(timezone=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_users_completed_payload",
+            "users",
+            ["id"],
+            postgresql_where=COMPLETED_PAYLOAD,
+            sqlite_where=COMPLETED_PAYLOAD,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("idx_users_completed_payload", table_name="users", postgresql_concurrently=True)
+
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("archived_at")
+
+    op.drop_index("idx_user_attempts_completed_at", table_name="user_attempts")
+    op.drop_index("idx_user_attempts_user_id", table_name="user_attempts")
+    op.drop_table("user_attempts")
@@ -0,0 +1,28 @@
+"""Колонка users.answers_packed для упакованных ответов
+
+При ANSWERS_STORAGE=packed ответы пишутся в answers_packed (src/core/answer_codec.py, около 32 байт
+на полный тест), а answers_json остается NULL. Строки в JSON читаются как прежде.
+
+Revision ID: 0005_answers_packed
+Revises: 0004_attempt_archive
+Create Date: 2026-10-19 10:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0005_answers_packed"
+down_revision: Union[str, None] = "0004_attempt_archive"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("answers_packed", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("answers_packed")
@@ -0,0 +1,32 @@
+"""Таблица score_norms: гистограммы баллов выборки для "топ X%"
+
+Строка - число завершений с баллом value по стилю INQ или шкале EPI metric. Каждое завершение
+увеличивает ячейки одним INSERT ... ON CONFLICT; полный пересчет - make db-norms.
+
+Revision ID: 0006_score_norms
+Revises: 0005_answers_packed
+Create Date: 2026-10-19 10:50:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0006_score_norms"
+down_revision: Union[str, None] = "0005_answers_packed"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "score_norms",
+        sa.Column("metric", sa.String(50), primary_key=True),
+        sa.Column("value", sa.Integer(), primary_key=True),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("score_norms")
@@ -0,0 +1,29 @@
+"""Колонка users.state_version для оптимистичных записей состояния
+
+При SESSION_STATE_MODE=versioned каждая запись состояния теста - UPDATE ... WHERE state_version = N
+с увеличением версии; несовпадение значит, что строку изменил другой воркер, и состояние
+перечитывается.
+
+Revision ID: 0007_state_version
+Revises: 0006_score_norms
+Create Date: 2026-10-19 11:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0007_state_version"
+down_revision: Union[str, None] = "0006_score_norms"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("state_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("state_version")
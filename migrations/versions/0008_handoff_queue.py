@@ -0,0 +1,46 @@
+"""Таблица handoff_queue: очередь передачи пользователей обратно в Senler
+
+После завершения тестов строка добавляется в той же транзакции, фоновый диспетчер отправляет
+ее на SENLER_HANDOFF_URL и удаляет; повторы - с экспоненциальной задержкой по next_attempt_at.
+
+Revision ID: 0008_handoff_queue
+Revises: 0007_state_version
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0008_handoff_queue"
+down_revision: Union[str, None] = "0007_state_version"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "handoff_queue",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("endpoint", sa.String(), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("failed_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.String(), nullable=True),
+    )
+    op.create_index(
+        "idx_handoff_queue_due",
+        "handoff_queue",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("failed_at IS NULL"),
+        sqlite_where=sa.text("failed_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_handoff_queue_due", table_name="handoff_queue")
+    op.drop_table("handoff_queue")
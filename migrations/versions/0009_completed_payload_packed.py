@@ -0,0 +1,46 @@
+"""Частичный индекс idx_users_completed_payload покрывает и упакованные ответы
+
+Фоновый перенос в архив (src/database/archive.py) ищет завершенные строки с answers_json
+или answers_packed. Индекс из 0004_attempt_archive покрывал только answers_json, и при
+ANSWERS_STORAGE=packed перенос каждый цикл сканировал всю таблицу users.
+
+Revision ID: 0009_completed_payload_packed
+Revises: 0008_handoff_queue
+Create Date: 2026-10-19 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0009_completed_payload_packed"
+down_revision: Union[str, None] = "0008_handoff_queue"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COMPLETED_PAYLOAD = sa.text("test_completed = true AND (answers_json IS NOT NULL OR answers_packed IS NOT NULL)")
+COMPLETED_JSON_PAYLOAD = sa.text("test_completed = true AND answers_json IS NOT NULL")
+
+
+def _replace_index(where) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "idx_users_completed_payload", table_name="users", postgresql_concurrently=True, if_exists=True
+        )
+        op.create_index(
+            "idx_users_completed_payload",
+            "users",
+            ["id"],
+            postgresql_where=where,
+            sqlite_where=where,
+            postgresql_concurrently=True,
+        )
+
+
+def upgrade() -> None:
+    _replace_index(COMPLETED_PAYLOAD)
+
+
+def downgrade() -> None:
+    _replace_index(COMPLETED_JSON_PAYLOAD)
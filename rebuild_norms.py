@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Пересчет норм выборки (гистограмм баллов для "топ X%") по всем завершенным попыткам.
+
+Баллы считаются заново из ответов тем же подсчетом, что и при завершении теста.
+Пример:
+    python rebuild_norms.py --batch-size 2000
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from config.const import TaskEntity
+from src.core.invalidation import TOPIC_NORMS, create_invalidation_transport, invalidation_bus
+from src.core.norms import rebuild_norms
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Пересчет норм выборки по завершенным попыткам")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Размер пачки попыток")
+    return parser.parse_args()
+
+
+async def run(batch_size: int) -> int:
+    await TaskEntity.inq.value.load_questions()
+    await TaskEntity.epi.value.load_questions()
+    attempts = await rebuild_norms(batch_size)
+
+    # Запущенные боты перечитают нормы сразу, не дожидаясь NORMS_REFRESH_SECONDS
+    transport = create_invalidation_transport()
+    if transport is not None:
+        await invalidation_bus.start(transport)
+        invalidation_bus.publish(TOPIC_NORMS)
+        await invalidation_bus.stop()
+    return attempts
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger("sqlalchemy.engine.Engine").setLevel(logging.WARNING)
+
+    attempts = asyncio.run(run(args.batch_size))
+    print(f"✅ Нормы пересчитаны по попыткам: {attempts}")
+
+
+if __name__ == "__main__":
+    main()
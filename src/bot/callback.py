@@ -1,39 +1,61 @@
 from aiogram import F
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
 
-from main import task_manager
 from config.const import MESSAGES, PersonalDataStates, INQ_SCORES_PER_QUESTION, TaskEntity, TaskType, dp
+from config.settings import WEBAPP_URL
 from src.bot.complete import complete_all_tasks
-from src.bot.sender import send_priorities_task, send_inq_question, send_epi_question
+from src.bot.instances import BotInstance
+from src.bot.message_editor import message_editor
+from src.bot.response_pipeline import response_pipeline
+from src.bot.sender import send_priorities_task, send_inq_question, send_epi_question, send_epi_page
+from src.core.task_manager import TaskManager
 from src.database.operations import get_or_create_user
 
 
-@dp.callback_query(F.data == "start_personal_data")
+@dp.callback_query(F.data == "start_personal_data", flags={"new_session": True})
 async def collect_personal_data(callback: CallbackQuery, state: FSMContext):
     """
     Установка фамилии имени пользователя
     """
-    await callback.message.edit_text(MESSAGES["callback_start_collect_personal_data"])
-    await state.set_state(PersonalDataStates.waiting_for_name)
+    await response_pipeline.respond(
+        callback,
+        None,
+        message_editor.edit(callback.message, MESSAGES["callback_start_collect_personal_data"]),
+        state.set_state(PersonalDataStates.waiting_for_name),
+    )
+
+
+@dp.callback_query(F.data == "dummy")
+async def dummy_button(callback: CallbackQuery):
+    """
+    Информационные кнопки без действия
+    """
     await callback.answer()
 
 
-@dp.callback_query(F.data == "start_tasks")
-async def start_tasks(callback: CallbackQuery):
+@dp.callback_query(F.data == "start_tasks", flags={"new_session": True})
+async def start_tasks(callback: CallbackQuery, task_manager: TaskManager):
     user = await get_or_create_user(user_id=callback.from_user.id, username=callback.from_user.username)
 
-    success = await task_manager.start_tasks(user)
+    with task_manager.defer_writes() as writes:
+        success = await task_manager.start_tasks(user)
     if not success:
-        await callback.message.edit_text(MESSAGES["task_not_loaded"])
+        await response_pipeline.respond(
+            callback, None, message_editor.edit(callback.message, MESSAGES["task_not_loaded"])
+        )
         return
 
-    await send_priorities_task(callback.message, user.user_id)
-    await callback.answer()
+    await response_pipeline.respond(
+        callback,
+        None,
+        send_priorities_task(callback.message, task_manager, user.user_id),
+        task_manager.flush_writes(writes),
+    )
 
 
 @dp.callback_query(F.data.startswith("priority_"))
-async def process_priorities_answer(callback: CallbackQuery):
+async def process_priorities_answer(callback: CallbackQuery, task_manager: TaskManager):
     """
     Обработка ответов на тест приоритетов
     """
@@ -43,50 +65,65 @@ async def process_priorities_answer(callback: CallbackQuery):
 
     user = await get_or_create_user(user_id=callback.from_user.id, username=callback.from_user.username)
 
-    success, message_text = await task_manager.process_priorities_answer(user, category_id, score)
+    with task_manager.defer_writes() as writes:
+        success, message_text = await task_manager.process_priorities_answer(user, category_id, score)
     if not success:
         await callback.answer(f"❌ {message_text}", show_alert=True)
         return
 
-    await callback.answer(f"✅ Выбран балл {score}")
-    await send_priorities_task(callback.message, user.user_id)
+    await response_pipeline.respond(
+        callback,
+        f"✅ Выбран балл {score}",
+        send_priorities_task(callback.message, task_manager, user.user_id),
+        task_manager.flush_writes(writes),
+    )
 
 
 @dp.callback_query(F.data == "complete_priorities")
-async def complete_priorities(callback: CallbackQuery):
+async def complete_priorities(callback: CallbackQuery, task_manager: TaskManager):
     """
     Завершение теста приоритетов
     """
     user = await get_or_create_user(user_id=callback.from_user.id, username=callback.from_user.username)
 
+    await task_manager.load_state(user.user_id)
     if not task_manager.is_priorities_task_completed(user.user_id):
         await callback.answer(MESSAGES["need_finish_all_categories"], show_alert=True)
         return
 
-    await task_manager.move_to_next_task(user.user_id)
-
-    await callback.message.edit_text(
-        "🎉 <b>Тест 1 завершен!</b>\n\n" "Переходим к следующему тесту...",
-        reply_markup=InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(text=MESSAGES["button_inq_task_start"], callback_data="start_inq_task")]
-            ]
+    with task_manager.defer_writes() as writes:
+        await task_manager.move_to_next_task(user.user_id)
+
+    keyboard = [[InlineKeyboardButton(text=MESSAGES["button_inq_task_start"], callback_data="start_inq_task")]]
+    # Mini App: тесты 2 и 3 проходятся на устройстве и отправляются одним запросом
+    if WEBAPP_URL:
+        keyboard.append([InlineKeyboardButton(text=MESSAGES["button_webapp"], web_app=WebAppInfo(url=WEBAPP_URL))])
+
+    await response_pipeline.respond(
+        callback,
+        None,
+        message_editor.edit(
+            callback.message,
+            "🎉 <b>Тест 1 завершен!</b>\n\n" "Переходим к следующему тесту...",
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
         ),
+        task_manager.flush_writes(writes),
     )
-    await callback.answer()
 
 
 @dp.callback_query(F.data == "start_inq_task")
-async def start_inq_task(callback: CallbackQuery):
+async def start_inq_task(callback: CallbackQuery, task_manager: TaskManager):
     """
     Начало INQ теста
     """
-    await send_inq_question(callback.message, callback.from_user.id, 0)
-    await callback.answer()
+    await task_manager.load_state(callback.from_user.id)
+    await response_pipeline.respond(
+        callback, None, send_inq_question(callback.message, task_manager, callback.from_user.id, 0)
+    )
 
 
 @dp.callback_query(F.data.startswith("inq_"))
-async def process_inq_answer(callback: CallbackQuery):
+async def process_inq_answer(callback: CallbackQuery, task_manager: TaskManager):
     """
     Обработка ответов INQ теста
     """
@@ -95,66 +132,80 @@ async def process_inq_answer(callback: CallbackQuery):
 
     user = await get_or_create_user(user_id=callback.from_user.id, username=callback.from_user.username)
 
-    success, message_text = await task_manager.process_inq_answer(user, option)
-    if not success:
-        await callback.answer(f"❌ {message_text}", show_alert=True)
-        return
-
-    state = task_manager.get_task_state(user.user_id)
-    if not state:
-        await callback.answer(MESSAGES["task_incorrect"], show_alert=True)
-        return
-
-    score = INQ_SCORES_PER_QUESTION[state["current_step"] - 1]
-    await callback.answer(f"✅ Вариант {option} получил {score} баллов")
-
-    if task_manager.is_inq_question_completed(user.user_id, question_num):
-        if question_num + 1 < TaskEntity.inq.value.get_total_questions():
-            await task_manager.move_to_next_question(user.user_id)
-            await send_inq_question(callback.message, user.user_id, question_num + 1)
+    with task_manager.defer_writes() as writes:
+        success, message_text = await task_manager.process_inq_answer(user, option)
+        if not success:
+            await callback.answer(f"❌ {message_text}", show_alert=True)
+            return
+
+        state = task_manager.get_task_state(user.user_id)
+        if not state:
+            await callback.answer(MESSAGES["task_incorrect"], show_alert=True)
+            return
+
+        score = INQ_SCORES_PER_QUESTION[state["current_step"] - 1]
+
+        if task_manager.is_inq_question_completed(user.user_id, question_num):
+            if question_num + 1 < TaskEntity.inq.value.get_total_questions():
+                await task_manager.move_to_next_question(user.user_id)
+                edit = send_inq_question(callback.message, task_manager, user.user_id, question_num + 1)
+            else:
+                await task_manager.move_to_next_task(user.user_id)
+                edit = message_editor.edit(
+                    callback.message,
+                    "🎉 <b>Тест 2 завершен!</b>\n\n" "Переходим к финальному тесту...",
+                    reply_markup=InlineKeyboardMarkup(
+                        inline_keyboard=[
+                            [
+                                InlineKeyboardButton(
+                                    text=MESSAGES["button_epi_task_start"], callback_data="start_epi_task"
+                                )
+                            ]
+                        ]
+                    ),
+                )
         else:
-            await task_manager.move_to_next_task(user.user_id)
-            await callback.message.edit_text(
-                "🎉 <b>Тест 2 завершен!</b>\n\n" "Переходим к финальному тесту...",
-                reply_markup=InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [InlineKeyboardButton(text=MESSAGES["button_epi_task_start"], callback_data="start_epi_task")]
-                    ]
-                ),
-            )
-    else:
-        await send_inq_question(callback.message, user.user_id, question_num)
+            edit = send_inq_question(callback.message, task_manager, user.user_id, question_num)
+
+    await response_pipeline.respond(
+        callback, f"✅ Вариант {option} получил {score} баллов", edit, task_manager.flush_writes(writes)
+    )
 
 
 @dp.callback_query(F.data == "go_back")
-async def go_back(callback: CallbackQuery):
+async def go_back(callback: CallbackQuery, task_manager: TaskManager):
     """
     Обработка кнопки "Назад"
     """
     user = await get_or_create_user(user_id=callback.from_user.id, username=callback.from_user.username)
 
-    success, message_text, new_state = await task_manager.go_back_question(user)
+    with task_manager.defer_writes() as writes:
+        success, message_text, new_state = await task_manager.go_back_question(user)
     if not success:
         await callback.answer(f"❌ {message_text}", show_alert=True)
         return
 
-    await callback.answer(MESSAGES["go_back_completed"])
-
+    work = [task_manager.flush_writes(writes)]
     if new_state["current_task_type"] == TaskType.inq.value:
-        await send_inq_question(callback.message, user.user_id, new_state["current_question"])
+        work.append(send_inq_question(callback.message, task_manager, user.user_id, new_state["current_question"]))
+
+    await response_pipeline.respond(callback, MESSAGES["go_back_completed"], *work)
 
 
 @dp.callback_query(F.data == "start_epi_task")
-async def start_epi_task(callback: CallbackQuery):
+async def start_epi_task(callback: CallbackQuery, task_manager: TaskManager):
     """
     Начало EPI теста
     """
-    await send_epi_question(callback.message, callback.from_user.id, 0)
-    await callback.answer()
+    if task_manager.epi_page_size > 1:
+        edit = send_epi_page(callback.message, task_manager, callback.from_user.id, 0)
+    else:
+        edit = send_epi_question(callback.message, callback.from_user.id, 0)
+    await response_pipeline.respond(callback, None, edit)
 
 
 @dp.callback_query(F.data.startswith("epi_"))
-async def process_epi_answer(callback: CallbackQuery):
+async def process_epi_answer(callback: CallbackQuery, task_manager: TaskManager, bot_instance: BotInstance):
     """
     Обработка ответов EPI теста
     """
@@ -163,14 +214,79 @@ async def process_epi_answer(callback: CallbackQuery):
 
     user = await get_or_create_user(user_id=callback.from_user.id, username=callback.from_user.username)
 
+    if question_num + 1 < TaskEntity.epi.value.get_total_questions():
+        with task_manager.defer_writes() as writes:
+            success, message_text = await task_manager.process_epi_answer(user, answer)
+        if not success:
+            await callback.answer(f"❌ {message_text}", show_alert=True)
+            return
+
+        await response_pipeline.respond(
+            callback,
+            f"✅ Ответ: {answer}",
+            send_epi_question(callback.message, user.user_id, question_num + 1),
+            task_manager.flush_writes(writes),
+        )
+        return
+
+    # Последний ответ записывается сразу: завершение тестов читает и пишет ту же строку
     success, message_text = await task_manager.process_epi_answer(user, answer)
     if not success:
         await callback.answer(f"❌ {message_text}", show_alert=True)
         return
 
-    await callback.answer(f"✅ Ответ: {answer}")
+    await response_pipeline.respond(
+        callback, f"✅ Ответ: {answer}", complete_all_tasks(callback.message, task_manager, bot_instance, user)
+    )
 
-    if question_num + 1 < TaskEntity.epi.value.get_total_questions():
-        await send_epi_question(callback.message, user.user_id, question_num + 1)
-    else:
-        await complete_all_tasks(callback.message, user)
+
+@dp.callback_query(F.data.startswith("epit_"))
+async def select_epi_page_answer(callback: CallbackQuery, task_manager: TaskManager):
+    """
+    Выбор ответа на странице EPI (без записи в БД)
+    """
+    _, page_start_str, question_num_str, answer = callback.data.split("_")
+    page_start = int(page_start_str)
+
+    user = await get_or_create_user(user_id=callback.from_user.id, username=callback.from_user.username)
+
+    success, message_text = await task_manager.select_epi_page_answer(user, page_start, int(question_num_str), answer)
+    if not success:
+        await callback.answer(f"❌ {message_text}", show_alert=True)
+        return
+
+    await response_pipeline.respond(
+        callback, None, send_epi_page(callback.message, task_manager, user.user_id, page_start)
+    )
+
+
+@dp.callback_query(F.data.startswith("epin_"))
+async def submit_epi_page(callback: CallbackQuery, task_manager: TaskManager, bot_instance: BotInstance):
+    """
+    Сохранение страницы EPI и переход к следующей
+    """
+    page_start = int(callback.data.split("_")[1])
+
+    user = await get_or_create_user(user_id=callback.from_user.id, username=callback.from_user.username)
+
+    with task_manager.defer_writes() as writes:
+        success, message_text = await task_manager.submit_epi_page(user, page_start)
+    if not success:
+        await callback.answer(f"❌ {message_text}", show_alert=True)
+        return
+
+    next_page = task_manager.epi_page(task_manager.get_task_state(user.user_id)["current_question"])
+    if next_page:
+        await response_pipeline.respond(
+            callback,
+            MESSAGES["answer_saved"],
+            send_epi_page(callback.message, task_manager, user.user_id, next_page.start),
+            task_manager.flush_writes(writes),
+        )
+        return
+
+    # Последняя страница записывается сразу: завершение тестов читает и пишет ту же строку
+    await task_manager.flush_writes(writes)
+    await response_pipeline.respond(
+        callback, MESSAGES["answer_saved"], complete_all_tasks(callback.message, task_manager, bot_instance, user)
+    )
@@ -1,21 +1,18 @@
+from typing import Any, Dict
+
 from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
 
-from main import task_manager
 from config.const import MESSAGES
+from src.bot.instances import BotInstance
+from src.bot.message_editor import message_editor
 from src.core.admin_reports import admin_reports
-from src.database.operations import get_or_create_user
-
-
-async def complete_all_tasks(message: Message, user):
-    """
-    Завершение всего тестирования
-    """
-    all_scores = await task_manager.complete_all_tasks(user)
+from src.core.norms import norms
+from src.core.task_manager import TaskManager
+from src.core.tracing import traced
+from src.database.operations import commit_unit_of_work
 
-    if not all_scores:
-        await message.edit_text(MESSAGES["summary_result_error"])
-        return
 
+def results_text(all_scores: Dict[str, Any]) -> str:
     result_text = "🎉 <b>Все тесты завершены!</b>\n\n"
     result_text += "📊 <b>Ваши результаты:</b>\n\n"
 
@@ -29,19 +26,61 @@ async def complete_all_tasks(message: Message, user):
 
     for i, (style, score) in enumerate(sorted_inq):
         emoji = "🥇" if i == 0 else "🥈" if i == 1 else "🥉" if i == 2 else "📍"
-        result_text += f"{emoji} {style}: {score} баллов\n"
+        result_text += f"{emoji} {style}: {score} баллов{norms.format_top(style, score)}\n"
 
     result_text += f"\n<b>🎭 Темперамент:</b> {all_scores.get('temperament', 'Не определен')}\n"
-    result_text += f"<b>📊 E (экстраверсия):</b> {all_scores.get('E', 0)}\n"
-    result_text += f"<b>📊 N (нейротизм):</b> {all_scores.get('N', 0)}\n"
-    result_text += f"<b>📊 L (шкала лжи):</b> {all_scores.get('L', 0)}\n"
-
-    await message.edit_text(
-        result_text,
-        reply_markup=InlineKeyboardMarkup(
-            inline_keyboard=[[InlineKeyboardButton(text=MESSAGES["button_again"], callback_data="start_personal_data")]]
-        ),
+    for scale, title in (("E", "экстраверсия"), ("N", "нейротизм"), ("L", "шкала лжи")):
+        value = all_scores.get(scale, 0)
+        result_text += f"<b>📊 {scale} ({title}):</b> {value}{norms.format_top(scale, value)}\n"
+    return result_text
+
+
+def results_markup() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text=MESSAGES["button_again"], callback_data="start_personal_data")]]
+    )
+
+
+async def report_to_admin(bot_instance: BotInstance, user, all_scores: Dict[str, Any]):
+    # Профиль завершение не меняет: без повторного чтения соединение не занято на время повторов отправки
+    await admin_reports.send_to_admin(
+        user, all_scores, bot_token=bot_instance.bot.token, admin_user_id=bot_instance.admin_user_id
     )
 
-    updated_user = await get_or_create_user(user_id=user.user_id)
-    await admin_reports.send_to_admin(updated_user, all_scores)
+
+@traced("render.results")
+async def complete_all_tasks(message: Message, task_manager: TaskManager, bot_instance: BotInstance, user):
+    """
+    Завершение всего тестирования
+    """
+    all_scores = await task_manager.complete_all_tasks(user)
+
+    if not all_scores:
+        await commit_unit_of_work()
+        await message_editor.edit(message, MESSAGES["summary_result_error"])
+        return
+
+    await norms.refresh_if_stale()
+    await norms.record(all_scores)
+    # Задача ResponsePipeline: записи завершения фиксируются до редактирования сообщения
+    await commit_unit_of_work()
+
+    await message_editor.edit(message, results_text(all_scores), reply_markup=results_markup())
+    await report_to_admin(bot_instance, user, all_scores)
+
+
+@traced("render.results_message")
+async def send_completed_results(task_manager: TaskManager, bot_instance: BotInstance, user) -> bool:
+    """
+    Завершение тестирования без колбэка (ответы из Mini App): результаты приходят новым сообщением
+    """
+    all_scores = await task_manager.complete_all_tasks(user)
+    if not all_scores:
+        return False
+
+    await norms.refresh_if_stale()
+    await norms.record(all_scores)
+
+    await bot_instance.bot.send_message(user.user_id, results_text(all_scores), reply_markup=results_markup())
+    await report_to_admin(bot_instance, user, all_scores)
+    return True
@@ -0,0 +1,13 @@
+from aiogram.filters import Filter
+from aiogram.types import Message
+
+from src.bot.instances import BotInstance
+
+
+class IsAdmin(Filter):
+    """
+    Сообщение от администратора бота, получившего обновление
+    """
+
+    async def __call__(self, message: Message, bot_instance: BotInstance) -> bool:
+        return bool(bot_instance.admin_user_id) and message.from_user.id == bot_instance.admin_user_id
@@ -1,19 +1,118 @@
-from aiogram.filters import CommandStart
-from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
+import html
+import time
+from typing import List, Optional, Set
 
-from config.const import MESSAGES, dp
+from aiogram.filters import Command, CommandObject, CommandStart
+from aiogram.types import BufferedInputFile, Message
 
+from config.const import TaskEntity, dp
+from config.settings import PROFILER_MAX_SECONDS
+from src.bot.filters import IsAdmin
+from src.bot.sender import welcome_message
+from src.core.invalidation import TOPIC_QUESTIONS, invalidation_bus
+from src.core.loop_monitor import lag_monitor, profiler
+from src.core.metrics import metrics
+from src.database.operations import get_user_stats
 
-@dp.message(CommandStart())
+
+@dp.message(CommandStart(), flags={"new_session": True})
 async def start_handler(message: Message):
+    text, reply_markup = welcome_message()
+    await message.answer(text, reply_markup=reply_markup)
+
+
+@dp.message(Command("stats"), IsAdmin())
+async def stats_handler(message: Message):
+    """
+    Метрики процесса и число участников (с реплики, если она настроена) для администратора бота
+    """
+    users = await get_user_stats()
     await message.answer(
-        "🎯 <b>Добро пожаловать в тест 'Стили мышления'!</b>\n\n"
-        "Этот тест поможет определить ваш доминирующий стиль мышления и лучше понять ваши предпочтения в принятии решений.\n\n"
-        "📊 Состоит из трех тестов\n"
-        "⏱️ Займет около 15-20 минут\n"
-        "🎁 В конце получите персональный анализ\n\n"
-        "<i>Для начала нам нужно собрать немного информации о вас.</i>",
-        reply_markup=InlineKeyboardMarkup(
-            inline_keyboard=[[InlineKeyboardButton(text=MESSAGES["button_start"], callback_data="start_personal_data")]]
-        ),
+        f"Участники: всего {users['total']}, завершили {users['completed']}, "
+        f"проходят {users['in_progress']}, бросили {users['abandoned']}\n\n"
+        f"<pre>{metrics.format()}</pre>"
     )
+
+
+@dp.message(Command("profile"), IsAdmin())
+async def profile_handler(message: Message, command: CommandObject):
+    """
+    Семплирующее профилирование цикла событий: /profile [секунды]
+    """
+    try:
+        seconds = int(command.args or 10)
+    except ValueError:
+        seconds = 0
+    if seconds < 1:
+        await message.answer("Использование: /profile [секунды]")
+        return
+    seconds = min(seconds, PROFILER_MAX_SECONDS)
+
+    await message.answer(f"⏱ Профилирование {seconds} с...")
+    try:
+        stacks = await profiler.profile(seconds)
+    except RuntimeError as e:
+        await message.answer(f"❌ {e}")
+        return
+    if not stacks:
+        await message.answer("❌ Не снято ни одного стека")
+        return
+
+    filename = f"profile_{time.strftime('%Y%m%d_%H%M%S')}.folded"
+    await message.answer_document(
+        BufferedInputFile(stacks.encode(), filename=filename),
+        caption="Стеки в формате collapsed: flamegraph.pl или speedscope.app",
+    )
+
+
+@dp.message(Command("lag"), IsAdmin())
+async def lag_handler(message: Message, command: CommandObject):
+    """
+    Контроль блокировок цикла событий: /lag, /lag <порог мс>, /lag off
+    """
+    if command.args:
+        try:
+            threshold_ms = 0 if command.args.strip() == "off" else int(command.args)
+        except ValueError:
+            await message.answer("Использование: /lag [порог мс | off]")
+            return
+        await lag_monitor.set_threshold(threshold_ms)
+
+    await message.answer(lag_monitor.format_status())
+
+
+@dp.message(Command("blocks"), IsAdmin())
+async def blocks_handler(message: Message):
+    """
+    Последние блокировки цикла событий со стеками
+    """
+    if not lag_monitor.blocks:
+        await message.answer("Блокировок не было")
+        return
+
+    for block in list(lag_monitor.blocks)[-3:]:
+        started = time.strftime("%H:%M:%S", time.localtime(block.started))
+        await message.answer(
+            f"🐢 {started}, {block.duration * 1000:.0f} мс\n<pre>{html.escape(block.stack[-3000:])}</pre>"
+        )
+
+
+async def reload_question_banks(names: Optional[Set[str]] = None) -> List[str]:
+    """
+    Перечитывает банки вопросов из файлов (None - все); возвращает их названия
+    """
+    entities = [entity for entity in TaskEntity if names is None or entity.name in names]
+    for entity in entities:
+        await entity.value.load_questions()
+    return [entity.name for entity in entities]
+
+
+@dp.message(Command("reload_questions"), IsAdmin())
+async def reload_questions_handler(message: Message):
+    """
+    Перечитывает банки вопросов в этом процессе и, через шину инвалидации, в остальных
+    """
+    names = await reload_question_banks()
+    invalidation_bus.publish(TOPIC_QUESTIONS)
+    scope = "во всех процессах" if invalidation_bus.enabled else "только в этом процессе"
+    await message.answer(f"Банки вопросов перечитаны {scope}: {', '.join(names)}")
@@ -0,0 +1,79 @@
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.enums import ParseMode
+
+from config.const import MESSAGES
+from config.settings import ADMIN_USER_ID, BOT_TOKEN, BOTS_CONFIG
+from src.core.task_manager import TaskManager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BotConfig:
+    name: str
+    token: str
+    admin_user_id: int = 0
+
+
+@dataclass
+class BotInstance:
+    name: str
+    bot: Bot
+    admin_user_id: int
+    task_manager: TaskManager
+
+    async def send_session_reminder(self, user_id: int):
+        try:
+            await self.bot.send_message(user_id, MESSAGES["session_reminder"])
+        except Exception as e:
+            logger.warning(f"[{self.name}] Не удалось отправить напоминание пользователю {user_id}: {e}")
+
+
+def load_bot_configs(path: str = BOTS_CONFIG) -> List[BotConfig]:
+    """
+    Список ботов процесса из JSON файла {"bots": [{"name", "token", "admin_user_id"}]}.
+    Без файла - один бот из BOT_TOKEN и ADMIN_USER_ID
+    """
+    if not path:
+        return [BotConfig(name="default", token=BOT_TOKEN, admin_user_id=ADMIN_USER_ID)]
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    configs = [
+        BotConfig(name=item["name"], token=item["token"], admin_user_id=int(item.get("admin_user_id", 0)))
+        for item in data["bots"]
+    ]
+    if not configs:
+        raise ValueError(f"В {path} не указано ни одного бота")
+
+    names = [config.name for config in configs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Имена ботов в {path} должны быть уникальны")
+    return configs
+
+
+def create_bot_instances(
+    configs: List[BotConfig], session: Optional[AiohttpSession] = None, **task_manager_kwargs
+) -> Dict[int, BotInstance]:
+    """
+    Боты с общим HTTP пулом aiogram и собственным TaskManager у каждого; ключ - id бота из токена
+    """
+    session = session or AiohttpSession()
+    instances = {}
+    for config in configs:
+        bot = Bot(token=config.token, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+        task_manager = TaskManager(**task_manager_kwargs)
+        instance = BotInstance(
+            name=config.name, bot=bot, admin_user_id=config.admin_user_id, task_manager=task_manager
+        )
+        task_manager.reminder_callback = instance.send_session_reminder
+        instances[bot.id] = instance
+    return instances
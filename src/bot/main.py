@@ -7,32 +7,205 @@ import handler
 import callback
 import proccesser
 
-from aiogram import Bot
-from aiogram.enums import ParseMode
+from aiogram.client.session.aiohttp import AiohttpSession
 
 from config.const import TaskEntity, dp, MESSAGES
-from config.settings import DEBUG, BOT_TOKEN
-from src.core.task_manager import TaskManager
-from src.database.operations import init_db
-
-logging.basicConfig(
-    level=logging.INFO if DEBUG else logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+from config.settings import (
+    ANSWER_LOG_PATH,
+    ANSWER_LOG_FLUSH_MS,
+    ANSWER_LOG_APPLY_INTERVAL_MS,
+    ANSWER_LOG_APPLY_BATCH,
+    ADMISSION_MAX_LOOP_LAG_MS,
+    ADMISSION_MAX_OUTBOUND,
+    ADMISSION_MAX_POOL_WAIT_MS,
+    ARCHIVE_BATCH_SIZE,
+    ARCHIVE_GRACE_SECONDS,
+    ARCHIVE_INTERVAL_SECONDS,
+    ARCHIVE_RETENTION_DAYS,
+    SESSION_SNAPSHOT_MAX_AGE,
+    SESSION_SNAPSHOT_PATH,
+    SESSION_STATE_MODE,
+    SHUTDOWN_DRAIN_TIMEOUT,
+    WEBAPP_HOST,
+    WEBAPP_PORT,
+)
+from src.bot.instances import create_bot_instances, load_bot_configs
+from src.bot.middlewares import (
+    AdmissionMiddleware,
+    BotContextMiddleware,
+    CommitBeforeRequestMiddleware,
+    DbSessionMiddleware,
+    HandlerTracingMiddleware,
+    InFlightMiddleware,
+    ThrottlingMiddleware,
+    TelegramTracingMiddleware,
+    TracingMiddleware,
+)
+from src.bot.outbound import outbound
+from src.bot.response_pipeline import response_pipeline
+from src.core.admission import admission
+from src.core.drain import in_flight
+from src.core.handoff import handoff
+from src.core.http_client import close_http_client
+from src.core.invalidation import (
+    TOPIC_NORMS,
+    TOPIC_QUESTIONS,
+    TOPIC_USER,
+    create_invalidation_transport,
+    invalidation_bus,
 )
+from src.core.logging_setup import setup_logging, stop_logging
+from src.core.loop_monitor import lag_monitor
+from src.core.norms import norms
+from src.core.session_snapshot import dump_sessions, load_sessions
+from src.core.throttle import throttle
+from src.core.tracing import instrument_engine, tracer
+from src.database.answer_log import AnswerLog
+from src.database.archive import AttemptArchiver
+from src.database.models import engine, replica_engine
+from src.database.operations import (
+    acquire_session_restore_lock,
+    init_db,
+    release_session_restore_lock,
+    write_queue,
+)
+from src.database.pool import pool_wait
+from src.webapp.app import create_webapp
+from src.webapp.senler import senler_starts
+from src.webapp.server import EmbeddedServer
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
-bot = Bot(token=BOT_TOKEN, parse_mode=ParseMode.HTML)
+answer_log = (
+    AnswerLog(
+        ANSWER_LOG_PATH,
+        flush_interval_ms=ANSWER_LOG_FLUSH_MS,
+        apply_interval_ms=ANSWER_LOG_APPLY_INTERVAL_MS,
+        apply_batch_size=ANSWER_LOG_APPLY_BATCH,
+    )
+    if ANSWER_LOG_PATH
+    else None
+)
+
+archiver = AttemptArchiver(
+    interval=ARCHIVE_INTERVAL_SECONDS,
+    batch_size=ARCHIVE_BATCH_SIZE,
+    grace_seconds=ARCHIVE_GRACE_SECONDS,
+    retention_days=ARCHIVE_RETENTION_DAYS,
+)
+
+# Все боты процесса делят пул БД, банки вопросов, HTTP пул aiogram и лог ответов;
+# состояние тестов (TaskManager) у каждого бота свое
+session = AiohttpSession()
+bot_instances = create_bot_instances(load_bot_configs(), session=session, answer_log=answer_log)
+
+# Остановка дожидается обновлений, уже принятых в обработку
+dp.update.outer_middleware(InFlightMiddleware(in_flight))
+
+# Без трассировки ее middleware и события не регистрируются вовсе
+if tracer.enabled:
+    dp.update.outer_middleware(TracingMiddleware())
+    dp.callback_query.middleware(HandlerTracingMiddleware())
+    dp.message.middleware(HandlerTracingMiddleware())
+    session.middleware(TelegramTracingMiddleware())
+    instrument_engine(engine)
+    if replica_engine is not None:
+        instrument_engine(replica_engine)
 
-task_manager = TaskManager()
+# Флуд отсекается до контекста бота и сессии БД
+if throttle.enabled:
+    dp.update.outer_middleware(ThrottlingMiddleware(throttle))
+dp.update.outer_middleware(BotContextMiddleware(bot_instances))
+dp.update.outer_middleware(DbSessionMiddleware())
+session.middleware(CommitBeforeRequestMiddleware())
+
+# Новые сессии откладываются при перегрузке; ответы начатых тестов проходят всегда
+admission.add_signal("loop_lag", lambda: lag_monitor.lag * 1000, ADMISSION_MAX_LOOP_LAG_MS)
+admission.add_signal("pool_wait", lambda: pool_wait.recent_max() * 1000, ADMISSION_MAX_POOL_WAIT_MS)
+admission.add_signal("outbound", lambda: len(response_pipeline.tasks), ADMISSION_MAX_OUTBOUND)
+dp.message.middleware(AdmissionMiddleware(admission))
+dp.callback_query.middleware(AdmissionMiddleware(admission))
+
+
+def evict_user_sessions(keys):
+    user_ids = None if keys is None else {int(key) for key in keys}
+    for instance in bot_instances.values():
+        instance.task_manager.evict_sessions(user_ids)
+
+
+# Кэши процесса, которые меняют другие процессы: сессии пользователей, банки вопросов, нормы выборки
+invalidation_bus.subscribe(TOPIC_USER, evict_user_sessions)
+invalidation_bus.subscribe(TOPIC_QUESTIONS, handler.reload_question_banks)
+invalidation_bus.subscribe(TOPIC_NORMS, lambda keys: norms.load())
+
+webapp_server = EmbeddedServer(create_webapp(bot_instances), WEBAPP_HOST, WEBAPP_PORT) if WEBAPP_PORT else None
 
 
 async def main():
     await init_db()
+    await norms.refresh_if_stale()
     await TaskEntity.priorities.value.load_questions()
     await TaskEntity.inq.value.load_questions()
     await TaskEntity.epi.value.load_questions()
 
-    logger.info("🤖 Бот запущен")
-    await dp.start_polling(bot)
+    if answer_log:
+        await answer_log.start()
+    transport = create_invalidation_transport()
+    if transport is not None:
+        await invalidation_bus.start(transport)
+
+    instances = list(bot_instances.values())
+    task_managers = {instance.name: instance.task_manager for instance in instances}
+    # Сессии из снимка предыдущего процесса загружаются до приема обновлений, без чтений из БД
+    if SESSION_SNAPSHOT_PATH:
+        load_sessions(SESSION_SNAPSHOT_PATH, task_managers, SESSION_SNAPSHOT_MAX_AGE)
+
+    # Таблица users общая, поэтому таймеры незавершенных сессий восстанавливает только первый бот.
+    # Бот сессии по строке не определить: при нескольких ботах напоминания не восстанавливаются.
+    # В versioned воркеров несколько - восстанавливает тот, кто взял блокировку
+    if SESSION_STATE_MODE != "versioned" or await acquire_session_restore_lock():
+        await instances[0].task_manager.restore_session_timers(reminders=len(instances) == 1)
+    for instance in instances:
+        instance.task_manager.timers.start()
+    lag_monitor.start()
+    archiver.start()
+    handoff.start()
+    outbound.start()
+    if webapp_server:
+        webapp_server.start()
+
+    logger.info(f"🤖 Запущено ботов: {len(instances)} ({', '.join(instance.name for instance in instances)})")
+    try:
+        # SIGTERM/SIGINT останавливают polling; HTTP сессия нужна обработчикам до конца drain
+        await dp.start_polling(*(instance.bot for instance in instances), close_bot_session=False)
+    finally:
+        # Прием обновлений остановлен: дожидаемся начатых обработчиков и ответов с общим дедлайном
+        deadline = asyncio.get_running_loop().time() + SHUTDOWN_DRAIN_TIMEOUT
+        if webapp_server:
+            await webapp_server.stop()
+        await in_flight.drain(SHUTDOWN_DRAIN_TIMEOUT)
+        await response_pipeline.drain(max(deadline - asyncio.get_running_loop().time(), 0))
+        # Подтвержденные Senler старты записываются и отправляются до закрытия сессий БД и бота
+        await senler_starts.stop()
+        await outbound.drain(max(deadline - asyncio.get_running_loop().time(), 0))
+        await outbound.stop()
+        await lag_monitor.stop()
+        await archiver.stop()
+        await handoff.stop()
+        for instance in instances:
+            await instance.task_manager.timers.stop()
+        await release_session_restore_lock()
+        if SESSION_SNAPSHOT_PATH:
+            dump_sessions(SESSION_SNAPSHOT_PATH, task_managers)
+        await invalidation_bus.stop()
+        if answer_log:
+            await answer_log.stop()
+        if write_queue:
+            await write_queue.stop()
+        await session.close()
+        await close_http_client()
+        tracer.close()
 
 
 if __name__ == "__main__":
@@ -42,3 +215,5 @@ if __name__ == "__main__":
         asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("🛑 Бот остановлен")
+    finally:
+        stop_logging()
@@ -0,0 +1,88 @@
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, Message
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def markup_payload(reply_markup: Optional[InlineKeyboardMarkup]) -> str:
+    if reply_markup is None:
+        return ""
+    return reply_markup.model_dump_json(exclude_none=True)
+
+
+class MessageEditor:
+    """
+    Редактирование сообщений с учетом того, что уже отправлено.
+
+    Для каждого сообщения запоминается последний текст и клавиатура:
+    - ничего не изменилось - вызов не выполняется;
+    - изменилась только клавиатура - editMessageReplyMarkup без текста;
+    - иначе - editMessageText.
+    """
+
+    def __init__(self, max_messages: int = 10_000):
+        self.max_messages = max_messages
+        self.sent: "OrderedDict[Tuple[int, int, int], Tuple[str, str]]" = OrderedDict()
+
+    @staticmethod
+    def _key(message: Message) -> Tuple[int, int, int]:
+        # Личный чат пользователя общий для всех ботов, а номера сообщений у каждого бота свои
+        bot_id = message.bot.id if message.bot is not None else 0
+        return bot_id, message.chat.id, message.message_id
+
+    def _last_sent(self, message: Message) -> Optional[Tuple[str, str]]:
+        key = self._key(message)
+        if key in self.sent:
+            self.sent.move_to_end(key)
+            return self.sent[key]
+
+        # После перезапуска берем состояние из самого сообщения в колбэке
+        if getattr(message, "text", None) is not None:
+            return message.html_text, markup_payload(message.reply_markup)
+        return None
+
+    def _remember(self, message: Message, text: str, markup: str):
+        key = self._key(message)
+        self.sent[key] = (text, markup)
+        self.sent.move_to_end(key)
+        while len(self.sent) > self.max_messages:
+            self.sent.popitem(last=False)
+
+    def forget(self, message: Message):
+        self.sent.pop(self._key(message), None)
+
+    async def edit(self, message: Message, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None):
+        markup = markup_payload(reply_markup)
+        text_size = len(text.encode())
+        last = self._last_sent(message)
+
+        try:
+            if last == (text, markup):
+                metrics.inc("telegram_edits_skipped")
+                metrics.inc("telegram_calls_saved")
+                metrics.inc("telegram_bytes_saved", text_size + len(markup))
+            elif last is not None and last[0] == text:
+                await message.edit_reply_markup(reply_markup=reply_markup)
+                metrics.inc("telegram_edits_markup_only")
+                metrics.inc("telegram_bytes_sent", len(markup))
+                metrics.inc("telegram_bytes_saved", text_size)
+            else:
+                await message.edit_text(text, reply_markup=reply_markup)
+                metrics.inc("telegram_edits_full")
+                metrics.inc("telegram_bytes_sent", text_size + len(markup))
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
+            logger.debug(f"Сообщение {message.message_id} не изменилось")
+            metrics.inc("telegram_edits_not_modified")
+
+        self._remember(message, text, markup)
+
+
+message_editor = MessageEditor()
@@ -0,0 +1,207 @@
+from typing import Any, Awaitable, Callable, Dict, TYPE_CHECKING
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import CallbackQuery, TelegramObject, Update
+
+from config.const import MESSAGES
+from src.core.metrics import metric_labels
+from src.core.tracing import tracer
+from src.database.operations import commit_unit_of_work, shared_session, unit_of_work
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from src.bot.instances import BotInstance
+    from src.core.admission import AdmissionController
+    from src.core.drain import InFlightTracker
+    from src.core.throttle import FloodThrottle
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Корневой спан трассы на каждое обновление; время фильтров aiogram - разница с handler
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not tracer.enabled:
+            return await handler(event, data)
+
+        attributes = {"bot_id": data["bot"].id}
+        if isinstance(event, Update):
+            attributes.update(update_id=event.update_id, update_type=event.event_type)
+        with tracer.trace("update", **attributes):
+            return await handler(event, data)
+
+
+class HandlerTracingMiddleware(BaseMiddleware):
+    """
+    Спан выполнения хендлера после прохождения фильтров
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        with tracer.span("handler", handler=name):
+            return await handler(event, data)
+
+
+class TelegramTracingMiddleware(BaseRequestMiddleware):
+    """
+    Спан на каждый запрос к Telegram Bot API
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        with tracer.span(f"telegram.{type(method).__name__}"):
+            return await make_request(bot, method)
+
+
+class CommitBeforeRequestMiddleware(BaseRequestMiddleware):
+    """
+    COMMIT единицы работы перед каждым запросом к Telegram Bot API: блокировки строк, взятые
+    записями хендлера, не держатся на время сетевого запроса. В задачах ResponsePipeline сессию
+    используют параллельно, и фиксацию выполняют они сами
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if not shared_session.get():
+            await commit_unit_of_work()
+        return await make_request(bot, method)
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия БД на обновление Telegram.
+    Сессия доступна хендлерам как аргумент session, а get_or_create_user, update_user
+    и TaskManager подхватывают её сами; COMMIT выполняется перед запросами к Telegram
+    (CommitBeforeRequestMiddleware) и после хендлера.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with unit_of_work() as session:
+            data["session"] = session
+            return await handler(event, data)
+
+
+class BotContextMiddleware(BaseMiddleware):
+    """
+    Передает хендлерам TaskManager и настройки бота, получившего обновление,
+    и помечает метрики именем бота
+    """
+
+    def __init__(self, instances: Dict[int, "BotInstance"]):
+        self.instances = instances
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        instance = self.instances[data["bot"].id]
+        data["bot_instance"] = instance
+        data["task_manager"] = instance.task_manager
+
+        token = metric_labels.set({"bot": instance.name})
+        try:
+            return await handler(event, data)
+        finally:
+            metric_labels.reset(token)
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """
+    Регистрирует обновление в обработке, чтобы при остановке дождаться его завершения
+    """
+
+    def __init__(self, tracker: "InFlightTracker"):
+        self.tracker = tracker
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        with self.tracker.track():
+            return await handler(event, data)
+
+
+class AdmissionMiddleware(BaseMiddleware):
+    """
+    Откладывает хендлеры с флагом new_session (начало теста) при перегрузке:
+    пользователь получает просьбу повторить через минуту, остальные хендлеры не ограничиваются
+    """
+
+    def __init__(self, controller: "AdmissionController"):
+        self.controller = controller
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not get_flag(data, "new_session") or self.controller.admit_new_session():
+            return await handler(event, data)
+
+        if isinstance(event, CallbackQuery):
+            await event.answer(MESSAGES["overloaded"], show_alert=True)
+        else:
+            await event.answer(MESSAGES["overloaded"])
+        return None
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Отсекает обновления сверх лимита пользователя до сессии БД и хендлеров:
+    на колбэк - короткий ответ, сообщения отбрасываются молча
+    """
+
+    def __init__(self, throttle: "FloodThrottle"):
+        self.throttle = throttle
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None or self.throttle.check(user.id) is None:
+            return await handler(event, data)
+
+        if event.callback_query is not None:
+            try:
+                await event.callback_query.answer(MESSAGES["throttled"])
+            except Exception:
+                # Колбэк мог устареть; повторять или логировать каждый отказ флудеру не нужно
+                pass
+        return None
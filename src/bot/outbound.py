@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+
+from config.settings import OUTBOUND_MAX_QUEUE, OUTBOUND_RATE, OUTBOUND_WORKERS
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboundMessage:
+    bot: Bot
+    chat_id: int
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+    attempts: int = field(default=0)
+
+
+class OutboundSender:
+    """
+    Очередь сообщений, которые бот отправляет сам, а не в ответ на обновление.
+
+    submit не ждет Telegram: сообщение встает в очередь, workers отправляют его не чаще rate
+    в секунду на бота. RetryAfter от Telegram останавливает отправку этого бота на указанное время,
+    заблокировавшие бота пользователи пропускаются
+    """
+
+    def __init__(self, rate: float = 25, workers: int = 8, max_queue: int = 20_000, max_attempts: int = 3):
+        self.rate = rate
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.queue: "asyncio.Queue[OutboundMessage]" = asyncio.Queue(maxsize=max_queue)
+        # Время, раньше которого следующее сообщение бота не отправляется
+        self.next_send_at: Dict[int, float] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, bot: Bot, chat_id: int, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> bool:
+        """
+        Ставит сообщение в очередь; False - очередь заполнена
+        """
+        try:
+            self.queue.put_nowait(OutboundMessage(bot, chat_id, text, reply_markup))
+        except asyncio.QueueFull:
+            metrics.inc("outbound_rejected")
+            return False
+        metrics.set("outbound_queue", self.queue.qsize())
+        return True
+
+    async def _pace(self, bot: Bot):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        send_at = max(self.next_send_at.get(bot.id, now), now)
+        self.next_send_at[bot.id] = send_at + 1 / self.rate if self.rate > 0 else send_at
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+
+    async def _send(self, message: OutboundMessage):
+        await self._pace(message.bot)
+        try:
+            await message.bot.send_message(message.chat_id, message.text, reply_markup=message.reply_markup)
+            metrics.inc("outbound_sent")
+        except TelegramRetryAfter as e:
+            metrics.inc("outbound_retry_after")
+            loop = asyncio.get_running_loop()
+            self.next_send_at[message.bot.id] = max(
+                self.next_send_at.get(message.bot.id, 0), loop.time() + e.retry_after
+            )
+            message.attempts += 1
+            if message.attempts < self.max_attempts:
+                await self._send(message)
+            else:
+                metrics.inc("outbound_errors")
+                logger.error(f"Сообщение пользователю {message.chat_id} не отправлено: {e}")
+        except TelegramForbiddenError:
+            metrics.inc("outbound_blocked")
+        except Exception as e:
+            metrics.inc("outbound_errors")
+            logger.error(f"Сообщение пользователю {message.chat_id} не отправлено: {e}")
+
+    async def _worker(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await self._send(message)
+            finally:
+                self.queue.task_done()
+                metrics.set("outbound_queue", self.queue.qsize())
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def drain(self, timeout: Optional[float] = None) -> int:
+        """
+        Ждет отправки очереди не дольше timeout; возвращает число неотправленных сообщений
+        """
+        if self._tasks and self.queue.qsize():
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.queue.qsize()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.queue.qsize():
+            logger.warning(f"Не отправлено исходящих сообщений: {self.queue.qsize()}")
+
+
+outbound = OutboundSender(rate=OUTBOUND_RATE, workers=OUTBOUND_WORKERS, max_queue=OUTBOUND_MAX_QUEUE)
@@ -3,8 +3,7 @@ from datetime import datetime
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
 
-from config.const import PersonalDataStates, MESSAGES, AGE_MAX, AGE_MIN
-from src.bot.main import dp
+from config.const import PersonalDataStates, MESSAGES, AGE_MAX, AGE_MIN, dp
 from src.database.operations import get_or_create_user, update_user
 
 
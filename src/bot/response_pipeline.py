@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Optional, Set
+
+from aiogram.types import CallbackQuery
+
+from config.settings import RESPONSE_PIPELINE_MAX_IN_FLIGHT
+from src.core.metrics import metrics
+from src.database.operations import commit_unit_of_work, shared_session
+
+logger = logging.getLogger(__name__)
+
+
+class ResponsePipeline:
+    """
+    Ответ на нажатие кнопки без последовательных запросов к Telegram.
+
+    answerCallbackQuery отправляется первым, а редактирование сообщения и отложенные
+    записи в БД выполняются параллельно с ним. Число одновременных ответов ограничено,
+    задачи отслеживаются до завершения, ошибки работы пробрасываются в хендлер.
+    """
+
+    def __init__(self, max_in_flight: int = 1000):
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.tasks: Set[asyncio.Task] = set()
+
+    def _spawn(self, coro: Awaitable[Any]) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def respond(
+        self, callback: CallbackQuery, text: Optional[str] = None, *work: Awaitable[Any], show_alert: bool = False
+    ):
+        # Записи хендлера фиксируются до ответа: блокировки строк не держатся на время запросов к Telegram
+        await commit_unit_of_work()
+        async with self.slots:
+            token = shared_session.set(True)
+            try:
+                answer = self._spawn(callback.answer(text, show_alert=show_alert))
+                jobs = [self._spawn(coro) for coro in work]
+            finally:
+                shared_session.reset(token)
+            answer_result, *results = await asyncio.gather(answer, *jobs, return_exceptions=True)
+
+        metrics.inc("pipeline_responses")
+        if isinstance(answer_result, Exception):
+            # Просроченный колбэк не должен отменять редактирование и запись
+            metrics.inc("pipeline_answer_errors")
+            logger.warning(f"Не удалось ответить на колбэк {callback.id}: {answer_result}")
+
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            metrics.inc("pipeline_errors")
+            for error in errors[1:]:
+                logger.error(f"Ошибка при ответе на колбэк {callback.id}: {error}")
+            raise errors[0]
+
+    async def drain(self, timeout: Optional[float] = None) -> int:
+        """
+        Дожидается начатых ответов (не дольше timeout); возвращает число незавершенных
+        """
+        if not self.tasks:
+            return 0
+        _, pending = await asyncio.wait(set(self.tasks), timeout=timeout)
+        return len(pending)
+
+
+response_pipeline = ResponsePipeline(max_in_flight=RESPONSE_PIPELINE_MAX_IN_FLIGHT)
@@ -1,3 +1,5 @@
+from typing import Tuple
+
 from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
 from config.const import (
     TaskEntity,
@@ -9,13 +11,35 @@ from config.const import (
     INQ_LENGTH_SCORES_PER_QUESTION,
 )
 
-from main import task_manager
+from src.bot.message_editor import message_editor
+from src.core.task_manager import TaskManager
+from src.core.tracing import traced
+
+
+def welcome_message() -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Первое сообщение бота: ответ на /start и старт из воронки Senler
+    """
+    text = (
+        "🎯 <b>Добро пожаловать в тест 'Стили мышления'!</b>\n\n"
+        "Этот тест поможет определить ваш доминирующий стиль мышления "
+        "и лучше понять ваши предпочтения в принятии решений.\n\n"
+        "📊 Состоит из трех тестов\n"
+        "⏱️ Займет около 15-20 минут\n"
+        "🎁 В конце получите персональный анализ\n\n"
+        "<i>Для начала нам нужно собрать немного информации о вас.</i>"
+    )
+    markup = InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text=MESSAGES["button_start"], callback_data="start_personal_data")]]
+    )
+    return text, markup
 
 
-async def send_priorities_task(message: Message, user_id: int):
+@traced("render.priorities")
+async def send_priorities_task(message: Message, task_manager: TaskManager, user_id: int):
     question = TaskEntity.priorities.value.get_question()
     if not question:
-        await message.edit_text(MESSAGES["task_not_loaded"])
+        await message_editor.edit(message, MESSAGES["task_not_loaded"])
         return
 
     text = f"<b>Тест 1✅ из 3: Расстановка приоритетов</b>\n\n"
@@ -59,13 +83,14 @@ async def send_priorities_task(message: Message, user_id: int):
             [InlineKeyboardButton(text=MESSAGES["button_finish_priority_task"], callback_data="complete_priorities")]
         )
 
-    await message.edit_text(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard))
+    await message_editor.edit(message, text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard))
 
 
-async def send_inq_question(message: Message, user_id: int, question_num: int):
+@traced("render.inq_question")
+async def send_inq_question(message: Message, task_manager: TaskManager, user_id: int, question_num: int):
     question = TaskEntity.inq.value.get_question(question_num)
     if not question:
-        await message.edit_text(MESSAGES["task_not_found"])
+        await message_editor.edit(message, MESSAGES["task_not_found"])
         return
 
     state = task_manager.get_task_state(user_id)
@@ -76,30 +101,25 @@ async def send_inq_question(message: Message, user_id: int, question_num: int):
     current_step = state["current_step"]
     next_score = INQ_SCORES_PER_QUESTION[current_step] if current_step < INQ_LENGTH_SCORES_PER_QUESTION else 1
 
+    # Текст вопроса не меняется между нажатиями: статус выбора живёт в клавиатуре,
+    # и на каждое нажатие уходит только editMessageReplyMarkup
     text = f"<b>Тест 2✅ из 3: Стили мышления</b>\n\n"
     text += f"📝 {question_num + 1} / {TaskEntity.inq.value.get_total_questions()}\n\n"
     text += f"{question['text']}\n\n"
+    text += f"<i>Выбирайте утверждения по очереди: первое получит {INQ_SCORES_PER_QUESTION[0]} баллов, "
+    text += f"следующее - {INQ_SCORES_PER_QUESTION[1]} и так далее.</i>"
 
-    if current_step == 0:
-        text += f"<b>Следующий балл: {next_score}</b>\n"
-        text += f"<i>Выберите утверждение, которому дашь {next_score} баллов:</i>"
-    else:
-        last_option = None
+    status = f"Следующий балл: {next_score}"
+    if current_step > 0:
         task_section = state["answers"].get("inq", {})
         question_key = f"question_{question_num + 1}"
-        if question_key in task_section:
-            for opt, score in task_section[question_key].items():
-                if score == INQ_SCORES_PER_QUESTION[current_step - 1]:
-                    last_option = opt
-                    break
-
-        if last_option:
-            text += f"✅ Вы дали {INQ_SCORES_PER_QUESTION[current_step - 1]} баллов утверждению {last_option}.\n\n"
-
-        text += f"<b>Следующий балл: {next_score}</b>\n"
-        text += f"<i>Выберите утверждение, которому дашь {next_score} баллов:</i>"
+        for opt, score in task_section.get(question_key, {}).items():
+            if score == INQ_SCORES_PER_QUESTION[current_step - 1]:
+                status = f"✅ {opt}: {score} б. · {status}"
+                break
 
     keyboard = []
+    keyboard.append([InlineKeyboardButton(text=status, callback_data="dummy")])
     keyboard.append(
         [
             InlineKeyboardButton(text=f"{option}️⃣", callback_data=f"inq_{question_num}_{option}")
@@ -110,18 +130,19 @@ async def send_inq_question(message: Message, user_id: int, question_num: int):
     if state and state["history"]:
         keyboard.append([InlineKeyboardButton(text=MESSAGES["button_go_back"], callback_data="go_back")])
 
-    await message.edit_text(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard))
+    await message_editor.edit(message, text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard))
 
 
+@traced("render.epi_question")
 async def send_epi_question(message: Message, user_id: int, question_num: int):
     question = TaskEntity.epi.value.get_question(question_num)
     if not question:
-        await message.edit_text(MESSAGES["task_not_found"])
+        await message_editor.edit(message, MESSAGES["task_not_found"])
         return
 
     total_questions = TaskEntity.epi.value.get_total_questions()
 
-    text = f"<b>Тест 3✅ из 3: Личностный тест</b>\n\n"
+    text = "<b>Тест 3✅ из 3: Личностный тест</b>\n\n"
     text += f"📝 {question_num + 1} / {total_questions}\n\n"
     text += f"{question['text']}"
 
@@ -132,4 +153,46 @@ async def send_epi_question(message: Message, user_id: int, question_num: int):
         ]
     ]
 
-    await message.edit_text(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard))
+    await message_editor.edit(message, text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard))
+
+
+@traced("render.epi_page")
+async def send_epi_page(message: Message, task_manager: TaskManager, user_id: int, page_start: int):
+    page = task_manager.epi_page(page_start)
+    if not page:
+        await message_editor.edit(message, MESSAGES["task_not_found"])
+        return
+
+    total_questions = TaskEntity.epi.value.get_total_questions()
+    state = task_manager.get_task_state(user_id)
+    selected = state.get("epi_page", {}) if state else {}
+
+    text = "<b>Тест 3✅ из 3: Личностный тест</b>\n\n"
+    text += f"📝 {page.start + 1}–{page.stop} / {total_questions}\n\n"
+
+    # Выбор ответа меняет только клавиатуру: текст страницы один и тот же до "Далее"
+    keyboard = []
+    for question_num in page:
+        question = TaskEntity.epi.value.get_question(question_num)
+        text += f"<b>{question_num + 1}.</b> {question['text']}\n\n"
+
+        chosen = selected.get(str(question_num + 1))
+        keyboard.append(
+            [
+                InlineKeyboardButton(
+                    text=f"{question_num + 1}. {label}{' ✅' if chosen == answer else ''}",
+                    callback_data=f"epit_{page.start}_{question_num}_{answer}",
+                )
+                for answer, label in zip(
+                    AnswerOptions.epi.value, (MESSAGES["button_epi_yes"], MESSAGES["button_epi_no"])
+                )
+            ]
+        )
+
+    answered = sum(str(question_num + 1) in selected for question_num in page)
+    submit = MESSAGES["button_epi_page_next"] if page.stop < total_questions else MESSAGES["button_epi_page_finish"]
+    keyboard.append(
+        [InlineKeyboardButton(text=f"{submit} ({answered}/{len(page)})", callback_data=f"epin_{page.start}")]
+    )
+
+    await message_editor.edit(message, text.rstrip(), reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard))
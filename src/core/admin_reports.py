@@ -2,10 +2,11 @@ import logging
 from typing import Dict
 import asyncio
 
-import httpx
 import random
 
 from config.settings import ADMIN_USER_ID, BOT_TOKEN
+from src.core.http_client import get_http_client
+from src.core.norms import norms
 from src.database.models import User
 
 logger = logging.getLogger(__name__)
@@ -91,7 +92,7 @@ class AdminReports:
         sorted_scores = sorted(numeric_scores.items(), key=lambda x: x[1], reverse=True)
 
         for style_key, score in sorted_scores:
-            report += f"• {style_key}: {score} баллов\n"
+            report += f"• {style_key}: {score} баллов{norms.format_top(style_key, score)}\n"
 
         for style_key, value in text_scores.items():
             report += f"• {style_key}: {value}\n"
@@ -105,9 +106,11 @@ class AdminReports:
         self.counter += 1
         return report
 
-    async def send_to_admin(self, user_data: User, scores: Dict[str, int]) -> bool:
+    async def send_to_admin(
+        self, user_data: User, scores: Dict[str, int], bot_token: str = BOT_TOKEN, admin_user_id: int = ADMIN_USER_ID
+    ) -> bool:
 
-        if not ADMIN_USER_ID or ADMIN_USER_ID == 0:
+        if not admin_user_id or admin_user_id == 0:
             logger.warning("ADMIN_USER_ID не настроен - отчет не отправлен")
             return False
 
@@ -118,47 +121,46 @@ class AdminReports:
             try:
                 report = self.format_admin_report(user_data, scores)
 
-                url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+                url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
 
                 payload = {
-                    "chat_id": ADMIN_USER_ID,
+                    "chat_id": admin_user_id,
                     "text": report,
                     "parse_mode": "HTML",
                     "disable_web_page_preview": True,
                 }
 
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(url, json=payload, timeout=30)
-
-                    if response.status_code == 200:
-                        logger.info(f"Отчет отправлен администратору для пользователя {user_data.user_id}")
-                        return True
-                    elif response.status_code == 429:
-                        # Rate limit exceeded
-                        try:
-                            response_data = response.json()
-                            retry_after = response_data.get("parameters", {}).get("retry_after", 60)
-                        except:
-                            retry_after = 60
-
-                        logger.warning(f"Rate limit (попытка {attempt + 1}/{max_retries}). Жду {retry_after} секунд...")
-
-                        if attempt < max_retries - 1:  # Не ждем на последней попытке
-                            await asyncio.sleep(retry_after)
-                            continue
-                        else:
-                            logger.error(f"Превышен лимит попыток отправки отчета для пользователя {user_data.user_id}")
-                            return False
+                response = await get_http_client().post(url, json=payload, timeout=30)
+
+                if response.status_code == 200:
+                    logger.info(f"Отчет отправлен администратору для пользователя {user_data.user_id}")
+                    return True
+                elif response.status_code == 429:
+                    # Rate limit exceeded
+                    try:
+                        response_data = response.json()
+                        retry_after = response_data.get("parameters", {}).get("retry_after", 60)
+                    except:
+                        retry_after = 60
+
+                    logger.warning(f"Rate limit (попытка {attempt + 1}/{max_retries}). Жду {retry_after} секунд...")
+
+                    if attempt < max_retries - 1:  # Не ждем на последней попытке
+                        await asyncio.sleep(retry_after)
+                        continue
                     else:
-                        logger.error(f"Ошибка отправки отчета администратору: {response.status_code} - {response.text}")
-
-                        # Для других ошибок делаем экспоненциальную задержку
-                        if attempt < max_retries - 1:
-                            delay = base_delay * (2**attempt)
-                            logger.info(f"Повторная попытка через {delay} секунд...")
-                            await asyncio.sleep(delay)
-                            continue
+                        logger.error(f"Превышен лимит попыток отправки отчета для пользователя {user_data.user_id}")
                         return False
+                else:
+                    logger.error(f"Ошибка отправки отчета администратору: {response.status_code} - {response.text}")
+
+                    # Для других ошибок делаем экспоненциальную задержку
+                    if attempt < max_retries - 1:
+                        delay = base_delay * (2**attempt)
+                        logger.info(f"Повторная попытка через {delay} секунд...")
+                        await asyncio.sleep(delay)
+                        continue
+                    return False
 
             except Exception as e:
                 logger.error(f"Ошибка при отправке отчета администратору (попытка {attempt + 1}/{max_retries}): {e}")
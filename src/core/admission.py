@@ -0,0 +1,59 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, List
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Signal:
+    name: str
+    read: Callable[[], float]
+    threshold: float
+
+
+class AdmissionController:
+    """
+    Допуск новых сессий при перегрузке.
+
+    Сигналы (задержка цикла событий, ожидание соединения из пула, очередь исходящих запросов)
+    сравниваются с порогами; если хотя бы один превышен, новая сессия откладывается,
+    а ответы уже начатых тестов обрабатываются как обычно.
+    """
+
+    def __init__(self):
+        self.signals: List[Signal] = []
+
+    def add_signal(self, name: str, read: Callable[[], float], threshold: float):
+        """
+        Регистрирует сигнал; порог 0 выключает его
+        """
+        if threshold <= 0:
+            return
+        self.signals.append(Signal(name, read, threshold))
+        metrics.set("admission_threshold", threshold, signal=name)
+
+    def overload_reasons(self) -> List[str]:
+        reasons = []
+        for signal in self.signals:
+            value = signal.read()
+            metrics.set("admission_signal", round(value, 1), signal=signal.name)
+            if value > signal.threshold:
+                reasons.append(signal.name)
+        return reasons
+
+    def admit_new_session(self) -> bool:
+        reasons = self.overload_reasons()
+        if not reasons:
+            metrics.inc("admission_admitted")
+            return True
+
+        for reason in reasons:
+            metrics.inc("admission_shed", reason=reason)
+        logger.info(f"Новая сессия отложена из-за перегрузки: {', '.join(reasons)}")
+        return False
+
+
+admission = AdmissionController()
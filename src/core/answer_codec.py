@@ -0,0 +1,208 @@
+import math
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from config.const import AnswerOptions, INQ_SCORES_PER_QUESTION, PRIORITY_CATEGORIES, TaskSection
+
+# Упакованные ответы: [версия][маска разделов] и разделы в порядке priorities, inq, epi.
+#   priorities: 1 байт - номер перестановки 4 категорий по баллам (0..23);
+#               неполный раздел - 0xFF и 2 байта: балл каждой категории цифрой по основанию 5 (0 - нет балла)
+#   inq:        1 байт n - число первых полностью отвеченных вопросов, n байт - номера перестановок
+#               5 вариантов по шагам выбора (0..119); затем 0xFF или неполный вопрос n+1: число выбранных
+#               вариантов k и номер их упорядоченной выборки
+#   epi:        1 байт n - число ответов на вопросы 1..n подряд, затем ceil(n/8) байт битов (1 - "Да")
+CODEC_VERSION = 1
+
+SECTION_MASKS = {TaskSection.priorities.value: 1, TaskSection.inq.value: 2, TaskSection.epi.value: 4}
+
+NO_VALUE = 0xFF
+
+PackedAnswers = Union[bytes, bytearray, memoryview]
+
+
+class AnswerCodecError(ValueError):
+    """
+    Ответы не укладываются в упакованный формат (нестандартная структура или неизвестная версия)
+    """
+
+
+def rank_partial(sequence: Sequence, items: Sequence) -> int:
+    """
+    Номер упорядоченной выборки sequence из items (код Лемера): от 0 до perm(len(items), len(sequence)) - 1
+    """
+    remaining = list(items)
+    rank = 0
+    for position, item in enumerate(sequence):
+        index = remaining.index(item)
+        rank += index * math.perm(len(remaining) - 1, len(sequence) - position - 1)
+        remaining.pop(index)
+    return rank
+
+
+def unrank_partial(rank: int, length: int, items: Sequence) -> List:
+    remaining = list(items)
+    sequence = []
+    for position in range(length):
+        index, rank = divmod(rank, math.perm(len(remaining) - 1, length - position - 1))
+        sequence.append(remaining.pop(index))
+    return sequence
+
+
+def _encode_priorities(priorities: Dict[str, Any]) -> bytes:
+    scores = AnswerOptions.priorities.value
+    unknown = set(priorities) - set(PRIORITY_CATEGORIES)
+    if unknown:
+        raise AnswerCodecError(f"Неизвестные категории приоритетов: {sorted(unknown)}")
+    if any(score not in scores for score in priorities.values()) or len(set(priorities.values())) != len(priorities):
+        raise AnswerCodecError("Баллы приоритетов должны быть разными и из допустимых")
+
+    if len(priorities) == len(PRIORITY_CATEGORIES):
+        by_score = {score: category for category, score in priorities.items()}
+        return bytes([rank_partial([by_score[score] for score in scores], PRIORITY_CATEGORIES)])
+
+    digits = 0
+    for category in reversed(PRIORITY_CATEGORIES):
+        score = priorities.get(category)
+        digits = digits * 5 + (scores.index(score) + 1 if score is not None else 0)
+    return bytes([NO_VALUE]) + digits.to_bytes(2, "big")
+
+
+def _decode_priorities(data: memoryview, offset: int) -> Tuple[Dict[str, int], int]:
+    scores = AnswerOptions.priorities.value
+    if data[offset] != NO_VALUE:
+        order = unrank_partial(data[offset], len(scores), PRIORITY_CATEGORIES)
+        return {category: scores[index] for index, category in enumerate(order)}, offset + 1
+
+    digits = int.from_bytes(data[offset + 1 : offset + 3], "big")
+    priorities = {}
+    for category in PRIORITY_CATEGORIES:
+        digits, digit = divmod(digits, 5)
+        if digit:
+            priorities[category] = scores[digit - 1]
+    return priorities, offset + 3
+
+
+def _inq_order(question_answers: Dict[str, Any]) -> List[str]:
+    """
+    Варианты вопроса в порядке выбора: балл однозначно задает шаг (INQ_SCORES_PER_QUESTION)
+    """
+    options = AnswerOptions.inq.value
+    by_step = {}
+    for option, score in question_answers.items():
+        if option not in options or score not in INQ_SCORES_PER_QUESTION:
+            raise AnswerCodecError(f"Недопустимый ответ INQ: {option}={score}")
+        by_step[INQ_SCORES_PER_QUESTION.index(score)] = option
+    if sorted(by_step) != list(range(len(question_answers))):
+        raise AnswerCodecError("Баллы INQ вопроса должны идти по шагам без пропусков")
+    return [by_step[step] for step in range(len(by_step))]
+
+
+def _encode_inq(inq: Dict[str, Dict[str, Any]]) -> bytes:
+    options = AnswerOptions.inq.value
+    complete = []
+    while len(inq.get(f"question_{len(complete) + 1}", {})) == len(options):
+        complete.append(rank_partial(_inq_order(inq[f"question_{len(complete) + 1}"]), options))
+
+    partial_key = f"question_{len(complete) + 1}"
+    if set(inq) - {f"question_{num}" for num in range(1, len(complete) + 1)} - {partial_key}:
+        raise AnswerCodecError("Вопросы INQ должны быть отвечены по порядку")
+    if len(complete) >= NO_VALUE:
+        raise AnswerCodecError("Слишком много вопросов INQ")
+
+    if partial_key in inq:
+        order = _inq_order(inq[partial_key])
+        trailer = bytes([len(order), rank_partial(order, options)])
+    else:
+        trailer = bytes([NO_VALUE])
+    return bytes([len(complete), *complete]) + trailer
+
+
+def _inq_question(order: List[str]) -> Dict[str, int]:
+    return {option: INQ_SCORES_PER_QUESTION[step] for step, option in enumerate(order)}
+
+
+def _decode_inq(data: memoryview, offset: int) -> Tuple[Dict[str, Dict[str, int]], int]:
+    options = AnswerOptions.inq.value
+    count = data[offset]
+    inq = {}
+    for num in range(1, count + 1):
+        inq[f"question_{num}"] = _inq_question(unrank_partial(data[offset + num], len(options), options))
+    offset += count + 1
+
+    if data[offset] == NO_VALUE:
+        return inq, offset + 1
+    length, rank = data[offset], data[offset + 1]
+    inq[f"question_{count + 1}"] = _inq_question(unrank_partial(rank, length, options))
+    return inq, offset + 2
+
+
+def _encode_epi(epi: Dict[str, Any]) -> bytes:
+    yes = AnswerOptions.epi.value[0]
+    if set(epi) != {str(num) for num in range(1, len(epi) + 1)} or len(epi) >= NO_VALUE:
+        raise AnswerCodecError("Вопросы EPI должны быть отвечены по порядку")
+    if any(answer not in AnswerOptions.epi.value for answer in epi.values()):
+        raise AnswerCodecError("Недопустимый ответ EPI")
+
+    bits = sum(1 << (num - 1) for num in range(1, len(epi) + 1) if epi[str(num)] == yes)
+    return bytes([len(epi)]) + bits.to_bytes((len(epi) + 7) // 8, "little")
+
+
+def _decode_epi(data: memoryview, offset: int) -> Tuple[Dict[str, str], int]:
+    yes, no = AnswerOptions.epi.value
+    count = data[offset]
+    size = (count + 7) // 8
+    bits = int.from_bytes(data[offset + 1 : offset + 1 + size], "little")
+    epi = {str(num): yes if bits >> (num - 1) & 1 else no for num in range(1, count + 1)}
+    return epi, offset + 1 + size
+
+
+SECTION_CODECS = {
+    TaskSection.priorities.value: (_encode_priorities, _decode_priorities),
+    TaskSection.inq.value: (_encode_inq, _decode_inq),
+    TaskSection.epi.value: (_encode_epi, _decode_epi),
+}
+
+
+def encode_answers(answers: Dict[str, Any]) -> bytes:
+    """
+    Упаковывает ответы в формате answers_json; AnswerCodecError, если структура нестандартная
+    """
+    if not isinstance(answers, dict) or not set(answers) <= set(SECTION_CODECS):
+        raise AnswerCodecError("Неизвестные разделы ответов")
+
+    mask = 0
+    body = b""
+    for section, (encode, _) in SECTION_CODECS.items():
+        if section in answers:
+            if not isinstance(answers[section], dict):
+                raise AnswerCodecError(f"Раздел {section} должен быть словарем")
+            mask |= SECTION_MASKS[section]
+            body += encode(answers[section])
+    return bytes([CODEC_VERSION, mask]) + body
+
+
+def decode_answers(data: PackedAnswers) -> Dict[str, Any]:
+    """
+    Распаковывает ответы обратно в формат answers_json
+    """
+    data = memoryview(data)
+    if len(data) < 2 or data[0] != CODEC_VERSION:
+        raise AnswerCodecError(f"Неизвестная версия упакованных ответов: {data[0] if len(data) else None}")
+
+    answers = {}
+    offset = 2
+    try:
+        for section, (_, decode) in SECTION_CODECS.items():
+            if data[1] & SECTION_MASKS[section]:
+                answers[section], offset = decode(data, offset)
+    except IndexError:
+        raise AnswerCodecError("Упакованные ответы обрезаны")
+    return answers
+
+
+def as_answers_dict(answers: Union[Dict[str, Any], PackedAnswers]) -> Dict[str, Any]:
+    """
+    Ответы для подсчета баллов: словарь как есть, упакованные - распаковываются
+    """
+    if isinstance(answers, (bytes, bytearray, memoryview)):
+        return decode_answers(answers)
+    return answers
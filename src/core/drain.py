@@ -0,0 +1,47 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Set
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightTracker:
+    """
+    Обновления, которые сейчас обрабатываются: при остановке их дожидаются с дедлайном,
+    чтобы не потерять начатые записи состояния
+    """
+
+    def __init__(self):
+        self.tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        task = asyncio.current_task()
+        self.tasks.add(task)
+        try:
+            yield
+        finally:
+            self.tasks.discard(task)
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Ждет начатые обработчики не дольше timeout; возвращает число незавершенных
+        """
+        if not self.tasks:
+            return 0
+
+        logger.info(f"Ожидание обработчиков: {len(self.tasks)}")
+        _, pending = await asyncio.wait(set(self.tasks), timeout=timeout)
+        if pending:
+            metrics.inc("drain_abandoned", len(pending))
+            logger.warning(f"Не дождались обработчиков за {timeout} с: {len(pending)}")
+        return len(pending)
+
+
+in_flight = InFlightTracker()
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from config.settings import (
+    SENLER_HANDOFF_BACKOFF_MAX_SECONDS,
+    SENLER_HANDOFF_BACKOFF_SECONDS,
+    SENLER_HANDOFF_BATCH_SIZE,
+    SENLER_HANDOFF_CONCURRENCY,
+    SENLER_HANDOFF_MAX_ATTEMPTS,
+    SENLER_HANDOFF_POLL_SECONDS,
+    SENLER_HANDOFF_STEP,
+    SENLER_HANDOFF_TIMEOUT_SECONDS,
+    SENLER_HANDOFF_TOKEN,
+    SENLER_HANDOFF_URL,
+)
+from src.core.http_client import get_http_client
+from src.core.metrics import metrics
+from src.database.handoff_queue import (
+    claim_handoffs,
+    delete_handoffs,
+    enqueue_handoff,
+    fail_handoffs,
+    reschedule_handoffs,
+)
+from src.database.operations import run_after_commit
+
+logger = logging.getLogger(__name__)
+
+# Ответы, после которых повтор бессмысленен: запрос отклонен, а не потерян
+PERMANENT_STATUSES = range(400, 500)
+RETRYABLE_STATUSES = (408, 425, 429)
+
+
+class HandoffDispatcher:
+    """
+    Передача завершивших тест пользователей обратно в воронку Senler.
+
+    complete_all_tasks только добавляет строку в handoff_queue в своей транзакции, поэтому экран
+    результата не ждет внешний API. Фоновый цикл забирает события пачками, отправляет их через общий
+    keep-alive пул HTTP не более concurrency запросов на адрес, повторяет сбои с экспоненциальной
+    задержкой и удаляет доставленные. Доставка - "хотя бы один раз": event_id позволяет получателю
+    отбросить повтор
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: str = "",
+        step: str = "",
+        batch_size: int = 1,
+        concurrency: int = 4,
+        max_attempts: int = 8,
+        backoff_base: float = 2,
+        backoff_max: float = 600,
+        poll_interval: float = 5,
+        timeout: float = 10,
+        client_factory: Callable[[], httpx.AsyncClient] = get_http_client,
+    ):
+        self.url = url
+        self.token = token
+        self.step = step
+        self.batch_size = max(batch_size, 1)
+        self.concurrency = max(concurrency, 1)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.client_factory = client_factory
+        # Событие с отправкой занимает строку на время запроса с запасом
+        self.lease_seconds = timeout * 2 + 5
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    async def enqueue(self, user: Any, temperament: Optional[str]):
+        """
+        Ставит пользователя в очередь передачи; ошибки не мешают показать результат
+        """
+        if not self.enabled:
+            return
+        payload = {
+            "user_id": user.user_id,
+            "username": user.username,
+            "step": self.step,
+            "temperament": temperament,
+            "completed_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        try:
+            await enqueue_handoff(self.url, user.user_id, payload)
+        except Exception as e:
+            metrics.inc("handoff_enqueue_errors")
+            logger.error(f"Передача в Senler не поставлена в очередь: пользователь {user.user_id}: {e}")
+            return
+        metrics.inc("handoff_enqueued")
+        # Строка видна циклу отправки только после COMMIT обновления
+        run_after_commit(self._wakeup.set)
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_base * 2**attempts, self.backoff_max)
+        return delay * random.uniform(0.5, 1)
+
+    def _semaphore(self, endpoint: str) -> asyncio.Semaphore:
+        if endpoint not in self.semaphores:
+            self.semaphores[endpoint] = asyncio.Semaphore(self.concurrency)
+        return self.semaphores[endpoint]
+
+    async def run_once(self) -> int:
+        """
+        Одна пачка: забирает события, время которых наступило, и отправляет; возвращает их число
+        """
+        events = await claim_handoffs(self.batch_size * self.concurrency, self.lease_seconds)
+        by_endpoint: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            by_endpoint.setdefault(event["endpoint"], []).append(event)
+
+        await asyncio.gather(
+            *(
+                self._deliver(endpoint, endpoint_events[start : start + self.batch_size])
+                for endpoint, endpoint_events in by_endpoint.items()
+                for start in range(0, len(endpoint_events), self.batch_size)
+            )
+        )
+        return len(events)
+
+    def _body(self, batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+        events = [{**event["payload"], "event_id": event["id"]} for event in batch]
+        return events[0] if self.batch_size == 1 else {"events": events}
+
+    async def _deliver(self, endpoint: str, batch: List[Dict[str, Any]]):
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        status, retry_after = None, 0.0
+        async with self._semaphore(endpoint):
+            started = time.perf_counter()
+            try:
+                response = await self.client_factory().post(
+                    endpoint, json=self._body(batch), headers=headers, timeout=self.timeout
+                )
+                status = response.status_code
+                error = None if status < 300 else f"HTTP {status}: {response.text[:200]}"
+                retry_after = float(response.headers.get("Retry-After", 0) or 0)
+            except (httpx.HTTPError, ValueError) as e:
+                error = f"{type(e).__name__}: {e}"
+            metrics.set("handoff_request_seconds", round(time.perf_counter() - started, 3))
+
+        ids = [event["id"] for event in batch]
+        if error is None:
+            await delete_handoffs(ids)
+            now = datetime.now()
+            for event in batch:
+                latency = (now - event["created_at"]).total_seconds()
+                metrics.inc("handoff_delivery_seconds_sum", latency)
+                metrics.set("handoff_last_delivery_seconds", round(latency, 3))
+            metrics.inc("handoff_delivered", len(batch))
+            return
+
+        permanent = status in PERMANENT_STATUSES and status not in RETRYABLE_STATUSES
+        exhausted = [event for event in batch if permanent or event["attempts"] + 1 >= self.max_attempts]
+        retry = [event for event in batch if event not in exhausted]
+        metrics.inc("handoff_errors", reason=str(status) if status else "network")
+        if exhausted:
+            await fail_handoffs([event["id"] for event in exhausted], error)
+            metrics.inc("handoff_failed", len(exhausted))
+            logger.error(f"Передача в Senler не доставлена: {len(exhausted)} событий, {error}")
+        if retry:
+            delays = [max(self.backoff(event["attempts"]), retry_after) for event in retry]
+            await reschedule_handoffs([event["id"] for event in retry], delays, error)
+            metrics.inc("handoff_retries", len(retry))
+            logger.warning(f"Передача в Senler будет повторена: {len(retry)} событий, {error}")
+
+    async def _loop(self):
+        while True:
+            try:
+                claimed = await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка отправки передач в Senler: {e}")
+                claimed = 0
+            # Полная пачка - очередь не разобрана, следующая сразу
+            if claimed >= self.batch_size * self.concurrency:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None and self.enabled:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """
+        Неотправленные события остаются в очереди и уйдут после рестарта
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+handoff = HandoffDispatcher(
+    url=SENLER_HANDOFF_URL,
+    token=SENLER_HANDOFF_TOKEN,
+    step=SENLER_HANDOFF_STEP,
+    batch_size=SENLER_HANDOFF_BATCH_SIZE,
+    concurrency=SENLER_HANDOFF_CONCURRENCY,
+    max_attempts=SENLER_HANDOFF_MAX_ATTEMPTS,
+    backoff_base=SENLER_HANDOFF_BACKOFF_SECONDS,
+    backoff_max=SENLER_HANDOFF_BACKOFF_MAX_SECONDS,
+    poll_interval=SENLER_HANDOFF_POLL_SECONDS,
+    timeout=SENLER_HANDOFF_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,40 @@
+from typing import Optional
+
+import httpx
+
+from config.settings import HTTP_MAX_CONNECTIONS
+from src.core.tracing import tracer
+
+
+class TracingTransport(httpx.AsyncHTTPTransport):
+    """
+    Спан на каждый исходящий HTTP запрос
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with tracer.span("http.request", method=request.method, host=request.url.host) as span:
+            response = await super().handle_async_request(request)
+            if span is not None:
+                span.set(status_code=response.status_code)
+            return response
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Общий пул HTTP соединений процесса (отчеты администратору и внешние API)
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+        _client = httpx.AsyncClient(timeout=30, transport=TracingTransport(limits=limits))
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
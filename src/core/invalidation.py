@@ -0,0 +1,289 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import socket
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from sqlalchemy.engine import make_url
+
+from config.settings import (
+    DATABASE_URL,
+    INVALIDATION_BUS,
+    INVALIDATION_CHANNEL,
+    INVALIDATION_FLUSH_MS,
+    INVALIDATION_MAX_KEYS,
+    INVALIDATION_SOCKET_DIR,
+)
+from src.core.metrics import metrics
+from src.core.tracing import create_background_task
+
+logger = logging.getLogger(__name__)
+
+# Темы инвалидации: ключ - user_id, название банка вопросов; без ключа - вся тема
+TOPIC_USER = "user"
+TOPIC_QUESTIONS = "questions"
+TOPIC_NORMS = "norms"
+
+# Полезная нагрузка NOTIFY ограничена 8000 байт; ключи сверх лимита делятся на несколько сообщений
+MAX_PAYLOAD_BYTES = 7000
+
+Handler = Callable[[Optional[Set[str]]], Union[None, Awaitable[None]]]
+OnMessage = Callable[[Union[str, bytes]], None]
+
+
+class PostgresNotifyTransport:
+    """
+    LISTEN/NOTIFY на отдельном соединении asyncpg. После обрыва соединение восстанавливается,
+    а подписчикам приходит инвалидация всех тем: пропущенные сообщения не восстановить
+    """
+
+    def __init__(self, dsn: str, channel: str, reconnect_delay: float = 1.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.connection = None
+        self.on_message: Optional[OnMessage] = None
+        self.on_reconnect: Optional[Callable[[], None]] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self, on_message: OnMessage, on_reconnect: Callable[[], None]):
+        self.on_message = on_message
+        self.on_reconnect = on_reconnect
+        await self._connect()
+
+    async def _connect(self):
+        import asyncpg
+
+        self.connection = await asyncpg.connect(self.dsn)
+        await self.connection.add_listener(self.channel, self._on_notify)
+        self.connection.add_termination_listener(self._on_terminated)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.on_message(payload)
+
+    def _on_terminated(self, connection):
+        if self._closing:
+            return
+        logger.warning("Соединение шины инвалидации потеряно, переподключение")
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._closing:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._connect()
+            except Exception as e:
+                logger.error(f"Шина инвалидации: переподключение не удалось: {e}")
+                continue
+            metrics.inc("invalidation_reconnects")
+            self.on_reconnect()
+            return
+
+    async def send(self, payload: str):
+        await self.connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    async def close(self):
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self.connection is not None:
+            await self.connection.close()
+
+
+class LocalSocketTransport:
+    """
+    Замена NOTIFY для SQLite (все процессы на одной машине): каждый процесс слушает свой
+    Unix datagram сокет в общем каталоге, сообщение рассылается во все сокеты каталога.
+    Сокеты завершившихся процессов удаляются при первой неудачной отправке
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.path = self.directory / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock"
+        self.sock: Optional[socket.socket] = None
+        self.on_message: Optional[OnMessage] = None
+
+    async def start(self, on_message: OnMessage, on_reconnect: Callable[[], None]):
+        self.on_message = on_message
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind(str(self.path))
+        asyncio.get_running_loop().add_reader(self.sock.fileno(), self._read)
+
+    def _read(self):
+        while True:
+            try:
+                payload = self.sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            self.on_message(payload)
+
+    async def send(self, payload: str):
+        data = payload.encode()
+        for path in self.directory.glob("*.sock"):
+            if path == self.path:
+                continue
+            try:
+                self.sock.sendto(data, str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                path.unlink(missing_ok=True)
+            except BlockingIOError:
+                # Получатель не успевает читать: сообщение теряется, как при переполнении очереди NOTIFY
+                metrics.inc("invalidation_dropped")
+
+    async def close(self):
+        if self.sock is not None:
+            asyncio.get_running_loop().remove_reader(self.sock.fileno())
+            self.sock.close()
+        self.path.unlink(missing_ok=True)
+
+
+class InvalidationBus:
+    """
+    Шина инвалидации кэшей между процессами. Публикации копятся flush_interval секунд
+    и уходят одним сообщением на тему: повторы ключа схлопываются, а больше max_keys ключей
+    заменяются инвалидацией всей темы. Собственные сообщения процесса игнорируются
+    """
+
+    def __init__(self, flush_interval: float = 0.05, max_keys: int = 500):
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self.origin = uuid.uuid4().hex[:12]
+        self.transport = None
+        self.handlers: Dict[str, List[Handler]] = {}
+        # Ключи, ожидающие отправки; None - вся тема
+        self.pending: Dict[str, Optional[Set[str]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._dispatch_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.transport is not None
+
+    def subscribe(self, topic: str, handler: Handler):
+        """
+        handler(keys) вызывается на инвалидацию темы из другого процесса; keys None - вся тема
+        """
+        self.handlers.setdefault(topic, []).append(handler)
+
+    async def start(self, transport):
+        self.transport = transport
+        await transport.start(self._on_message, self._on_reconnect)
+        logger.info(f"Шина инвалидации запущена: {type(transport).__name__}")
+
+    async def stop(self):
+        if self.transport is None:
+            return
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        await self.flush()
+        await self.transport.close()
+        self.transport = None
+
+    def publish(self, topic: str, key: Any = None):
+        """
+        Инвалидация ключа темы (без ключа - всей темы) для других процессов
+        """
+        if self.transport is None:
+            return
+
+        metrics.inc("invalidation_published", topic=topic)
+        keys = self.pending.get(topic, set())
+        if key is None or keys is None:
+            self.pending[topic] = None
+        elif str(key) in keys:
+            metrics.inc("invalidation_coalesced")
+        else:
+            keys.add(str(key))
+            self.pending[topic] = None if len(keys) > self.max_keys else keys
+
+        if self._flush_task is None:
+            self._flush_task = create_background_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    def _payloads(self, topic: str, keys: Optional[Set[str]]) -> List[str]:
+        if keys is None:
+            return [json.dumps({"o": self.origin, "t": topic, "k": None})]
+
+        payloads, chunk, size = [], [], 0
+        for key in sorted(keys):
+            if chunk and size + len(key) + 3 > MAX_PAYLOAD_BYTES:
+                payloads.append(json.dumps({"o": self.origin, "t": topic, "k": chunk}))
+                chunk, size = [], 0
+            chunk.append(key)
+            size += len(key) + 3
+        payloads.append(json.dumps({"o": self.origin, "t": topic, "k": chunk}))
+        return payloads
+
+    async def flush(self):
+        pending, self.pending = self.pending, {}
+        for topic, keys in pending.items():
+            for payload in self._payloads(topic, keys):
+                try:
+                    await self.transport.send(payload)
+                    metrics.inc("invalidation_sent", topic=topic)
+                except Exception as e:
+                    metrics.inc("invalidation_send_errors")
+                    logger.error(f"Инвалидация {topic} не отправлена: {e}")
+
+    def _on_message(self, payload: Union[str, bytes]):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Шина инвалидации: нечитаемое сообщение")
+            return
+        if message.get("o") == self.origin:
+            return
+
+        topic = message["t"]
+        keys = set(message["k"]) if message["k"] is not None else None
+        metrics.inc("invalidation_received", topic=topic)
+        self._spawn(self.dispatch(topic, keys))
+
+    def _on_reconnect(self):
+        for topic in self.handlers:
+            self._spawn(self.dispatch(topic, None))
+
+    def _spawn(self, coro: Awaitable[None]):
+        task = asyncio.ensure_future(coro)
+        self._dispatch_tasks.add(task)
+        task.add_done_callback(self._dispatch_tasks.discard)
+
+    async def dispatch(self, topic: str, keys: Optional[Set[str]]):
+        for handler in self.handlers.get(topic, []):
+            try:
+                result = handler(keys)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Ошибка обработки инвалидации {topic}: {e}")
+
+
+def create_invalidation_transport(
+    kind: str = INVALIDATION_BUS, database_url: str = DATABASE_URL
+) -> Optional[Union[PostgresNotifyTransport, LocalSocketTransport]]:
+    """
+    Транспорт по INVALIDATION_BUS: postgres - NOTIFY в основной БД, socket - Unix сокеты
+    в INVALIDATION_SOCKET_DIR, off - шина выключена
+    """
+    if kind == "postgres":
+        dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresNotifyTransport(dsn, INVALIDATION_CHANNEL)
+    if kind == "socket":
+        return LocalSocketTransport(INVALIDATION_SOCKET_DIR)
+    if kind != "off":
+        raise ValueError(f"Неизвестный INVALIDATION_BUS: {kind}")
+    return None
+
+
+invalidation_bus = InvalidationBus(flush_interval=INVALIDATION_FLUSH_MS / 1000, max_keys=INVALIDATION_MAX_KEYS)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Deque, Optional
+
+from config.settings import LOOP_LAG_THRESHOLD_MS, LOOP_MONITOR_INTERVAL_MS, PROFILER_INTERVAL_MS
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def collapse_stack(frame) -> str:
+    """
+    Стек в формате collapsed (flamegraph.pl, speedscope): от корня к листу через ';'
+    """
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class SamplingProfiler:
+    """
+    Семплирующий профайлер потока цикла событий: из отдельного потока каждые interval секунд
+    снимает стек и считает одинаковые стеки
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.running = False
+
+    def _sample(self, thread_id: int, seconds: float) -> Counter:
+        counts = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                counts[collapse_stack(frame)] += 1
+            time.sleep(self.interval)
+        return counts
+
+    async def profile(self, seconds: float) -> str:
+        """
+        Профилирует цикл событий seconds секунд и возвращает стеки в формате collapsed
+        """
+        if self.running:
+            raise RuntimeError("Профилирование уже запущено")
+
+        self.running = True
+        try:
+            counts = await asyncio.get_running_loop().run_in_executor(
+                None, self._sample, threading.get_ident(), seconds
+            )
+        finally:
+            self.running = False
+
+        metrics.inc("profiler_runs")
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+@dataclass
+class BlockedCall:
+    started: float
+    duration: float
+    stack: str
+
+
+class LoopLagMonitor:
+    """
+    Непрерывный контроль задержки цикла событий.
+
+    Корутина-пульс отмечается каждые interval секунд и измеряет задержку своего пробуждения.
+    Сторожевой поток видит, что пульса нет дольше порога, и снимает стек потока цикла:
+    это и есть синхронный код, который его блокирует.
+    """
+
+    def __init__(self, threshold_ms: int = 0, interval: float = 0.02, max_blocks: int = 50):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.blocks: Deque[BlockedCall] = deque(maxlen=max_blocks)
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self.running or self.threshold <= 0:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"Контроль блокировок цикла событий включен: порог {self.threshold * 1000:.0f} мс")
+
+    async def stop(self):
+        if not self.running:
+            return
+
+        self._stop.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._thread.join(timeout=1)
+        self._thread = None
+        # Сигнал допуска читает lag: без контроля последнее измерение не должно отсекать новые сессии
+        self.lag = 0.0
+
+    async def set_threshold(self, threshold_ms: int):
+        """
+        Меняет порог без перезапуска процесса; 0 выключает контроль
+        """
+        self.threshold = threshold_ms / 1000
+        if self.threshold <= 0:
+            await self.stop()
+        else:
+            self.start()
+
+    async def _heartbeat(self):
+        while True:
+            self.last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.lag = max(time.monotonic() - self.last_beat - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, self.lag)
+
+    def _watch(self):
+        current: Optional[BlockedCall] = None
+        while not self._stop.wait(self.interval / 2):
+            stalled = time.monotonic() - self.last_beat - self.interval
+            if stalled <= self.threshold:
+                if current is not None:
+                    logger.warning(f"Цикл событий был заблокирован {current.duration * 1000:.0f} мс:\n{current.stack}")
+                current = None
+                continue
+
+            if current is None:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+                current = BlockedCall(started=time.time() - stalled, duration=stalled, stack=stack)
+                self.blocks.append(current)
+                metrics.inc("loop_blocked")
+            else:
+                current.duration = stalled
+
+    def format_status(self) -> str:
+        state = f"порог {self.threshold * 1000:.0f} мс" if self.running else "выключен"
+        return (
+            f"Контроль цикла событий: {state}\n"
+            f"Задержка: {self.lag * 1000:.1f} мс, максимум {self.max_lag * 1000:.1f} мс\n"
+            f"Блокировок: {len(self.blocks)}"
+        )
+
+
+profiler = SamplingProfiler(interval=PROFILER_INTERVAL_MS / 1000)
+lag_monitor = LoopLagMonitor(threshold_ms=LOOP_LAG_THRESHOLD_MS, interval=LOOP_MONITOR_INTERVAL_MS / 1000)
@@ -0,0 +1,56 @@
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Метки текущего контекста (например, bot="brand"), добавляются ко всем счетчикам
+metric_labels: ContextVar[Optional[Dict[str, str]]] = ContextVar("metric_labels", default=None)
+
+
+def metric_key(name: str, labels: Optional[Dict[str, str]] = None) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+
+class Metrics:
+    """
+    Простые счетчики процесса: вызовы Telegram API, отправленные байты, сэкономленные вызовы
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, float] = defaultdict(int)
+
+    def inc(self, name: str, value: int = 1, **labels: str):
+        context_labels = metric_labels.get()
+        if context_labels:
+            labels = {**context_labels, **labels}
+        self.counters[metric_key(name, labels)] += value
+
+    def set(self, name: str, value: float, **labels: str):
+        """
+        Текущее значение показателя (порог, задержка), а не счетчик
+        """
+        self.counters[metric_key(name, labels)] = value
+
+    def get(self, name: str, **labels: str) -> float:
+        return self.counters.get(metric_key(name, labels), 0)
+
+    def total(self, name: str) -> float:
+        """
+        Сумма счетчика по всем меткам
+        """
+        return sum(value for key, value in self.counters.items() if key == name or key.startswith(name + "{"))
+
+    def snapshot(self) -> Dict[str, float]:
+        return dict(sorted(self.counters.items()))
+
+    def reset(self):
+        self.counters.clear()
+
+    def format(self) -> str:
+        if not self.counters:
+            return "Метрик пока нет"
+        return "\n".join(f"{name}: {value}" for name, value in self.snapshot().items())
+
+
+metrics = Metrics()
@@ -0,0 +1,152 @@
+import logging
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+from config.const import EPI_SCALES, INQ_STYLES, TaskEntity
+from config.settings import NORMS_MIN_POPULATION, NORMS_REFRESH_SECONDS
+from src.database.archive import iter_completed_answers
+from src.database.operations import add_score_norms, increment_score_norms, load_score_norms, snapshot_session
+
+logger = logging.getLogger(__name__)
+
+NORM_METRICS = INQ_STYLES + EPI_SCALES
+
+
+def norm_values(scores: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Целые баллы по стилям INQ и шкалам EPI из результата complete_all_tasks
+    """
+    return {metric: int(scores[metric]) for metric in NORM_METRICS if isinstance(scores.get(metric), (int, float))}
+
+
+def score_answers(answers: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Баллы попытки тем же подсчетом, что и при завершении теста
+    """
+    scores = dict(TaskEntity.inq.value.calculate_scores(answers))
+    scores.update(TaskEntity.epi.value.calculate_scores(answers))
+    return scores
+
+
+class PopulationNorms:
+    """
+    Распределение баллов всей выборки по каждому стилю INQ и шкале EPI.
+
+    Баллы целые и ограниченные (INQ 18..90, EPI 0..24), поэтому гистограмма с шагом 1 точна
+    и не требует t-digest. Для каждого показателя хранится массив "сколько завершений с баллом
+    не ниже value", и "топ X%" вычисляется за O(1).
+    """
+
+    def __init__(self, min_population: int = 30, refresh_interval: float = 300):
+        self.min_population = min_population
+        self.refresh_interval = refresh_interval
+        self.counts: Dict[str, Counter] = defaultdict(Counter)
+        self.totals: Dict[str, int] = {}
+        self._at_least: Dict[str, List[int]] = {}
+        self._low: Dict[str, int] = {}
+        self.loaded_at: Optional[float] = None
+
+    def set_counts(self, counts: Dict[str, Dict[int, int]]):
+        self.counts = defaultdict(Counter, {metric: Counter(values) for metric, values in counts.items()})
+        self.totals.clear()
+        self._at_least.clear()
+        for metric in self.counts:
+            self._index(metric)
+
+    def _index(self, metric: str):
+        values = self.counts[metric]
+        low, high = min(values), max(values)
+        at_least = [0] * (high - low + 1)
+        running = 0
+        for value in range(high, low - 1, -1):
+            running += values.get(value, 0)
+            at_least[value - low] = running
+        self._low[metric] = low
+        self._at_least[metric] = at_least
+        self.totals[metric] = running
+
+    def add(self, values: Dict[str, int]):
+        for metric, value in values.items():
+            self.counts[metric][value] += 1
+            self._index(metric)
+
+    def top_percent(self, metric: str, value: float) -> Optional[float]:
+        """
+        Доля выборки с баллом не ниже value, %; None, пока выборка меньше min_population
+        """
+        total = self.totals.get(metric, 0)
+        if total < self.min_population:
+            return None
+
+        at_least = self._at_least[metric]
+        index = int(value) - self._low[metric]
+        if index < 0:
+            count = total
+        elif index >= len(at_least):
+            count = 0
+        else:
+            count = at_least[index]
+        return 100 * count / total
+
+    def format_top(self, metric: str, value: Any) -> str:
+        if not isinstance(value, (int, float)):
+            return ""
+        percent = self.top_percent(metric, value)
+        if percent is None:
+            return ""
+        return f" (топ {max(round(percent), 1)}%)"
+
+    async def load(self):
+        self.set_counts(await load_score_norms())
+        self.loaded_at = time.monotonic()
+        logger.info(f"Загружены нормы выборки: {max(self.totals.values(), default=0)} завершений")
+
+    async def refresh_if_stale(self):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.refresh_interval:
+            return
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Ошибка загрузки норм выборки: {e}")
+
+    async def record(self, scores: Dict[str, Any]):
+        """
+        Учитывает завершенный тест: в памяти сразу, в БД - одним запросом
+        """
+        values = norm_values(scores)
+        self.add(values)
+        try:
+            await increment_score_norms(values)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения норм выборки: {e}")
+
+
+async def rebuild_norms(batch_size: int = 1000) -> int:
+    """
+    Пересчитывает гистограммы по всем завершенным попыткам; возвращает число попыток.
+
+    Сохраненные гистограммы и ответы читаются из одного снимка БД, а записывается только разница
+    пересчета со снимком: завершения во время пересчета учитываются своими инкрементами ровно один раз
+    """
+    counts: Dict[str, Counter] = defaultdict(Counter)
+    attempts = 0
+    async with snapshot_session() as session:
+        stored = await load_score_norms(session)
+        async for batch in iter_completed_answers(session, batch_size):
+            for answers in batch:
+                for metric, value in norm_values(score_answers(answers)).items():
+                    counts[metric][value] += 1
+            attempts += len(batch)
+
+    delta: Dict[str, Counter] = {}
+    for metric in set(counts) | set(stored):
+        delta[metric] = Counter(counts.get(metric, {}))
+        delta[metric].subtract(stored.get(metric, {}))
+    await add_score_norms(delta)
+    await norms.load()
+    logger.info(f"Нормы выборки пересчитаны: {attempts} попыток")
+    return attempts
+
+
+norms = PopulationNorms(min_population=NORMS_MIN_POPULATION, refresh_interval=NORMS_REFRESH_SECONDS)
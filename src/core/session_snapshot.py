@@ -0,0 +1,113 @@
+import base64
+import json
+import logging
+import os
+import time
+import zlib
+from typing import Any, Dict
+
+from src.core.answer_codec import AnswerCodecError, decode_answers, encode_answers
+from src.core.metrics import metrics
+from src.core.task_manager import TaskManager
+
+logger = logging.getLogger(__name__)
+
+# Снимок: сигнатура и zlib JSON {"saved_at", "bots": {имя бота: {user_id: {"state", "idle"}}}};
+# ответы в состоянии упакованы answer_codec (base64), нестандартные остаются словарем
+SNAPSHOT_MAGIC = b"TSS1"
+
+
+def _pack_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    packed = dict(state)
+    try:
+        packed["answers"] = base64.b64encode(encode_answers(state["answers"])).decode()
+        packed["answers_packed"] = True
+    except AnswerCodecError:
+        pass
+    return packed
+
+
+def _unpack_state(packed: Dict[str, Any]) -> Dict[str, Any]:
+    state = dict(packed)
+    if state.pop("answers_packed", False):
+        state["answers"] = decode_answers(base64.b64decode(state["answers"]))
+    return state
+
+
+def pack_sessions(task_managers: Dict[str, TaskManager], saved_at: float) -> bytes:
+    bots = {
+        name: {
+            str(user_id): {"state": _pack_state(session["state"]), "idle": session["idle"]}
+            for user_id, session in task_manager.export_sessions().items()
+        }
+        for name, task_manager in task_managers.items()
+    }
+    data = json.dumps({"saved_at": saved_at, "bots": bots}, ensure_ascii=False, separators=(",", ":"))
+    return SNAPSHOT_MAGIC + zlib.compress(data.encode())
+
+
+def unpack_sessions(data: bytes) -> Dict[str, Any]:
+    if not data.startswith(SNAPSHOT_MAGIC):
+        raise ValueError("Неизвестный формат снимка сессий")
+    snapshot = json.loads(zlib.decompress(data[len(SNAPSHOT_MAGIC) :]))
+    snapshot["bots"] = {
+        name: {
+            int(user_id): {"state": _unpack_state(session["state"]), "idle": session["idle"]}
+            for user_id, session in sessions.items()
+        }
+        for name, sessions in snapshot["bots"].items()
+    }
+    return snapshot
+
+
+def dump_sessions(path: str, task_managers: Dict[str, TaskManager]) -> int:
+    """
+    Сохраняет активные сессии всех ботов в файл (через временный файл и rename); возвращает их число
+    """
+    data = pack_sessions(task_managers, time.time())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    count = sum(len(task_manager.active_tasks) for task_manager in task_managers.values())
+    metrics.set("snapshot_sessions", count)
+    logger.info(f"Снимок сессий сохранен: {count} сессий, {len(data)} байт")
+    return count
+
+
+def load_sessions(path: str, task_managers: Dict[str, TaskManager], max_age: float) -> int:
+    """
+    Загружает сессии из снимка до приема обновлений и удаляет файл: снимок после следующего
+    аварийного завершения был бы устаревшим. Старый или поврежденный снимок пропускается
+    """
+    if not os.path.exists(path):
+        return 0
+
+    try:
+        with open(path, "rb") as f:
+            snapshot = unpack_sessions(f.read())
+    except Exception as e:
+        logger.error(f"Снимок сессий {path} не прочитан: {e}")
+        os.remove(path)
+        return 0
+    os.remove(path)
+
+    age = time.time() - snapshot["saved_at"]
+    if age > max_age:
+        logger.warning(f"Снимок сессий старше {max_age} с ({age:.0f} с), сессии восстановятся из БД")
+        return 0
+
+    loaded = 0
+    for name, sessions in snapshot["bots"].items():
+        task_manager = task_managers.get(name)
+        if task_manager is None:
+            logger.warning(f"Бот {name} из снимка сессий не запущен: пропущено {len(sessions)} сессий")
+            continue
+        loaded += task_manager.import_sessions(sessions, elapsed=max(age, 0))
+
+    metrics.inc("snapshot_sessions_loaded", loaded)
+    logger.info(f"Сессии загружены из снимка: {loaded}")
+    return loaded
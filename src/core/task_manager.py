@@ -1,5 +1,11 @@
+import copy
 import logging
-from typing import Dict, List, Optional, Tuple, Any, TYPE_CHECKING
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial, wraps
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Any, TYPE_CHECKING, Union
+
+from sqlalchemy.exc import SQLAlchemyError
 
 from config.const import (
     MESSAGES,
@@ -11,46 +17,386 @@ from config.const import (
     INQ_LENGTH_SCORES_PER_QUESTION,
     INQ_SCORES_PER_QUESTION,
 )
-from src.database.operations import update_user
+from config.settings import (
+    EPI_PAGE_SIZE,
+    SESSION_IDLE_TTL,
+    SESSION_REMINDER_AFTER,
+    SESSION_ABANDON_AFTER,
+    SESSION_TIMER_TICK,
+    SESSION_STATE_MODE,
+    STATE_CONFLICT_RETRIES,
+)
+from src.core.handoff import handoff
+from src.core.invalidation import TOPIC_USER, invalidation_bus
+from src.core.metrics import metrics
+from src.core.timer_wheel import TimerWheel
+from src.core.tracing import traced
+from src.database.answer_log import AnswerEvent, EVENT_RESET, EVENT_SET, EVENT_UNSET, EVENT_PROGRESS
+from src.database.archive import archive_attempt
+from src.database.operations import (
+    commit_unit_of_work,
+    compare_and_set_user,
+    get_in_progress_sessions,
+    get_session_idle_seconds,
+    get_user_fresh,
+    mark_session_abandoned,
+    mark_sessions_abandoned,
+    rollback_unit_of_work,
+    run_after_commit,
+    update_user,
+)
 
 if TYPE_CHECKING:
     from src.database.models import User
+    from src.database.answer_log import AnswerLog
 
 logger = logging.getLogger(__name__)
 
+TIMER_REMINDER = "reminder"
+TIMER_EVICT = "evict"
+TIMER_ABANDON = "abandon"
+
+# Записи состояния, отложенные обработчиком, чтобы выполнить их параллельно с ответом пользователю
+deferred_writes: ContextVar[Optional[List[Callable[[], Awaitable[Any]]]]] = ContextVar("deferred_writes", default=None)
+
+STATE_MODES = ("memory", "versioned")
+
+
+class StateConflict(Exception):
+    """
+    Запись состояния не прошла проверку state_version: строку изменил другой воркер
+    """
+
+
+def retry_on_conflict(method):
+    """
+    Повторяет операцию над состоянием при StateConflict: кэш сбрасывается, строка пользователя
+    перечитывается из БД, и операция применяется к свежему состоянию (до STATE_CONFLICT_RETRIES раз)
+    """
+
+    @wraps(method)
+    async def wrapper(self: "TaskManager", subject, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return await method(self, subject, *args, **kwargs)
+            except StateConflict:
+                user_id = subject if isinstance(subject, int) else subject.user_id
+                metrics.inc("state_conflicts")
+                self.active_tasks.pop(user_id, None)
+                fresh = await get_user_fresh(user_id) if attempt < self.conflict_retries else None
+                if fresh is None:
+                    metrics.inc("state_conflict_failures")
+                    raise
+                attempt += 1
+                metrics.inc("state_conflict_retries")
+                logger.info(f"Конфликт записи состояния: пользователь {user_id}, повтор {attempt}")
+                if isinstance(subject, int):
+                    self.restore_task_state(fresh)
+                else:
+                    subject = fresh
+
+    return wrapper
+
 
 class TaskManager:
-    def __init__(self):
+    def __init__(
+        self,
+        answer_log: Optional["AnswerLog"] = None,
+        epi_page_size: int = EPI_PAGE_SIZE,
+        state_mode: str = SESSION_STATE_MODE,
+        conflict_retries: int = STATE_CONFLICT_RETRIES,
+    ):
+        if state_mode not in STATE_MODES:
+            raise ValueError(f"Неизвестный SESSION_STATE_MODE: {state_mode}")
+        # Лог ответов применяет записи позже и без проверки версии
+        if state_mode == "versioned" and answer_log is not None:
+            raise ValueError("SESSION_STATE_MODE=versioned несовместим с ANSWER_LOG_PATH")
+        # Выбор на странице EPI до "Далее" хранится только в памяти воркера
+        if state_mode == "versioned" and epi_page_size > 1:
+            raise ValueError("SESSION_STATE_MODE=versioned несовместим с EPI_PAGE_SIZE > 1")
+
         self.active_tasks = {}
+        self.answer_log = answer_log
+        self.epi_page_size = epi_page_size
+        self.versioned = state_mode == "versioned"
+        self.conflict_retries = conflict_retries
         self.tasks = {
             TaskType.priorities: TaskEntity.priorities.value,
             TaskType.inq: TaskEntity.inq.value,
             TaskType.epi: TaskEntity.epi.value,
         }
-
+        self.timers = TimerWheel(tick=SESSION_TIMER_TICK)
+        self.reminder_callback: Optional[Callable[[int], Awaitable[Any]]] = None
+
+    def touch_session(self, user_id: int, elapsed: float = 0, reminder: bool = True):
+        """
+        Перевзводит таймеры сессии: напоминание, выгрузка из памяти, пометка о брошенном тесте
+        """
+        remind = reminder and self.reminder_callback is not None
+        if SESSION_REMINDER_AFTER and remind and elapsed < SESSION_REMINDER_AFTER:
+            self.timers.schedule((user_id, TIMER_REMINDER), SESSION_REMINDER_AFTER - elapsed, self._on_reminder)
+        if SESSION_IDLE_TTL:
+            self.timers.schedule((user_id, TIMER_EVICT), max(SESSION_IDLE_TTL - elapsed, 0), self._on_idle)
+        if SESSION_ABANDON_AFTER:
+            self.timers.schedule((user_id, TIMER_ABANDON), max(SESSION_ABANDON_AFTER - elapsed, 0), self._on_abandon)
+
+    def cancel_session_timers(self, user_id: int):
+        for kind in (TIMER_REMINDER, TIMER_EVICT, TIMER_ABANDON):
+            self.timers.cancel((user_id, kind))
+
+    async def _on_reminder(self, key):
+        user_id, _ = key
+        if self.reminder_callback is None:
+            return
+        # В versioned следующие ответы мог принять другой воркер: решает строка в БД, а не этот таймер
+        if self.versioned:
+            idle_seconds = await get_session_idle_seconds(user_id)
+            if idle_seconds is None or idle_seconds < SESSION_REMINDER_AFTER - SESSION_TIMER_TICK:
+                return
+        await self.reminder_callback(user_id)
+
+    def _on_idle(self, key):
+        user_id, _ = key
+        if self.active_tasks.pop(user_id, None) is not None:
+            logger.info(f"Неактивная сессия выгружена из памяти: пользователь {user_id}")
+
+    async def _on_abandon(self, key):
+        user_id, _ = key
+        self.active_tasks.pop(user_id, None)
+        # Условный UPDATE: пользователь мог продолжить тест в другом воркере или боте
+        if not await mark_session_abandoned(user_id, max(SESSION_ABANDON_AFTER - SESSION_TIMER_TICK, 0)):
+            return
+        run_after_commit(partial(invalidation_bus.publish, TOPIC_USER, user_id))
+        logger.info(f"Тест помечен как брошенный: пользователь {user_id}")
+
+    async def restore_session_timers(self, reminders: bool = True):
+        """
+        Восстанавливает таймеры незавершённых сессий после рестарта по индексу updated_at.
+        reminders=False - без напоминаний: строка users не говорит, в каком боте шел тест
+        """
+        abandoned = await mark_sessions_abandoned(SESSION_ABANDON_AFTER)
+        sessions = await get_in_progress_sessions(SESSION_ABANDON_AFTER)
+        for user_id, idle_seconds in sessions:
+            self.touch_session(user_id, elapsed=idle_seconds, reminder=reminders)
+
+        logger.info(f"Восстановлено таймеров сессий: {len(sessions)}, помечено брошенными: {abandoned}")
+        return len(sessions)
+
+    def export_sessions(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Активные сессии для снимка при остановке: состояние и секунды простоя
+        """
+        sessions = {}
+        for user_id, state in self.active_tasks.items():
+            remaining = self.timers.remaining((user_id, TIMER_EVICT))
+            idle = SESSION_IDLE_TTL - remaining if SESSION_IDLE_TTL and remaining is not None else 0
+            sessions[user_id] = {"state": state, "idle": max(idle, 0)}
+        return sessions
+
+    def import_sessions(self, sessions: Dict[int, Dict[str, Any]], elapsed: float = 0) -> int:
+        """
+        Загружает сессии из снимка; elapsed - сколько прошло с момента снимка
+        """
+        loaded = 0
+        for user_id, session in sessions.items():
+            idle = session["idle"] + elapsed
+            if SESSION_IDLE_TTL and idle >= SESSION_IDLE_TTL:
+                continue
+            self.active_tasks[user_id] = session["state"]
+            self.touch_session(user_id, elapsed=idle)
+            loaded += 1
+        return loaded
+
+    def evict_sessions(self, user_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Выгружает сессии, строки которых изменил другой процесс (None - все): следующее обновление
+        восстановит состояние из БД. Таймеры снимаются - их заведет процесс, обслуживающий пользователя
+        """
+        # Таймеры остаются и после выгрузки по простою, поэтому снимаются и у сессий не в памяти
+        if user_ids is None:
+            user_ids = set(self.active_tasks) | {user_id for user_id, _ in self.timers.positions}
+        evicted = 0
+        for user_id in user_ids:
+            if self.active_tasks.pop(user_id, None) is not None:
+                evicted += 1
+            self.cancel_session_timers(user_id)
+        if evicted:
+            metrics.inc("sessions_invalidated", evicted)
+        return evicted
+
+    def restore_task_state(self, user: "User") -> Optional[Dict]:
+        """
+        Восстанавливает состояние незавершённого теста из строки users (без истории для "Назад")
+        """
+        answers = user.load_answers()
+        if user.test_completed or answers is None:
+            return None
+
+        state = {
+            "current_task_type": user.current_task_type or TaskType.priorities.value,
+            "current_question": user.current_question or 0,
+            "current_step": user.current_step or 0,
+            "answers": copy.deepcopy(answers),
+            "history": [],
+        }
+        if self.versioned:
+            state["state_version"] = user.state_version or 0
+        self.active_tasks[user.user_id] = state
+        logger.info(f"Состояние тестов восстановлено из БД для пользователя {user.user_id}")
+        return state
+
+    def _known_version(self, user: "User") -> int:
+        """
+        Последняя известная версия строки: после собственной записи кэш новее объекта user
+        """
+        state = self.get_task_state(user.user_id) or {}
+        return max(state.get("state_version", 0), user.state_version or 0)
+
+    async def _get_or_restore_state(self, user: "User") -> Optional[Dict]:
+        state = self.get_task_state(user.user_id)
+        # Строка новее кэша: состояние изменил другой воркер
+        if state is not None and self.versioned and state.get("state_version", 0) < (user.state_version or 0):
+            metrics.inc("state_cache_stale")
+            state = None
+        if state is None:
+            state = self.restore_task_state(user)
+            if state is not None and user.abandoned_at is not None:
+                await update_user(user_id=user.user_id, abandoned_at=None)
+        return state
+
+    async def load_state(self, user_id: int) -> Optional[Dict]:
+        """
+        Состояние для показа экрана без изменения: в режиме versioned кэш сверяется со строкой в БД,
+        так как предыдущее обновление мог обработать другой воркер
+        """
+        if not self.versioned:
+            return self.get_task_state(user_id)
+        user = await get_user_fresh(user_id)
+        return await self._get_or_restore_state(user) if user is not None else None
+
+    async def _get_state_by_id(self, user_id: int) -> Optional[Dict]:
+        state = self.get_task_state(user_id)
+        # Кэш обычно заполнен операцией этого же обновления; устаревший отсеет проверка версии при записи
+        if state is None and self.versioned:
+            state = await self.load_state(user_id)
+        return state
+
+    async def _save_state(self, user_id: int, event: Union[AnswerEvent, List[AnswerEvent]], **fields):
+        """
+        Единая точка записи состояния: в лог ответов, если он включен, иначе сразу в БД.
+        Внутри defer_writes запись откладывается до flush_writes. Несколько событий (страница EPI)
+        сохраняются одной записью
+        """
+        writes = deferred_writes.get()
+        # Конфликт версии должен проявиться внутри операции, чтобы ее можно было повторить
+        if writes is not None and not self.versioned:
+            writes.append(partial(self._persist_state, user_id, event, fields))
+        else:
+            await self._persist_state(user_id, event, fields)
+        self.touch_session(user_id)
+
+    async def _persist_state(
+        self, user_id: int, event: Union[AnswerEvent, List[AnswerEvent]], fields: Dict[str, Any]
+    ):
+        if self.answer_log is not None:
+            await self.answer_log.append_many(event if isinstance(event, list) else [event])
+        else:
+            await self._write_fields(user_id, fields)
+        metrics.inc("state_writes")
+        # Другие процессы перечитывают строку по инвалидации: до COMMIT они получили бы старое состояние
+        run_after_commit(partial(invalidation_bus.publish, TOPIC_USER, user_id))
+
+    async def _write_fields(self, user_id: int, fields: Dict[str, Any]):
+        if not self.versioned:
+            await update_user(user_id=user_id, **fields)
+            return
+
+        state = self.get_task_state(user_id) or {}
+        version = state.get("state_version", 0)
+        if not await compare_and_set_user(user_id, version, **fields):
+            raise StateConflict(user_id)
+        if state:
+            state["state_version"] = version + 1
+
+    @contextmanager
+    def defer_writes(self) -> Iterator[List[Callable[[], Awaitable[Any]]]]:
+        """
+        Собирает записи состояния вместо немедленного выполнения; состояние в памяти меняется сразу
+        """
+        writes = []
+        token = deferred_writes.set(writes)
+        try:
+            yield writes
+        finally:
+            deferred_writes.reset(token)
+
+    @traced("task_manager.flush_writes")
+    async def flush_writes(self, writes: List[Callable[[], Awaitable[Any]]]):
+        """
+        Выполняет отложенные записи по порядку и фиксирует их, не дожидаясь параллельных запросов к Telegram
+        """
+        for write in writes:
+            await write()
+        await commit_unit_of_work()
+
+    @staticmethod
+    async def _abort_unit_of_work(error: Exception):
+        # Ошибка БД прерывает транзакцию обновления: ответ об ошибке и COMMIT идут уже после ROLLBACK
+        if isinstance(error, SQLAlchemyError):
+            await rollback_unit_of_work()
+
+    def _state_event(self, kind: int, user_id: int, task_type: int = 0, **kwargs) -> AnswerEvent:
+        state = self.get_task_state(user_id) or {}
+        return AnswerEvent(
+            kind=kind,
+            user_id=user_id,
+            task_type=task_type,
+            current_task_type=state.get("current_task_type", TaskType.priorities.value),
+            current_question=state.get("current_question", 0),
+            current_step=state.get("current_step", 0),
+            **kwargs,
+        )
+
+    @traced("task_manager.start_tasks")
+    @retry_on_conflict
     async def start_tasks(self, user: "User") -> bool:
         try:
-            await update_user(
-                user_id=user.user_id,
+            state = {
+                "current_task_type": TaskType.priorities.value,
+                "current_question": 0,
+                "current_step": 0,
+                "answers": {},
+                "history": [],
+            }
+            if self.versioned:
+                # Версия для проверки при записи берется из нового состояния
+                state["state_version"] = self._known_version(user)
+                self.active_tasks[user.user_id] = state
+
+            await self._save_state(
+                user.user_id,
+                AnswerEvent(kind=EVENT_RESET, user_id=user.user_id),
                 current_task_type=1,
                 current_question=0,
                 current_step=0,
                 test_completed=False,
                 answers_json={},
+                abandoned_at=None,
+                archived_at=None,
             )
 
-            self.active_tasks[user.user_id] = {
-                "current_task_type": TaskType.priorities.value,
-                "current_question": 0,
-                "current_step": 0,
-                "answers": {},
-                "history": [],
-            }
+            self.active_tasks[user.user_id] = state
 
             logger.info(f"Тесты начаты для пользователя {user.user_id}")
             return True
 
+        except StateConflict:
+            raise
         except Exception as e:
+            await self._abort_unit_of_work(e)
+            if self.versioned:
+                self.active_tasks.pop(user.user_id, None)
             logger.error(f"Ошибка при начале тестов: {e}")
             return False
 
@@ -72,9 +418,11 @@ class TaskManager:
             return False
         return state["current_task_type"] > TaskType.epi.value
 
+    @traced("task_manager.process_priorities_answer")
+    @retry_on_conflict
     async def process_priorities_answer(self, user: "User", category_id: str, score: int) -> Tuple[bool, str]:
         try:
-            task_state = self.get_task_state(user.user_id)
+            task_state = await self._get_or_restore_state(user)
             if not task_state:
                 return False, MESSAGES["task_not_found"]
 
@@ -91,22 +439,36 @@ class TaskManager:
             task_state["answers"][TaskSection.priorities.value][category_id] = score
             task_state["current_step"] += 1
 
-            await update_user(
-                user_id=user.user_id, current_step=task_state["current_step"], answers_json=task_state["answers"]
+            await self._save_state(
+                user.user_id,
+                self._state_event(
+                    EVENT_SET, user.user_id, TaskType.priorities.value, key=category_id, score=score
+                ),
+                current_step=task_state["current_step"],
+                answers_json=task_state["answers"],
             )
 
             logger.info(
-                f"Ответ в тесте приоритетов: пользователь {user.user_id}, категория {category_id}, балл {score}"
+                "Ответ в тесте приоритетов: пользователь %s, категория %s, балл %s",
+                user.user_id,
+                category_id,
+                score,
+                extra={"event": "answer"},
             )
             return True, MESSAGES["answer_saved"]
 
+        except StateConflict:
+            raise
         except Exception as e:
+            await self._abort_unit_of_work(e)
             logger.error(f"Ошибка при обработке ответа теста приоритетов: {e}")
             return False, MESSAGES["answer_process_error"]
 
+    @traced("task_manager.process_inq_answer")
+    @retry_on_conflict
     async def process_inq_answer(self, user: "User", option: str) -> Tuple[bool, str]:
         try:
-            task_state = self.get_task_state(user.user_id)
+            task_state = await self._get_or_restore_state(user)
             if not task_state:
                 return False, MESSAGES["task_not_found"]
 
@@ -143,25 +505,38 @@ class TaskManager:
 
             task_state["current_step"] = step + 1
 
-            await update_user(
-                user_id=user.user_id,
+            await self._save_state(
+                user.user_id,
+                self._state_event(
+                    EVENT_SET, user.user_id, TaskType.inq.value, key=f"{question_key}:{option}", score=score
+                ),
                 current_question=question_num,
                 current_step=step + 1,
                 answers_json=task_state["answers"],
             )
 
             logger.info(
-                f"Ответ в INQ тесте: пользователь {user.user_id}, вопрос {question_num}, вариант {option}, балл {score}"
+                "Ответ в INQ тесте: пользователь %s, вопрос %s, вариант %s, балл %s",
+                user.user_id,
+                question_num,
+                option,
+                score,
+                extra={"event": "answer"},
             )
             return True, MESSAGES["answer_saved"]
 
+        except StateConflict:
+            raise
         except Exception as e:
+            await self._abort_unit_of_work(e)
             logger.error(f"Ошибка при обработке ответа INQ: {e}")
             return False, MESSAGES["answer_process_error"]
 
+    @traced("task_manager.process_epi_answer")
+    @retry_on_conflict
     async def process_epi_answer(self, user: "User", answer: str) -> Tuple[bool, str]:
         try:
-            task_state = self.get_task_state(user.user_id)
+            task_state = await self._get_or_restore_state(user)
             if not task_state:
                 return False, MESSAGES["task_not_found"]
 
@@ -181,19 +556,189 @@ class TaskManager:
             task_state["answers"][TaskSection.epi.value][question_key] = answer
             task_state["current_question"] += 1
 
-            await update_user(
-                user_id=user.user_id,
+            await self._save_state(
+                user.user_id,
+                self._state_event(EVENT_SET, user.user_id, TaskType.epi.value, key=question_key, value=answer),
                 current_question=task_state["current_question"],
                 answers_json=task_state["answers"],
             )
 
-            logger.info(f"Ответ в EPI тесте: пользователь {user.user_id}, вопрос {question_num + 1}, ответ {answer}")
+            logger.info(
+                "Ответ в EPI тесте: пользователь %s, вопрос %s, ответ %s",
+                user.user_id,
+                question_num + 1,
+                answer,
+                extra={"event": "answer"},
+            )
             return True, MESSAGES["answer_saved"]
 
+        except StateConflict:
+            raise
         except Exception as e:
+            await self._abort_unit_of_work(e)
             logger.error(f"Ошибка при обработке ответа EPI: {e}")
             return False, MESSAGES["answer_process_error"]
 
+    def epi_page(self, page_start: int) -> range:
+        """
+        Номера вопросов EPI (с 0) на странице, начинающейся с page_start
+        """
+        total_questions = TaskEntity.epi.value.get_total_questions()
+        return range(page_start, min(page_start + max(self.epi_page_size, 1), total_questions))
+
+    async def _get_epi_page_state(self, user: "User", page_start: int) -> Tuple[Optional[Dict], str]:
+        task_state = await self._get_or_restore_state(user)
+        if not task_state:
+            return None, MESSAGES["task_not_found"]
+
+        # Кнопки старой страницы (повторное нажатие "Далее") не должны менять текущую
+        if task_state["current_task_type"] != TaskType.epi.value or task_state["current_question"] != page_start:
+            return None, MESSAGES["task_incorrect"]
+        return task_state, ""
+
+    @traced("task_manager.select_epi_page_answer")
+    async def select_epi_page_answer(
+        self, user: "User", page_start: int, question_num: int, answer: str
+    ) -> Tuple[bool, str]:
+        """
+        Выбор ответа на странице EPI: только в памяти, сохраняется вместе со страницей
+        """
+        task_state, message = await self._get_epi_page_state(user, page_start)
+        if not task_state:
+            return False, message
+
+        if question_num not in self.epi_page(page_start):
+            return False, MESSAGES["task_incorrect"]
+
+        if answer not in AnswerOptions.epi.value:
+            return False, MESSAGES["answer_option_incorrect"]
+
+        task_state.setdefault("epi_page", {})[str(question_num + 1)] = answer
+        self.touch_session(user.user_id)
+        return True, MESSAGES["answer_saved"]
+
+    @traced("task_manager.submit_epi_page")
+    @retry_on_conflict
+    async def submit_epi_page(self, user: "User", page_start: int) -> Tuple[bool, str]:
+        """
+        Сохраняет ответы страницы EPI одной записью и переводит на следующую страницу
+        """
+        try:
+            task_state, message = await self._get_epi_page_state(user, page_start)
+            if not task_state:
+                return False, message
+
+            question_keys = [str(question_num + 1) for question_num in self.epi_page(page_start)]
+            selected = task_state.get("epi_page", {})
+            if not question_keys or any(key not in selected for key in question_keys):
+                return False, MESSAGES["epi_page_incomplete"]
+
+            if TaskSection.epi.value not in task_state["answers"]:
+                task_state["answers"][TaskSection.epi.value] = {}
+
+            for key in question_keys:
+                task_state["answers"][TaskSection.epi.value][key] = selected[key]
+            task_state["current_question"] = page_start + len(question_keys)
+            task_state.pop("epi_page", None)
+
+            await self._save_state(
+                user.user_id,
+                [
+                    self._state_event(EVENT_SET, user.user_id, TaskType.epi.value, key=key, value=selected[key])
+                    for key in question_keys
+                ],
+                current_question=task_state["current_question"],
+                answers_json=task_state["answers"],
+            )
+
+            logger.info(
+                "Страница EPI теста: пользователь %s, вопросы %s-%s",
+                user.user_id,
+                question_keys[0],
+                question_keys[-1],
+                extra={"event": "answer"},
+            )
+            return True, MESSAGES["answer_saved"]
+
+        except StateConflict:
+            raise
+        except Exception as e:
+            await self._abort_unit_of_work(e)
+            logger.error(f"Ошибка при сохранении страницы EPI: {e}")
+            return False, MESSAGES["answer_process_error"]
+
+    @traced("task_manager.submit_answer_set")
+    @retry_on_conflict
+    async def submit_answer_set(
+        self, user: "User", inq_orders: List[List[str]], epi_answers: List[str]
+    ) -> Tuple[bool, str]:
+        """
+        Ответы INQ и EPI целиком (Mini App) одной записью: для каждого вопроса INQ - варианты
+        в порядке выбора, для EPI - ответы на вопросы по порядку
+        """
+        try:
+            task_state = await self._get_or_restore_state(user)
+            if not task_state:
+                return False, MESSAGES["task_not_found"]
+
+            if task_state["current_task_type"] not in (TaskType.inq.value, TaskType.epi.value):
+                return False, MESSAGES["task_incorrect"]
+
+            options = sorted(AnswerOptions.inq.value)
+            if (
+                len(inq_orders) != TaskEntity.inq.value.get_total_questions()
+                or any(sorted(order) != options for order in inq_orders)
+                or len(epi_answers) != TaskEntity.epi.value.get_total_questions()
+                or any(answer not in AnswerOptions.epi.value for answer in epi_answers)
+            ):
+                return False, MESSAGES["answer_set_incorrect"]
+
+            inq_answers = {
+                f"question_{question_num}": {
+                    option: INQ_SCORES_PER_QUESTION[step] for step, option in enumerate(order)
+                }
+                for question_num, order in enumerate(inq_orders, 1)
+            }
+            epi = {str(question_num): answer for question_num, answer in enumerate(epi_answers, 1)}
+
+            task_state["answers"][TaskSection.inq.value] = inq_answers
+            task_state["answers"][TaskSection.epi.value] = epi
+            task_state["current_task_type"] = TaskType.epi.value
+            task_state["current_question"] = len(epi_answers)
+            task_state["current_step"] = 0
+            task_state["history"] = []
+            task_state.pop("epi_page", None)
+
+            events = [
+                self._state_event(
+                    EVENT_SET, user.user_id, TaskType.inq.value, key=f"{question_key}:{option}", score=score
+                )
+                for question_key, question_answers in inq_answers.items()
+                for option, score in question_answers.items()
+            ]
+            events += [
+                self._state_event(EVENT_SET, user.user_id, TaskType.epi.value, key=key, value=answer)
+                for key, answer in epi.items()
+            ]
+            await self._save_state(
+                user.user_id,
+                events,
+                current_task_type=TaskType.epi.value,
+                current_question=len(epi_answers),
+                current_step=0,
+                answers_json=task_state["answers"],
+            )
+
+            logger.info(f"Ответы INQ и EPI получены целиком из Mini App: пользователь {user.user_id}")
+            return True, MESSAGES["answer_saved"]
+
+        except StateConflict:
+            raise
+        except Exception as e:
+            await self._abort_unit_of_work(e)
+            logger.error(f"Ошибка при сохранении ответов из Mini App: {e}")
+            return False, MESSAGES["answer_process_error"]
+
     def is_priorities_task_completed(self, user_id: int) -> bool:
         state = self.get_task_state(user_id)
         if not state or TaskSection.priorities.value not in state["answers"]:
@@ -222,28 +767,43 @@ class TaskManager:
 
         return [opt for opt in AnswerOptions.inq.value if opt not in used_options]
 
+    @traced("task_manager.move_to_next_task")
+    @retry_on_conflict
     async def move_to_next_task(self, user_id: int):
-        state = self.get_task_state(user_id)
+        state = await self._get_state_by_id(user_id)
         if state:
             state["current_task_type"] += 1
             state["current_question"] = 0
             state["current_step"] = 0
 
-            await update_user(
-                user_id=user_id, current_task_type=state["current_task_type"], current_question=0, current_step=0
+            await self._save_state(
+                user_id,
+                self._state_event(EVENT_PROGRESS, user_id),
+                current_task_type=state["current_task_type"],
+                current_question=0,
+                current_step=0,
             )
 
+    @traced("task_manager.move_to_next_question")
+    @retry_on_conflict
     async def move_to_next_question(self, user_id: int):
-        state = self.get_task_state(user_id)
+        state = await self._get_state_by_id(user_id)
         if state:
             state["current_question"] += 1
             state["current_step"] = 0
 
-            await update_user(user_id=user_id, current_question=state["current_question"], current_step=0)
+            await self._save_state(
+                user_id,
+                self._state_event(EVENT_PROGRESS, user_id),
+                current_question=state["current_question"],
+                current_step=0,
+            )
 
+    @traced("task_manager.complete_all_tasks")
+    @retry_on_conflict
     async def complete_all_tasks(self, user: "User") -> Dict[str, Any]:
         try:
-            task_state = self.get_task_state(user.user_id)
+            task_state = await self._get_or_restore_state(user)
             if not task_state:
                 return {}
 
@@ -253,17 +813,33 @@ class TaskManager:
             inq_scores = TaskEntity.inq.value.calculate_scores(task_state["answers"])
             epi_scores = TaskEntity.epi.value.calculate_scores(task_state["answers"])
 
-            await update_user(
-                user_id=user.user_id,
+            results = dict(
                 test_completed=True,
                 priorities_json=priorities_scores,
                 inq_scores_json=inq_scores,
                 epi_scores_json=epi_scores,
                 temperament=epi_scores.get("temperament"),
             )
+            # Каждая попытка сохраняется в архив: "Пройти еще раз" перезапишет строку users
+            if self.versioned:
+                # Сначала завершение проходит проверку версии: повтор после конфликта не дублирует архив
+                await self._write_fields(user.user_id, results)
+                archived_at = await archive_attempt(
+                    user, task_state["answers"], priorities_scores, inq_scores, epi_scores
+                )
+                await update_user(user_id=user.user_id, archived_at=archived_at)
+            else:
+                archived_at = await archive_attempt(
+                    user, task_state["answers"], priorities_scores, inq_scores, epi_scores
+                )
+                await update_user(user_id=user.user_id, archived_at=archived_at, **results)
+            # Возврат в воронку Senler: только строка очереди, запрос уйдет фоном
+            await handoff.enqueue(user, results["temperament"])
 
             if user.user_id in self.active_tasks:
                 del self.active_tasks[user.user_id]
+            self.cancel_session_timers(user.user_id)
+            run_after_commit(partial(invalidation_bus.publish, TOPIC_USER, user.user_id))
 
             all_scores.update(inq_scores)
             all_scores.update(epi_scores)
@@ -271,10 +847,15 @@ class TaskManager:
             logger.info(f"Все тесты завершены для пользователя {user.user_id}")
             return all_scores
 
+        except StateConflict:
+            raise
         except Exception as e:
+            await self._abort_unit_of_work(e)
             logger.error(f"Ошибка при завершении тестов: {e}")
             return {}
 
+    @traced("task_manager.go_back_question")
+    @retry_on_conflict
     async def go_back_question(self, user: "User") -> Tuple[bool, str, Optional[Dict]]:
         try:
             task_state = self.get_task_state(user.user_id)
@@ -307,8 +888,11 @@ class TaskManager:
                 task_state["current_step"] = new_step
                 task_state["current_question"] = question_num
 
-                await update_user(
-                    user_id=user.user_id,
+                await self._save_state(
+                    user.user_id,
+                    self._state_event(
+                        EVENT_UNSET, user.user_id, TaskType.inq.value, key=f"{question_key}:{option}"
+                    ),
                     current_question=question_num,
                     current_step=new_step,
                     answers_json=task_state["answers"],
@@ -317,6 +901,9 @@ class TaskManager:
             logger.info(f"Откат выполнен для пользователя {user.user_id}")
             return True, MESSAGES["go_back_completed"], task_state
 
+        except StateConflict:
+            raise
         except Exception as e:
+            await self._abort_unit_of_work(e)
             logger.error(f"Ошибка при откате: {e}")
             return False, MESSAGES["go_back_error"], None
@@ -1,8 +1,11 @@
 import json
+import logging
 import aiofiles
 from typing import Dict, List, Any, Optional
 from abc import ABC, abstractmethod
 
+logger = logging.getLogger(__name__)
+
 
 class BaseTest(ABC):
     def __init__(self):
@@ -20,6 +23,16 @@ class BaseTest(ABC):
     def calculate_scores(self, answers: Dict) -> Dict:
         pass
 
+    @staticmethod
+    def unpack_answers(answers) -> Dict:
+        """
+        Ответы словарем; упакованные (answers_packed) распаковываются
+        """
+        # Импорт внутри метода: config.const импортирует этот модуль
+        from src.core.answer_codec import as_answers_dict
+
+        return as_answers_dict(answers)
+
 
 class PrioritiesTask(BaseTest):
     def __init__(self):
@@ -32,9 +45,9 @@ class PrioritiesTask(BaseTest):
                 content = await f.read()
                 self.question_data = json.loads(content)
                 self.loaded = True
-                print("Загружен тест приоритетов")
+                logger.info("Загружен тест приоритетов")
         except Exception as e:
-            print(f"Ошибка загрузки первого теста: {e}")
+            logger.error("Ошибка загрузки первого теста: %s", e)
             self.question_data = self._get_default_priorities_question()
             self.loaded = True
 
@@ -76,7 +89,7 @@ class PrioritiesTask(BaseTest):
         return self.question_data["question"]
 
     def calculate_scores(self, answers: Dict) -> Dict:
-        priorities = answers.get("priorities", {})
+        priorities = self.unpack_answers(answers).get("priorities", {})
         return priorities
 
 
@@ -91,9 +104,9 @@ class InqTask(BaseTest):
                 content = await f.read()
                 self.questions = json.loads(content)
                 self.loaded = True
-                print(f"Загружено {len(self.questions)} INQ вопросов")
+                logger.info("Загружено %d INQ вопросов", len(self.questions))
         except Exception as e:
-            print(f"Ошибка загрузки второго теста: {e}")
+            logger.error("Ошибка загрузки второго теста: %s", e)
             self.questions = self._get_default_inq_questions()
             self.loaded = True
 
@@ -148,7 +161,7 @@ class InqTask(BaseTest):
             "Реалистический": 0,
         }
 
-        inq_answers = answers.get("inq", {})
+        inq_answers = self.unpack_answers(answers).get("inq", {})
 
         for question_num in range(len(self.questions)):
             question_data = self.questions[question_num]
@@ -177,9 +190,9 @@ class EpiTask(BaseTest):
                 content = await f.read()
                 self.questions = json.loads(content)
                 self.loaded = True
-                print(f"Загружено {len(self.questions)} EPI вопросов")
+                logger.info("Загружено %d EPI вопросов", len(self.questions))
         except Exception as e:
-            print(f"Ошибка загрузки третьего теста: {e}")
+            logger.error("Ошибка загрузки третьего теста: %s", e)
             self.questions = self._get_default_epi_questions()
             self.loaded = True
 
@@ -228,7 +241,7 @@ class EpiTask(BaseTest):
     def calculate_scores(self, answers: Dict) -> Dict:
         scores = {"E": 0, "N": 0, "L": 0}
 
-        epi_answers = answers.get("epi", {})
+        epi_answers = self.unpack_answers(answers).get("epi", {})
 
         for question in self.questions:
             question_num = question["number"]
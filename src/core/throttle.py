@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from config.settings import THROTTLE_BURST, THROTTLE_GLOBAL_RATE, THROTTLE_MAX_USERS, THROTTLE_RATE
+from src.core.metrics import metrics
+
+
+class FloodThrottle:
+    """
+    Ограничение частоты обновлений: token bucket на пользователя и общий на процесс.
+
+    Корзины хранятся в OrderedDict по времени последнего обращения. Корзина, к которой не
+    обращались burst / rate секунд, снова полная и ничем не отличается от отсутствующей,
+    поэтому такие записи удаляются с начала таблицы за O(1) на обращение. max_users
+    ограничивает таблицу при наплыве новых пользователей.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        global_rate: float = 0,
+        max_users: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.ttl = self.burst / rate if rate > 0 else 0
+        self.global_rate = global_rate
+        self.max_users = max_users
+        self.clock = clock
+        self.buckets: "OrderedDict[int, List[float]]" = OrderedDict()
+        self.global_bucket = [max(global_rate, 1), clock()]
+
+        metrics.set("throttle_rate", rate)
+        metrics.set("throttle_burst", self.burst)
+        metrics.set("throttle_global_rate", global_rate)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or self.global_rate > 0
+
+    def _expire(self, now: float):
+        while self.buckets:
+            _, (_, updated) = next(iter(self.buckets.items()))
+            if now - updated < self.ttl and len(self.buckets) < self.max_users:
+                break
+            self.buckets.popitem(last=False)
+
+    @staticmethod
+    def _take(bucket: List[float], now: float, rate: float, burst: float) -> bool:
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        bucket[0], bucket[1] = tokens - 1 if allowed else tokens, now
+        return allowed
+
+    def check(self, user_id: int) -> Optional[str]:
+        """
+        None - обновление пропускается, иначе причина отказа: user или global
+        """
+        now = self.clock()
+        if self.rate > 0:
+            self._expire(now)
+            bucket = self.buckets.pop(user_id, None) or [self.burst, now]
+            self.buckets[user_id] = bucket
+            metrics.set("throttle_tracked_users", len(self.buckets))
+            if not self._take(bucket, now, self.rate, self.burst):
+                return self._reject("user")
+
+        # Общий предел проверяется после личного: флуд одного пользователя его не расходует
+        if self.global_rate > 0:
+            if not self._take(self.global_bucket, now, self.global_rate, max(self.global_rate, 1)):
+                return self._reject("global")
+
+        metrics.inc("throttle_allowed")
+        return None
+
+    def _reject(self, reason: str) -> str:
+        metrics.inc("throttle_rejected", reason=reason)
+        return reason
+
+
+throttle = FloodThrottle(
+    rate=THROTTLE_RATE, burst=THROTTLE_BURST, global_rate=THROTTLE_GLOBAL_RATE, max_users=THROTTLE_MAX_USERS
+)
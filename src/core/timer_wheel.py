@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TimerCallback = Callable[[Hashable], Optional[Awaitable[Any]]]
+
+
+class Timer:
+    __slots__ = ("key", "expires_tick", "callback")
+
+    def __init__(self, key: Hashable, expires_tick: int, callback: TimerCallback):
+        self.key = key
+        self.expires_tick = expires_tick
+        self.callback = callback
+
+
+class TimerWheel:
+    """
+    Иерархическое колесо таймеров.
+
+    Уровень i содержит slots слотов шириной slots**i тиков. Постановка, перезапуск
+    и отмена таймера - O(1); при обороте нижнего уровня таймеры из очередного слота
+    верхнего уровня переносятся вниз. Ключ таймера уникален: повторный schedule()
+    с тем же ключом перевзводит таймер.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.current_tick = 0
+        self.wheels: List[List[Dict[Hashable, Timer]]] = [[{} for _ in range(slots)] for _ in range(levels)]
+        self.positions: Dict[Hashable, Tuple[int, int]] = {}
+        self._started_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.positions
+
+    def schedule(self, key: Hashable, delay: float, callback: TimerCallback):
+        self.cancel(key)
+        ticks = max(1, int(round(delay / self.tick)))
+        self._insert(Timer(key, self.current_tick + ticks, callback))
+
+    def remaining(self, key: Hashable) -> Optional[float]:
+        """
+        Секунд до срабатывания таймера; None, если таймера нет
+        """
+        position = self.positions.get(key)
+        if position is None:
+            return None
+        level, slot = position
+        return (self.wheels[level][slot][key].expires_tick - self.current_tick) * self.tick
+
+    def cancel(self, key: Hashable) -> bool:
+        position = self.positions.pop(key, None)
+        if position is None:
+            return False
+        level, slot = position
+        del self.wheels[level][slot][key]
+        return True
+
+    def _insert(self, timer: Timer):
+        remaining = timer.expires_tick - self.current_tick
+        for level in range(self.levels):
+            span = self.slots ** (level + 1)
+            if remaining < span or level == self.levels - 1:
+                width = self.slots**level
+                # Таймер дальше горизонта колеса кладётся в последний слот верхнего уровня
+                expires = min(timer.expires_tick, self.current_tick + span - width)
+                slot = (expires // width) % self.slots
+                break
+
+        self.wheels[level][slot][timer.key] = timer
+        self.positions[timer.key] = (level, slot)
+
+    def advance(self, ticks: int = 1) -> List[Timer]:
+        """
+        Сдвигает колесо на ticks тиков и возвращает сработавшие таймеры
+        """
+        expired = []
+        for _ in range(ticks):
+            self.current_tick += 1
+
+            for level in range(1, self.levels):
+                width = self.slots**level
+                if self.current_tick % width:
+                    break
+                slot = (self.current_tick // width) % self.slots
+                timers, self.wheels[level][slot] = self.wheels[level][slot], {}
+                for timer in timers.values():
+                    del self.positions[timer.key]
+                    self._insert(timer)
+
+            slot = self.current_tick % self.slots
+            bucket = self.wheels[0][slot]
+            for key, timer in list(bucket.items()):
+                if timer.expires_tick <= self.current_tick:
+                    del bucket[key]
+                    del self.positions[key]
+                    expired.append(timer)
+
+        return expired
+
+    async def fire(self, timers: List[Timer]):
+        for timer in timers:
+            try:
+                result = timer.callback(timer.key)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике таймера {timer.key}: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._started_at = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            # Догоняем пропущенные тики, если цикл событий был занят
+            target = int((time.monotonic() - self._started_at) / self.tick)
+            expired = self.advance(max(1, target - self.current_tick))
+            if expired:
+                await self.fire(expired)
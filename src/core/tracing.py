@@ -0,0 +1,260 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import Context, ContextVar
+from functools import wraps
+from typing import Any, Coroutine, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from config.settings import TRACING_EXPORT, TRACING_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Максимальный размер датаграммы для локального коллектора
+UDP_MAX_PAYLOAD = 60_000
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "duration", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.duration = time.time() - self.start
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace.spans.append(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def create_background_task(coro: Coroutine[Any, Any, Any]) -> "asyncio.Task[Any]":
+    """
+    Долгоживущая задача в пустом контексте. create_task копирует контекст вызывающего: задача,
+    созданная лениво из выбранной трассы, дописывала бы свои спаны в завершенную трассу вечно
+    """
+    return Context().run(asyncio.create_task, coro)
+
+
+class JsonLinesExporter:
+    """
+    Запись трасс в JSON-lines файл фоновым потоком, чтобы не блокировать цикл событий
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self.thread.start()
+
+    def export(self, spans: List[Span]):
+        self.queue.put([span.to_dict() for span in spans])
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                batch = self.queue.get()
+                if batch is None:
+                    return
+                f.write("".join(json.dumps(span, ensure_ascii=False, default=str) + "\n" for span in batch))
+                if self.queue.empty():
+                    f.flush()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+
+class UdpExporter:
+    """
+    Отправка трассы одной датаграммой в локальный коллектор
+    """
+
+    def __init__(self, host: str, port: int):
+        self.address = (host, port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def export(self, spans: List[Span]):
+        payload = json.dumps([span.to_dict() for span in spans], ensure_ascii=False, default=str).encode()
+        if len(payload) > UDP_MAX_PAYLOAD:
+            logger.warning(f"Трасса {spans[0].trace.trace_id} слишком большая для UDP: {len(payload)} байт")
+            return
+        try:
+            self.socket.sendto(payload, self.address)
+        except OSError as e:
+            logger.debug(f"Коллектор трасс недоступен: {e}")
+
+    def close(self):
+        self.socket.close()
+
+
+def create_exporter(target: str):
+    """
+    Экспортер по строке настройки: путь к файлу или udp://host:port
+    """
+    if not target:
+        return None
+    if target.startswith("udp://"):
+        parsed = urlparse(target)
+        return UdpExporter(parsed.hostname or "127.0.0.1", parsed.port or 6831)
+    return JsonLinesExporter(target)
+
+
+class Tracer:
+    """
+    Трассировка обновлений: корневой спан на обновление и дочерние на БД, HTTP и рендеринг.
+
+    Решение о записи принимается один раз в начале трассы (head sampling). Если трасса
+    не выбрана, текущего спана нет, и каждый span() сводится к чтению ContextVar.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, exporter=None):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None and self.sample_rate > 0
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        if not self.enabled or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        root = Span(Trace(), name, None, attributes)
+        token = current_span.set(root)
+        error = None
+        try:
+            yield root
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            current_span.reset(token)
+            root.finish(error)
+            self.exporter.export(root.trace.spans)
+
+    def span(self, name: str, **attributes: Any):
+        if current_span.get() is None:
+            return nullcontext()
+        return self._span(name, attributes)
+
+    @contextmanager
+    def _span(self, name: str, attributes: Dict[str, Any]) -> Iterator[Span]:
+        span = self.start_span(name, **attributes)
+        token = current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            current_span.reset(token)
+            span.finish(error)
+
+    def start_span(self, name: str, **attributes: Any) -> Optional[Span]:
+        """
+        Дочерний спан без смены текущего (для колбэков вроде событий SQLAlchemy)
+        """
+        parent = current_span.get()
+        if parent is None:
+            return None
+        return Span(parent.trace, name, parent.span_id, attributes)
+
+    def close(self):
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+def traced(name: str):
+    """
+    Декоратор: выполнение корутины в дочернем спане
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if current_span.get() is None:
+                return await func(*args, **kwargs)
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_engine(engine):
+    """
+    Спаны на каждый SQL запрос через события SQLAlchemy
+    """
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_span("db.query", statement=statement[:200])
+        if span is not None:
+            context._trace_span = span
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            span.set(rows=cursor.rowcount)
+            span.finish()
+            context._trace_span = None
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        span = getattr(context, "_trace_span", None) if context is not None else None
+        if span is not None:
+            span.finish(exception_context.original_exception)
+            context._trace_span = None
+
+
+tracer = Tracer(TRACING_SAMPLE_RATE, create_exporter(TRACING_EXPORT))
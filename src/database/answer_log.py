@@ -0,0 +1,404 @@
+import asyncio
+import logging
+import os
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config.const import TaskType, TaskSection
+from .models import AsyncSessionLocal, User
+from .operations import answer_columns
+
+logger = logging.getLogger(__name__)
+
+EVENT_RESET = 1
+EVENT_SET = 2
+EVENT_UNSET = 3
+EVENT_PROGRESS = 4
+
+# длина payload, crc32 payload
+RECORD_HEADER = struct.Struct("<II")
+# kind, task_type, user_id, timestamp, current_task_type, current_question, current_step, score
+EVENT_STRUCT = struct.Struct("<BBqdBhhh")
+
+SECTIONS = {
+    TaskType.priorities.value: TaskSection.priorities.value,
+    TaskType.inq.value: TaskSection.inq.value,
+    TaskType.epi.value: TaskSection.epi.value,
+}
+
+
+@dataclass
+class AnswerEvent:
+    """
+    Событие изменения состояния теста.
+
+    current_* - состояние прохождения после применения события,
+    key/value/score - ответ (для inq key = "question_N:option").
+    """
+
+    kind: int
+    user_id: int
+    task_type: int = 0
+    current_task_type: int = 1
+    current_question: int = 0
+    current_step: int = 0
+    key: str = ""
+    value: str = ""
+    score: int = 0
+    timestamp: float = 0.0
+
+    def encode(self) -> bytes:
+        key = self.key.encode("utf-8")
+        value = self.value.encode("utf-8")
+        payload = (
+            EVENT_STRUCT.pack(
+                self.kind,
+                self.task_type,
+                self.user_id,
+                self.timestamp or time.time(),
+                self.current_task_type,
+                self.current_question,
+                self.current_step,
+                self.score,
+            )
+            + struct.pack("<B", len(key))
+            + key
+            + struct.pack("<B", len(value))
+            + value
+        )
+        return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    @classmethod
+    def decode(cls, payload: bytes) -> "AnswerEvent":
+        kind, task_type, user_id, timestamp, current_task_type, current_question, current_step, score = (
+            EVENT_STRUCT.unpack_from(payload, 0)
+        )
+        offset = EVENT_STRUCT.size
+        key_len = payload[offset]
+        key = payload[offset + 1 : offset + 1 + key_len].decode("utf-8")
+        offset += 1 + key_len
+        value_len = payload[offset]
+        value = payload[offset + 1 : offset + 1 + value_len].decode("utf-8")
+
+        return cls(
+            kind=kind,
+            user_id=user_id,
+            task_type=task_type,
+            current_task_type=current_task_type,
+            current_question=current_question,
+            current_step=current_step,
+            key=key,
+            value=value,
+            score=score,
+            timestamp=timestamp,
+        )
+
+
+def read_records(data: bytes) -> Tuple[List[Tuple[int, AnswerEvent]], int]:
+    """
+    Разбор лога: возвращает [(конечное смещение, событие)] и длину корректной части.
+    Чтение останавливается на первой неполной или повреждённой записи.
+    """
+    events = []
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        length, crc = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        payload = data[start : start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        offset = start + length
+        events.append((offset, AnswerEvent.decode(payload)))
+    return events, offset
+
+
+def apply_event(answers: Dict, event: AnswerEvent) -> Dict:
+    """
+    Применяет событие к словарю answers_json (в формате TaskManager)
+    """
+    if event.kind == EVENT_RESET:
+        return {}
+
+    section = SECTIONS.get(event.task_type)
+    if section is None or event.kind == EVENT_PROGRESS:
+        return answers
+
+    if section == TaskSection.inq.value:
+        question_key, option = event.key.split(":", 1)
+        question_answers = answers.setdefault(section, {}).setdefault(question_key, {})
+        if event.kind == EVENT_SET:
+            question_answers[option] = event.score
+        else:
+            question_answers.pop(option, None)
+            if not question_answers:
+                del answers[section][question_key]
+        return answers
+
+    section_answers = answers.setdefault(section, {})
+    if event.kind == EVENT_SET:
+        section_answers[event.key] = event.value if section == TaskSection.epi.value else event.score
+    else:
+        section_answers.pop(event.key, None)
+    return answers
+
+
+class AnswerLog:
+    """
+    Локальный append-only лог ответов с групповым fsync.
+
+    append() возвращается, когда событие надёжно записано на диск (один fsync на группу
+    событий за flush_interval_ms). Фоновый applier переносит события в users.answers_json
+    пачками; при старте неприменённый хвост лога проигрывается заново.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval_ms: int = 5,
+        apply_interval_ms: int = 200,
+        apply_batch_size: int = 500,
+        session_factory: Optional[async_sessionmaker] = None,
+    ):
+        self.path = path
+        self.offset_path = f"{path}.applied"
+        self.flush_interval = flush_interval_ms / 1000
+        self.apply_interval = apply_interval_ms / 1000
+        self.apply_batch_size = apply_batch_size
+        self.session_factory = session_factory or AsyncSessionLocal
+
+        self._file = None
+        self._size = 0
+        self._applied_offset = 0
+        self._buffer: List[Tuple[bytes, AnswerEvent, asyncio.Future]] = []
+        self._committed: List[Tuple[int, AnswerEvent]] = []
+        self._io_lock = asyncio.Lock()
+        self._apply_lock = asyncio.Lock()
+        self._flush_event = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+        # Ошибка обрезки недописанной группы: дальнейшие записи встали бы за битой и не проигрались бы
+        self._torn: Optional[Exception] = None
+
+    async def start(self):
+        """
+        Открывает лог, проигрывает неприменённые события и запускает фоновые задачи
+        """
+        self._applied_offset = self._read_applied_offset()
+
+        data = b""
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                data = f.read()
+
+        events, valid_size = read_records(data)
+        if valid_size < len(data):
+            logger.warning(f"Лог ответов {self.path}: отброшен повреждённый хвост ({len(data) - valid_size} байт)")
+
+        # Без буфера Python: после ошибки записи в буфере не остается байтов, которые допишутся позже
+        self._file = open(self.path, "ab", buffering=0)
+        if valid_size < len(data):
+            self._file.truncate(valid_size)
+        self._size = valid_size
+
+        if self._applied_offset > valid_size:
+            self._applied_offset = 0
+        self._committed = [(end, event) for end, event in events if end > self._applied_offset]
+
+        if self._committed:
+            logger.info(f"Проигрывание лога ответов: {len(self._committed)} неприменённых событий")
+            await self.apply_all()
+
+        self._running = True
+        self._tasks = [asyncio.create_task(self._flush_loop()), asyncio.create_task(self._apply_loop())]
+
+    async def stop(self):
+        """
+        Сбрасывает буфер, применяет все события и закрывает лог
+        """
+        self._running = False
+        self._flush_event.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        await self.flush()
+        await self.apply_all()
+
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    async def append(self, event: AnswerEvent):
+        """
+        Добавляет событие в лог и ждёт группового fsync
+        """
+        await self.append_many([event])
+
+    async def append_many(self, events: List[AnswerEvent]):
+        """
+        Добавляет события одной записи состояния подряд и ждёт их fsync
+        """
+        # После stop() цикл записи не работает, и событие ждало бы fsync вечно
+        if not self._running:
+            raise RuntimeError(f"Лог ответов {self.path} не запущен")
+        loop = asyncio.get_running_loop()
+        futures = []
+        for event in events:
+            if not event.timestamp:
+                event.timestamp = time.time()
+            future = loop.create_future()
+            self._buffer.append((event.encode(), event, future))
+            futures.append(future)
+        self._flush_event.set()
+        await asyncio.gather(*futures)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._buffer) + len(self._committed)
+
+    async def flush(self):
+        async with self._io_lock:
+            if not self._buffer or self._file is None:
+                return
+
+            batch, self._buffer = self._buffer, []
+            if self._torn is not None:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(self._torn)
+                return
+            data = b"".join(record for record, _, _ in batch)
+
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self._write_and_sync, data)
+            except Exception as e:
+                logger.error(f"Ошибка записи лога ответов: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                # Недописанная группа обрезается: иначе следующие записи встанут за битой, и при
+                # проигрывании read_records остановится на ней, потеряв подтвержденные события
+                try:
+                    await loop.run_in_executor(None, self._truncate, self._size)
+                except Exception as truncate_error:
+                    logger.error(f"Лог ответов {self.path} не обрезан после ошибки записи: {truncate_error}")
+                    self._torn = truncate_error
+                return
+
+            for record, event, future in batch:
+                self._size += len(record)
+                self._committed.append((self._size, event))
+                if not future.done():
+                    future.set_result(None)
+
+    async def apply_all(self):
+        while self._committed:
+            applied = await self.apply_pending()
+            if not applied:
+                break
+
+    async def apply_pending(self) -> int:
+        """
+        Переносит пачку закоммиченных событий в users.answers_json одной транзакцией
+        """
+        async with self._apply_lock:
+            batch = self._committed[: self.apply_batch_size]
+            if not batch:
+                return 0
+
+            events_by_user: Dict[int, List[AnswerEvent]] = OrderedDict()
+            for _, event in batch:
+                events_by_user.setdefault(event.user_id, []).append(event)
+
+            try:
+                async with self.session_factory() as session:
+                    async with session.begin():
+                        result = await session.execute(
+                            select(User).where(User.user_id.in_(list(events_by_user))).with_for_update()
+                        )
+                        for user in result.scalars():
+                            answers = dict(user.get_answers_dict())
+                            answers = {section: dict(values) for section, values in answers.items()}
+                            for event in events_by_user[user.user_id]:
+                                answers = apply_event(answers, event)
+                                if event.kind == EVENT_RESET:
+                                    user.test_completed = False
+                                    user.abandoned_at = None
+                                    user.archived_at = None
+
+                            last = events_by_user[user.user_id][-1]
+                            for column, value in answer_columns(answers).items():
+                                setattr(user, column, value)
+                            user.current_task_type = last.current_task_type
+                            user.current_question = last.current_question
+                            user.current_step = last.current_step
+            except Exception as e:
+                logger.error(f"Ошибка применения лога ответов: {e}")
+                return 0
+
+            del self._committed[: len(batch)]
+            self._applied_offset = batch[-1][0]
+            await self._save_applied_offset()
+            return len(batch)
+
+    async def _flush_loop(self):
+        while self._running:
+            await self._flush_event.wait()
+            self._flush_event.clear()
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _apply_loop(self):
+        while self._running:
+            await asyncio.sleep(self.apply_interval)
+            if self._committed:
+                await self.apply_pending()
+
+    def _write_and_sync(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[self._file.write(view) :]
+        os.fsync(self._file.fileno())
+
+    def _truncate(self, size: int):
+        self._file.truncate(size)
+        os.fsync(self._file.fileno())
+
+    def _read_applied_offset(self) -> int:
+        try:
+            with open(self.offset_path, "rb") as f:
+                return struct.unpack("<Q", f.read(8))[0]
+        except (FileNotFoundError, struct.error):
+            return 0
+
+    async def _save_applied_offset(self):
+        async with self._io_lock:
+            # Всё записанное применено - лог можно обрезать
+            truncate = self._applied_offset == self._size and not self._buffer and self._file is not None
+            if truncate:
+                self._size = 0
+                self._applied_offset = 0
+            # truncate и fsync - блокирующие вызовы, в пуле потоков, как и запись лога
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._write_applied_offset, self._applied_offset, truncate
+            )
+
+    def _write_applied_offset(self, offset: int, truncate: bool):
+        if truncate:
+            self._file.truncate(0)
+
+        tmp_path = f"{self.offset_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(struct.pack("<Q", offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
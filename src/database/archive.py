@@ -0,0 +1,245 @@
+import asyncio
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, null, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.metrics import metrics
+from .models import User, UserAttempt
+from .operations import run_write, seconds_ago
+
+logger = logging.getLogger(__name__)
+
+# Уровень zlib: ответы - повторяющиеся ключи JSON, выше 6 выигрыш почти нулевой
+COMPRESSION_LEVEL = 6
+
+
+def pack_attempt(answers: Dict, priorities: Dict, inq_scores: Dict, epi_scores: Dict) -> bytes:
+    data = {"answers": answers, "priorities": priorities, "inq_scores": inq_scores, "epi_scores": epi_scores}
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode(), COMPRESSION_LEVEL)
+
+
+def unpack_attempt(payload: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(payload))
+
+
+def _attempt_from_user(user: User, archived_at: datetime) -> UserAttempt:
+    return UserAttempt(
+        user_id=user.user_id,
+        test_start=user.test_start,
+        completed_at=user.test_end or archived_at,
+        temperament=user.temperament,
+        payload=pack_attempt(
+            user.get_answers_dict(),
+            user.priorities_json or {},
+            user.inq_scores_json or {},
+            user.epi_scores_json or {},
+        ),
+    )
+
+
+async def archive_attempt(user: User, answers: Dict, priorities: Dict, inq_scores: Dict, epi_scores: Dict) -> datetime:
+    """
+    Записывает завершенную попытку в архив; возвращает время архивации для users.archived_at
+    """
+    archived_at = datetime.now()
+
+    async def insert(session: AsyncSession):
+        session.add(
+            UserAttempt(
+                user_id=user.user_id,
+                test_start=user.test_start,
+                completed_at=archived_at,
+                temperament=epi_scores.get("temperament"),
+                payload=pack_attempt(answers, priorities, inq_scores, epi_scores),
+            )
+        )
+        await session.flush()
+
+    await run_write(insert)
+    metrics.inc("attempts_archived")
+    return archived_at
+
+
+async def move_completed_payloads(batch_size: int, grace_seconds: int) -> int:
+    """
+    Одна пачка переноса: у завершенных строк users, не менявшихся grace_seconds, удаляются ответы
+    (answers_json и answers_packed).
+    Строки, завершенные до появления архива (archived_at пуст), сначала копируются в user_attempts
+    """
+
+    async def move(session: AsyncSession) -> int:
+        has_answers = User.answers_json.isnot(None) | User.answers_packed.isnot(None)
+        completed = (User.test_completed == True) & has_answers  # noqa: E712
+        result = await session.execute(
+            select(User)
+            .where(completed, User.updated_at < seconds_ago(session, grace_seconds))
+            .order_by(User.id)
+            .limit(batch_size)
+        )
+        users = result.scalars().all()
+        if not users:
+            return 0
+
+        now = datetime.now()
+        for user in users:
+            if user.archived_at is None:
+                session.add(_attempt_from_user(user, now))
+
+        # test_completed повторно проверяется в UPDATE: пользователь мог начать тест заново
+        await session.execute(
+            update(User)
+            .where(User.id.in_([user.id for user in users]), completed)
+            .values(answers_json=null(), answers_packed=null(), archived_at=func.coalesce(User.archived_at, now))
+            .execution_options(synchronize_session=False)
+        )
+        return len(users)
+
+    return await run_write(move)
+
+
+async def purge_attempts(retention_days: int, batch_size: int) -> int:
+    """
+    Удаляет попытки старше retention_days пачками по id (keyset), не держа длинных блокировок
+    """
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    last_id = 0
+
+    async def purge_batch(session: AsyncSession) -> List[int]:
+        ids = (
+            await session.execute(
+                select(UserAttempt.id)
+                .where(UserAttempt.id > last_id, UserAttempt.completed_at < cutoff)
+                .order_by(UserAttempt.id)
+                .limit(batch_size)
+            )
+        ).scalars().all()
+        if ids:
+            await session.execute(delete(UserAttempt).where(UserAttempt.id.in_(ids)))
+        return ids
+
+    purged = 0
+    while True:
+        ids = await run_write(purge_batch)
+        if not ids:
+            break
+        purged += len(ids)
+        last_id = ids[-1]
+
+    if purged:
+        metrics.inc("attempts_purged", purged)
+        logger.info(f"Удалено попыток старше {retention_days} дней: {purged}")
+    return purged
+
+
+async def load_latest_answers(session: AsyncSession, user_ids: Iterable[int]) -> Dict[int, Dict]:
+    """
+    Ответы последней архивной попытки каждого пользователя: {user_id: answers}
+    """
+    latest = (
+        select(func.max(UserAttempt.id))
+        .where(UserAttempt.user_id.in_(list(user_ids)))
+        .group_by(UserAttempt.user_id)
+        .scalar_subquery()
+    )
+    result = await session.execute(select(UserAttempt.user_id, UserAttempt.payload).where(UserAttempt.id.in_(latest)))
+    return {user_id: unpack_attempt(payload)["answers"] for user_id, payload in result.all()}
+
+
+async def iter_completed_answers(session: AsyncSession, batch_size: int) -> AsyncIterator[List[Dict]]:
+    """
+    Ответы всех завершенных попыток пачками: архив по id (keyset), затем завершенные строки users,
+    еще не попавшие в архив. Без снимка (snapshot_session) строка, архивированная между проходами, пропустится
+    """
+    last_id = 0
+    while True:
+        rows = (
+            await session.execute(
+                select(UserAttempt.id, UserAttempt.payload)
+                .where(UserAttempt.id > last_id)
+                .order_by(UserAttempt.id)
+                .limit(batch_size)
+            )
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        yield [unpack_attempt(row.payload)["answers"] for row in rows]
+
+    last_id = 0
+    while True:
+        users = (
+            (
+                await session.execute(
+                    select(User)
+                    .where(User.id > last_id, User.test_completed == True, User.archived_at.is_(None))  # noqa: E712
+                    .order_by(User.id)
+                    .limit(batch_size)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        if not users:
+            break
+        last_id = users[-1].id
+        yield [user.get_answers_dict() for user in users]
+
+
+class AttemptArchiver:
+    """
+    Фоновый перенос ответов завершенных тестов из users в архив и очистка архива по сроку хранения,
+    чтобы в горячей таблице оставались только компактные строки
+    """
+
+    def __init__(
+        self,
+        interval: float = 60,
+        batch_size: int = 500,
+        grace_seconds: int = 300,
+        retention_days: int = 0,
+        max_batches: int = 20,
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.grace_seconds = grace_seconds
+        self.retention_days = retention_days
+        self.max_batches = max_batches
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        moved = 0
+        for _ in range(self.max_batches):
+            count = await move_completed_payloads(self.batch_size, self.grace_seconds)
+            moved += count
+            if count < self.batch_size:
+                break
+
+        if moved:
+            metrics.inc("attempt_payloads_moved", moved)
+            logger.info(f"Ответы завершенных тестов перенесены в архив: {moved}")
+        if self.retention_days:
+            await purge_attempts(self.retention_days, self.batch_size)
+        return moved
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка архивации попыток: {e}")
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
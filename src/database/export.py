@@ -0,0 +1,360 @@
+import csv
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from config.const import (
+    INQ_STYLES,
+    EPI_SCALES,
+    PRIORITY_CATEGORIES,
+    TaskAnswersLimit,
+    TaskSection,
+    AnswerOptions,
+)
+from config.settings import EXPORT_CHUNK_SIZE, EXPORT_DATABASE_URL
+from src.core.answer_codec import decode_answers
+from .archive import load_latest_answers
+from .models import User
+from .operations import replica_router
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+# Строк в одном файле Parquet: чанки - row group'ы внутри него, новый файл - только для продолжения
+PARQUET_PART_ROWS = 100_000
+
+USER_COLUMNS: List[Tuple[str, str]] = [
+    ("id", "int"),
+    ("user_id", "int"),
+    ("username", "str"),
+    ("first_name", "str"),
+    ("last_name", "str"),
+    ("age", "int"),
+    ("test_start", "datetime"),
+    ("test_end", "datetime"),
+    ("temperament", "str"),
+    ("current_task_type", "int"),
+    ("current_question", "int"),
+    ("current_step", "int"),
+    ("test_completed", "bool"),
+    ("created_at", "datetime"),
+    ("updated_at", "datetime"),
+]
+
+
+def build_export_columns() -> List[Tuple[str, str]]:
+    """
+    Фиксированный набор колонок выгрузки: поля пользователя, результаты и ответы на каждый вопрос
+    """
+    columns = list(USER_COLUMNS)
+    columns += [(f"inq_{style}", "int") for style in INQ_STYLES]
+    columns += [(f"epi_{scale}", "int") for scale in EPI_SCALES]
+    columns.append(("epi_temperament", "str"))
+    columns += [(f"priority_{category}", "int") for category in PRIORITY_CATEGORIES]
+
+    for question_num in range(1, TaskAnswersLimit.inq.value + 1):
+        columns += [(f"answer_inq_{question_num}_{option}", "int") for option in AnswerOptions.inq.value]
+    columns += [(f"answer_epi_{question_num}", "str") for question_num in range(1, TaskAnswersLimit.epi.value + 1)]
+
+    return columns
+
+
+EXPORT_COLUMNS = build_export_columns()
+
+
+def flatten_user_row(row: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Разворачивает строку таблицы users в плоский словарь по EXPORT_COLUMNS
+    """
+    flat = {name: row.get(name) for name, _ in USER_COLUMNS}
+
+    inq_scores = row.get("inq_scores_json") or {}
+    for style in INQ_STYLES:
+        flat[f"inq_{style}"] = inq_scores.get(style)
+
+    epi_scores = row.get("epi_scores_json") or {}
+    for scale in EPI_SCALES:
+        flat[f"epi_{scale}"] = epi_scores.get(scale)
+    flat["epi_temperament"] = epi_scores.get("temperament")
+
+    priorities = row.get("priorities_json") or {}
+    for category in PRIORITY_CATEGORIES:
+        flat[f"priority_{category}"] = priorities.get(category)
+
+    answers = row.get("answers_json") or {}
+    if not answers and row.get("answers_packed"):
+        answers = decode_answers(row["answers_packed"])
+    inq_answers = answers.get(TaskSection.inq.value, {})
+    for question_num in range(1, TaskAnswersLimit.inq.value + 1):
+        question_answers = inq_answers.get(f"question_{question_num}", {})
+        for option in AnswerOptions.inq.value:
+            flat[f"answer_inq_{question_num}_{option}"] = question_answers.get(option)
+
+    epi_answers = answers.get(TaskSection.epi.value, {})
+    for question_num in range(1, TaskAnswersLimit.epi.value + 1):
+        flat[f"answer_epi_{question_num}"] = epi_answers.get(str(question_num))
+
+    return flat
+
+
+class ExportCheckpoint:
+    """
+    Keyset-чекпоинт выгрузки: последний выгруженный users.id, число строк,
+    размер CSV файла и число готовых частей Parquet на момент сохранения
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = Path(path) if path else None
+        self.last_id = 0
+        self.rows = 0
+        self.offset = 0
+        self.parts = 0
+
+    def load(self, output_path: str, fmt: str) -> bool:
+        if not self.path or not self.path.exists():
+            return False
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("output") != str(output_path) or data.get("format") != fmt:
+            logger.warning(f"Чекпоинт {self.path} относится к другой выгрузке - начинаем заново")
+            return False
+
+        self.last_id = data.get("last_id", 0)
+        self.rows = data.get("rows", 0)
+        self.offset = data.get("offset", 0)
+        self.parts = data.get("parts", 0)
+        return True
+
+    def save(self, output_path: str, fmt: str):
+        if not self.path:
+            return
+
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "output": str(output_path),
+                    "format": fmt,
+                    "last_id": self.last_id,
+                    "rows": self.rows,
+                    "offset": self.offset,
+                    "parts": self.parts,
+                },
+                f,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class CsvSink:
+    """
+    Выгрузка в один CSV файл. При продолжении файл обрезается до размера из чекпоинта:
+    строки, записанные после последнего чекпоинта, будут выгружены заново
+    """
+
+    def __init__(self, path: str, columns: List[Tuple[str, str]], offset: Optional[int] = None):
+        self.columns = [name for name, _ in columns]
+        if offset is None:
+            self.file = open(path, "w", encoding="utf-8", newline="")
+        else:
+            os.truncate(path, offset)
+            self.file = open(path, "a", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.columns)
+        if self.file.tell() == 0:
+            self.writer.writeheader()
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]):
+        for row in rows:
+            self.writer.writerow(
+                {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+            )
+
+    def flush(self) -> bool:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return True
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """
+    Колоночная выгрузка: каждый чанк - row group одного ParquetWriter. Файл пишется под временным
+    именем и переименовывается после закрытия (part_rows строк или конец выгрузки), и только тогда
+    его строки попадают в чекпоинт: в выгрузке нет файлов без футера
+    """
+
+    def __init__(
+        self, output_path: str, columns: List[Tuple[str, str]], parts: int = 0, part_rows: int = PARQUET_PART_ROWS
+    ):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Для выгрузки в Parquet установите пакет pyarrow") from e
+
+        self.pa = pa
+        self.pq = pq
+        self.output_path = output_path
+        self.parts = parts
+        self.part_rows = part_rows
+        self.writer = None
+        self.rows_in_part = 0
+        types = {"int": pa.int64(), "str": pa.string(), "bool": pa.bool_(), "datetime": pa.timestamp("us")}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns])
+
+    def _path(self) -> str:
+        part = self.parts + 1
+        return self.output_path if part == 1 else _part_path(self.output_path, part)
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]):
+        rows = list(rows)
+        if not rows:
+            return
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(f"{self._path()}.tmp", self.schema)
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+        self.rows_in_part += len(rows)
+
+    def flush(self) -> bool:
+        """
+        True, если все записанные строки уже в закрытых файлах и их можно внести в чекпоинт
+        """
+        if self.writer is not None and self.rows_in_part >= self.part_rows:
+            self._close_part()
+        return self.writer is None
+
+    def _close_part(self):
+        path = self._path()
+        self.writer.close()
+        self.writer = None
+        with open(f"{path}.tmp", "rb") as f:
+            os.fsync(f.fileno())
+        # Файл, закрытый после последнего чекпоинта, при продолжении перезапишется теми же строками
+        os.replace(f"{path}.tmp", path)
+        self.parts += 1
+        self.rows_in_part = 0
+
+    def close(self):
+        if self.writer is not None:
+            self._close_part()
+
+
+def _part_path(output_path: str, part: int) -> str:
+    path = Path(output_path)
+    return str(path.with_name(f"{path.stem}.part{part:04d}{path.suffix}"))
+
+
+async def export_results(
+    output_path: str,
+    fmt: str = "csv",
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    checkpoint_path: Optional[str] = None,
+    database_url: Optional[str] = None,
+    session_factory: Optional[async_sessionmaker] = None,
+) -> int:
+    """
+    Потоковая выгрузка таблицы users в CSV/Parquet с постоянным расходом памяти.
+
+    Строки читаются курсором на стороне сервера (yield_per) в порядке users.id,
+    после каждого чанка данные сбрасываются на диск и обновляется чекпоинт (Parquet - после
+    каждого закрытого файла), поэтому прерванную выгрузку можно продолжить с того же места.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+
+    engine = None
+    database_url = database_url or EXPORT_DATABASE_URL
+    if session_factory is None:
+        if database_url:
+            engine = create_async_engine(database_url)
+            session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        else:
+            session_factory = await replica_router.session_factory()
+
+    checkpoint = ExportCheckpoint(checkpoint_path)
+    resumed = checkpoint.load(output_path, fmt)
+    if resumed and not os.path.exists(output_path):
+        logger.warning(f"Чекпоинт {checkpoint_path} есть, а файла {output_path} нет - выгрузка начинается заново")
+        checkpoint = ExportCheckpoint(checkpoint_path)
+        resumed = False
+
+    if fmt == "csv":
+        sink = CsvSink(output_path, EXPORT_COLUMNS, offset=checkpoint.offset if resumed else None)
+    else:
+        sink = ParquetSink(output_path, EXPORT_COLUMNS, parts=checkpoint.parts)
+
+    if resumed:
+        logger.info(f"Продолжение выгрузки с users.id > {checkpoint.last_id} ({checkpoint.rows} строк уже выгружено)")
+
+    table = User.__table__
+    stmt = (
+        select(*table.columns)
+        .where(table.c.id > checkpoint.last_id)
+        .order_by(table.c.id)
+        .execution_options(yield_per=chunk_size)
+    )
+
+    exported = 0
+    last_id, pending = checkpoint.last_id, 0
+
+    def save_checkpoint():
+        nonlocal pending
+        checkpoint.last_id = last_id
+        checkpoint.rows += pending
+        if fmt == "csv":
+            checkpoint.offset = sink.tell()
+        else:
+            checkpoint.parts = sink.parts
+        checkpoint.save(output_path, fmt)
+        pending = 0
+
+    try:
+        async with session_factory() as session:
+            result = await session.stream(stmt)
+            async for partition in result.mappings().partitions(chunk_size):
+                archived = [
+                    row["user_id"]
+                    for row in partition
+                    if row["test_completed"] and not row["answers_json"] and not row["answers_packed"]
+                ]
+                if archived:
+                    # Ответы завершенных тестов перенесены в user_attempts: берем последнюю попытку
+                    async with session_factory() as archive_session:
+                        answers = await load_latest_answers(archive_session, archived)
+                    partition = [
+                        {**row, "answers_json": answers.get(row["user_id"])} if row["user_id"] in answers else row
+                        for row in partition
+                    ]
+                sink.write_rows(flatten_user_row(row) for row in partition)
+
+                exported += len(partition)
+                last_id = partition[-1]["id"]
+                pending += len(partition)
+                if sink.flush():
+                    save_checkpoint()
+
+        sink.close()
+        if pending:
+            save_checkpoint()
+    finally:
+        sink.close()
+        if engine is not None:
+            await engine.dispose()
+
+    logger.info(f"Выгрузка завершена: {exported} строк, всего {checkpoint.rows}")
+    return exported
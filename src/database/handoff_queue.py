@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import HandoffEvent
+from .operations import read_session, run_optional_write, run_write
+
+
+async def enqueue_handoff(endpoint: str, user_id: int, payload: Dict[str, Any]) -> int:
+    """
+    Добавляет событие передачи в очередь (в текущей единице работы, если она открыта, в SAVEPOINT:
+    сбой теряет только строку очереди, а не завершение теста); возвращает id
+    """
+    now = datetime.now()
+
+    async def insert(session: AsyncSession) -> int:
+        event = HandoffEvent(
+            endpoint=endpoint, user_id=user_id, payload=payload, created_at=now, next_attempt_at=now
+        )
+        session.add(event)
+        await session.flush()
+        return event.id
+
+    return await run_optional_write(insert)
+
+
+async def claim_handoffs(limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+    """
+    Забирает до limit событий, время попытки которых наступило: next_attempt_at сдвигается на lease_seconds,
+    и другие процессы их не возьмут. Если процесс завершится до отправки, события вернутся после lease
+    """
+    now = datetime.now()
+
+    async def claim(session: AsyncSession) -> List[Dict[str, Any]]:
+        result = await session.execute(
+            select(HandoffEvent)
+            .where(HandoffEvent.failed_at.is_(None), HandoffEvent.next_attempt_at <= now)
+            .order_by(HandoffEvent.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        events = result.scalars().all()
+        for event in events:
+            event.next_attempt_at = now + timedelta(seconds=lease_seconds)
+        await session.flush()
+        return [
+            {
+                "id": event.id,
+                "endpoint": event.endpoint,
+                "payload": event.payload,
+                "attempts": event.attempts,
+                "created_at": event.created_at,
+            }
+            for event in events
+        ]
+
+    return await run_write(claim)
+
+
+async def delete_handoffs(ids: List[int]):
+    async def remove(session: AsyncSession):
+        await session.execute(delete(HandoffEvent).where(HandoffEvent.id.in_(ids)))
+
+    await run_write(remove)
+
+
+async def reschedule_handoffs(ids: List[int], delays: List[float], error: str):
+    """
+    Повтор с задержкой: delays[i] секунд для ids[i]
+    """
+    now = datetime.now()
+
+    async def reschedule(session: AsyncSession):
+        for event_id, delay in zip(ids, delays):
+            await session.execute(
+                update(HandoffEvent)
+                .where(HandoffEvent.id == event_id)
+                .values(
+                    attempts=HandoffEvent.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=delay),
+                    last_error=error[:500],
+                )
+            )
+
+    await run_write(reschedule)
+
+
+async def fail_handoffs(ids: List[int], error: str):
+    async def fail(session: AsyncSession):
+        await session.execute(
+            update(HandoffEvent)
+            .where(HandoffEvent.id.in_(ids))
+            .values(attempts=HandoffEvent.attempts + 1, failed_at=datetime.now(), last_error=error[:500])
+        )
+
+    await run_write(fail)
+
+
+async def count_handoffs() -> Dict[str, int]:
+    """
+    Размер очереди: ожидают отправки и не доставлены после всех попыток
+    """
+    async with read_session() as session:
+        statement = select(func.count(), func.count(HandoffEvent.failed_at)).select_from(HandoffEvent)
+        total, failed = (await session.execute(statement)).one()
+    return {"pending": total - failed, "failed": failed}
@@ -1,22 +1,68 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from typing import Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Boolean, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Boolean, BigInteger, Index, LargeBinary, event
 from sqlalchemy.sql import func
 
-from config.settings import DATABASE_URL
+from config.settings import DATABASE_REPLICA_URL, DATABASE_URL, SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE
+from src.core.answer_codec import decode_answers
+from src.database.pool import TimedQueuePool
 
 Base = declarative_base()
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+def is_sqlite_url(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def setup_sqlite_engine(engine: AsyncEngine):
+    """
+    Профиль SQLite: WAL, synchronous=NORMAL, mmap и busy timeout на каждом соединении.
+    Транзакции открываются явным BEGIN, чтобы SAVEPOINT в драйвере работали корректно.
+    """
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def on_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+def create_engine_for_url(url: str, **kwargs) -> AsyncEngine:
+    if is_sqlite_url(url):
+        engine = create_async_engine(url, connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}, **kwargs)
+        setup_sqlite_engine(engine)
+        return engine
+    kwargs.setdefault("poolclass", TimedQueuePool)
+    return create_async_engine(url, **kwargs)
+
+
+IS_SQLITE = is_sqlite_url(DATABASE_URL)
+
+# SQL пишется через логгер sqlalchemy.engine (DATABASE_ECHO), а не синхронным echo
+engine = create_engine_for_url(DATABASE_URL)
 
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+replica_engine = create_engine_for_url(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(BigInteger, unique=True, index=True, nullable=False)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(BigInteger, unique=True, nullable=False)
     username = Column(String, nullable=True)
     first_name = Column(String, nullable=True)
     last_name = Column(String, nullable=True)
@@ -25,7 +71,9 @@ class User(Base):
     test_start = Column(DateTime, nullable=True)
     test_end = Column(DateTime, nullable=True)
 
-    answers_json = Column(JSON, nullable=True)
+    # None записывается как SQL NULL: ответы тогда в answers_packed (ANSWERS_STORAGE=packed) или в архиве
+    answers_json = Column(JSON(none_as_null=True), nullable=True)
+    answers_packed = Column(LargeBinary, nullable=True)
 
     inq_scores_json = Column(JSON, nullable=True)
     epi_scores_json = Column(JSON, nullable=True)
@@ -36,15 +84,58 @@ class User(Base):
     current_question = Column(Integer, default=0)
     current_step = Column(Integer, default=0)
     test_completed = Column(Boolean, default=False)
+    abandoned_at = Column(DateTime, nullable=True)
+    # Когда завершенная попытка записана в user_attempts; answers_json затем переносится фоном
+    archived_at = Column(DateTime, nullable=True)
+    # Версия состояния теста для записи compare-and-swap (SESSION_STATE_MODE=versioned)
+    state_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
+    # Схема индексов ведётся миграциями (migrations/versions), здесь - её копия для create_all.
+    # Индексы по updated_at частичные: только незавершённые сессии
+    __table_args__ = (
+        Index("idx_users_username", "username"),
+        Index("idx_users_created_at", "created_at"),
+        Index(
+            "idx_users_in_progress_updated_at",
+            "updated_at",
+            postgresql_where=test_completed == False,  # noqa: E712
+            sqlite_where=test_completed == False,  # noqa: E712
+        ),
+        Index(
+            "idx_users_task_type_updated_at",
+            "current_task_type",
+            "updated_at",
+            postgresql_where=test_completed == False,  # noqa: E712
+            sqlite_where=test_completed == False,  # noqa: E712
+        ),
+        Index(
+            "idx_users_completed_payload",
+            "id",
+            postgresql_where=(test_completed == True)  # noqa: E712
+            & (answers_json.isnot(None) | answers_packed.isnot(None)),
+            sqlite_where=(test_completed == True)  # noqa: E712
+            & (answers_json.isnot(None) | answers_packed.isnot(None)),
+        ),
+    )
+
     def __repr__(self):
         return f"<User(user_id={self.user_id}, username={self.username})>"
 
+    def load_answers(self) -> Optional[Dict]:
+        """
+        Ответы из answers_json, а если он пуст - из упакованной колонки answers_packed
+        """
+        if isinstance(self.answers_json, dict):
+            return self.answers_json
+        if self.answers_packed is not None:
+            return decode_answers(self.answers_packed)
+        return None
+
     def get_answers_dict(self):
-        return self.answers_json if self.answers_json else {}
+        return self.load_answers() or {}
 
     def get_inq_scores_dict(self):
         return self.inq_scores_json if self.inq_scores_json else {}
@@ -67,3 +158,70 @@ class User(Base):
             self.answers_json[test_name] = {}
 
         self.answers_json[test_name][question_key] = data
+
+
+class UserAttempt(Base):
+    """
+    Архив завершенных попыток: ответы и результаты одним сжатым JSON (src/database/archive.py)
+    """
+
+    __tablename__ = "user_attempts"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(BigInteger, nullable=False)
+    test_start = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=False, default=func.now())
+    temperament = Column(String, nullable=True)
+    payload = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("idx_user_attempts_user_id", "user_id"),
+        Index("idx_user_attempts_completed_at", "completed_at"),
+    )
+
+    def __repr__(self):
+        return f"<UserAttempt(user_id={self.user_id}, completed_at={self.completed_at})>"
+
+
+class ScoreNorm(Base):
+    """
+    Гистограмма баллов выборки: число завершений с баллом value по стилю INQ или шкале EPI metric
+    """
+
+    __tablename__ = "score_norms"
+
+    metric = Column(String, primary_key=True)
+    value = Column(Integer, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+class HandoffEvent(Base):
+    """
+    Очередь передачи завершивших тест пользователей в Senler (src/core/handoff.py): строка
+    удаляется после доставки, после исчерпания попыток остается с failed_at
+    """
+
+    __tablename__ = "handoff_queue"
+
+    id = Column(Integer, primary_key=True)
+    endpoint = Column(String, nullable=False)
+    user_id = Column(BigInteger, nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    # Время следующей попытки; на время отправки сдвигается вперед, чтобы строку не взял другой процесс
+    next_attempt_at = Column(DateTime, nullable=False)
+    failed_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "idx_handoff_queue_due",
+            "next_attempt_at",
+            postgresql_where=failed_at.is_(None),
+            sqlite_where=failed_at.is_(None),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<HandoffEvent(user_id={self.user_id}, attempts={self.attempts})>"
@@ -1,5 +1,36 @@
-from sqlalchemy import select
-from .models import AsyncSessionLocal, User, engine, Base
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, extract, literal_column, select, update, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+
+from config.settings import ANSWERS_STORAGE, REPLICA_CHECK_INTERVAL_SECONDS, REPLICA_MAX_LAG_SECONDS, SQLITE_WRITE_BATCH
+from src.core.answer_codec import AnswerCodecError, encode_answers
+from .models import AsyncSessionLocal, ScoreNorm, User, engine, replica_engine, Base, IS_SQLITE
+from .replica import ReplicaRouter
+from .writer import WriteFunc, WriteQueue
+
+# В режиме SQLite все записи идут через одного писателя
+write_queue = WriteQueue(AsyncSessionLocal, batch_size=SQLITE_WRITE_BATCH) if IS_SQLITE else None
+
+# Чтения без требований к свежести идут на реплику, если она настроена и не отстает
+replica_router = ReplicaRouter(
+    AsyncSessionLocal, replica_engine, max_lag=REPLICA_MAX_LAG_SECONDS, check_interval=REPLICA_CHECK_INTERVAL_SECONDS
+)
+
+# Сессия текущей единицы работы (одно обновление Telegram)
+current_session: ContextVar[Optional[AsyncSession]] = ContextVar("current_session", default=None)
+
+# Сессию единицы работы используют параллельные задачи ResponsePipeline: COMMIT перед запросами
+# к Telegram тогда выполняют сами задачи после своих записей, а не middleware запросов
+shared_session: ContextVar[bool] = ContextVar("shared_session", default=False)
+
+# Ключ pg_try_advisory_lock воркера, который восстанавливает таймеры сессий после рестарта
+SESSION_RESTORE_LOCK_KEY = 7_340_417
+_restore_lock_connection: Optional[AsyncConnection] = None
 
 
 async def init_db():
@@ -15,22 +46,188 @@ async def get_db_session():
             await session.close()
 
 
-async def get_or_create_user(user_id: int, username: str = None, first_name: str = None, last_name: str = None) -> User:
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[Optional[AsyncSession]]:
+    """
+    Одна сессия и одна транзакция на все обращения к БД внутри блока, COMMIT в конце.
+    Для SQLite записи и так объединяет очередь единственного писателя, поэтому блок ничего не делает.
+    """
+    if write_queue is not None or current_session.get() is not None:
+        yield current_session.get()
+        return
+
     async with AsyncSessionLocal() as session:
+        token = current_session.set(session)
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        finally:
+            current_session.reset(token)
+
+
+async def commit_unit_of_work():
+    """
+    COMMIT записей текущей единицы работы до запросов к Telegram: иначе блокировки строк users
+    держатся на время сетевого запроса, и записи других воркеров ждут их. Следующие обращения
+    к БД в том же блоке начинают новую транзакцию
+    """
+    session = current_session.get()
+    if session is not None and session.in_transaction():
+        await session.commit()
+
+
+async def rollback_unit_of_work():
+    """
+    ROLLBACK после перехваченной ошибки БД: транзакция уже прервана, и без него упадут следующие
+    запросы и COMMIT в конце обновления. Объекты отсоединяются, чтобы сохранить загруженные значения
+    """
+    session = current_session.get()
+    if session is not None:
+        session.expunge_all()
+        await session.rollback()
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    session = current_session.get()
+    if session is not None:
+        yield session
+        return
+
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+@asynccontextmanager
+async def replica_session(max_lag: Optional[float] = None) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия для чтений, допускающих отставание (статистика, выгрузки, админские запросы).
+    Состояние прохождения теста так читать нельзя - для него read_session
+    """
+    factory = await replica_router.session_factory(max_lag)
+    async with factory() as session:
+        yield session
+
+
+@asynccontextmanager
+async def snapshot_session() -> AsyncIterator[AsyncSession]:
+    """
+    Сессия реплики, все чтения которой видят один снимок БД: REPEATABLE READ в Postgres,
+    в SQLite (WAL) - одна транзакция чтения
+    """
+    async with replica_session() as session:
+        if session.bind.dialect.name == "postgresql":
+            await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        yield session
+
+
+async def run_write(write: WriteFunc) -> Any:
+    """
+    Выполняет запись в текущей единице работы, если она открыта, иначе в отдельной транзакции,
+    а для SQLite - через очередь единственного писателя
+    """
+    session = current_session.get()
+    if session is not None:
+        return await write(session)
+
+    if write_queue is not None:
+        return await write_queue.submit(write)
+
+    async with AsyncSessionLocal() as session:
+        result = await write(session)
+        await session.commit()
+        return result
+
+
+async def run_optional_write(write: WriteFunc) -> Any:
+    """
+    run_write для записей, ошибка которых не должна мешать остальным: в единице работы запись
+    выполняется в SAVEPOINT, и ее сбой откатывает только ее, а не транзакцию всего обновления
+    """
+    session = current_session.get()
+    if session is None:
+        return await run_write(write)
+    async with session.begin_nested():
+        return await write(session)
+
+
+def run_after_commit(callback: Callable[[], Any]):
+    """
+    Вызывает callback после COMMIT текущей единицы работы, а вне ее - сразу (запись уже зафиксирована)
+    """
+    session = current_session.get()
+    if session is None:
+        callback()
+        return
+    event.listen(session.sync_session, "after_commit", lambda _: callback(), once=True)
+
+
+async def get_or_create_user(user_id: int, username: str = None, first_name: str = None, last_name: str = None) -> User:
+    async with read_session() as session:
         result = await session.execute(select(User).where(User.user_id == user_id))
         user = result.scalar_one_or_none()
 
-        if not user:
-            user = User(user_id=user_id, username=username, first_name=first_name, last_name=last_name)
-            session.add(user)
-            await session.commit()
-            await session.refresh(user)
-
+    if user:
         return user
 
+    async def create(session: AsyncSession) -> User:
+        result = await session.execute(select(User).where(User.user_id == user_id))
+        existing = result.scalar_one_or_none()
+        if existing:
+            return existing
+
+        new_user = User(user_id=user_id, username=username, first_name=first_name, last_name=last_name)
+        session.add(new_user)
+        await session.flush()
+        await session.refresh(new_user)
+        return new_user
+
+    return await run_write(create)
+
+
+async def upsert_users(users: List[Dict[str, Any]]):
+    """
+    Создает пользователей одним INSERT ... ON CONFLICT; у существующих обновляется только username,
+    если он передан. user_id в пачке не должны повторяться
+    """
+    if not users:
+        return
+
+    async def upsert(session: AsyncSession):
+        dialect_insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+        stmt = dialect_insert(User).values(
+            [{"user_id": user["user_id"], "username": user.get("username")} for user in users]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_={"username": func.coalesce(stmt.excluded.username, User.username)},
+        )
+        await session.execute(stmt)
+
+    await run_write(upsert)
+
+
+def answer_columns(answers: Dict[str, Any], storage: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Значения колонок ответов для режима хранения (по умолчанию ANSWERS_STORAGE);
+    нестандартные ответы всегда остаются в JSON
+    """
+    if (storage or ANSWERS_STORAGE) == "packed":
+        try:
+            return {"answers_json": None, "answers_packed": encode_answers(answers)}
+        except AnswerCodecError:
+            pass
+    return {"answers_json": answers, "answers_packed": None}
+
 
 async def update_user(user_id: int, **kwargs):
-    async with AsyncSessionLocal() as session:
+    if "answers_json" in kwargs:
+        kwargs.update(answer_columns(kwargs.pop("answers_json")))
+
+    async def update_fields(session: AsyncSession):
         result = await session.execute(select(User).where(User.user_id == user_id))
         user = result.scalar_one_or_none()
 
@@ -38,8 +235,243 @@ async def update_user(user_id: int, **kwargs):
             for key, value in kwargs.items():
                 if hasattr(user, key):
                     setattr(user, key, value)
-
-            await session.commit()
+                    # JSON меняется на месте, поэтому сравнение со старым значением изменений не видит
+                    if isinstance(value, (dict, list)):
+                        flag_modified(user, key)
+            await session.flush()
             await session.refresh(user)
-            return user
-        return None
+        return user
+
+    return await run_write(update_fields)
+
+
+async def compare_and_set_user(user_id: int, expected_version: int, **kwargs) -> bool:
+    """
+    UPDATE строки пользователя при state_version == expected_version с увеличением версии.
+    False - строку уже изменил другой воркер
+    """
+    if "answers_json" in kwargs:
+        kwargs.update(answer_columns(kwargs.pop("answers_json")))
+
+    statement = (
+        update(User)
+        .where(User.user_id == user_id, User.state_version == expected_version)
+        .values(**kwargs, state_version=expected_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+    async def compare_and_set(session: AsyncSession) -> bool:
+        result = await session.execute(statement)
+        return result.rowcount == 1
+
+    return await run_write(compare_and_set)
+
+
+async def get_user_fresh(user_id: int) -> Optional[User]:
+    """
+    Строка пользователя заново из БД, минуя уже загруженный в сессию объект
+    """
+    async with read_session() as session:
+        result = await session.execute(
+            select(User).where(User.user_id == user_id).execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+
+
+def seconds_ago(session: AsyncSession, seconds: float):
+    """
+    Момент seconds секунд назад по часам БД. Считается в SQL: now() в Postgres с часовым поясом,
+    а столбцы DateTime без него, и datetime из Python с ними не сравнить
+    """
+    if session.bind.dialect.name == "postgresql":
+        return func.now() - literal_column(f"interval '{int(seconds)} seconds'")
+    return func.datetime("now", f"-{int(seconds)} seconds")
+
+
+def seconds_since(session: AsyncSession, column):
+    """
+    Секунд от значения столбца до текущего времени БД
+    """
+    if session.bind.dialect.name == "postgresql":
+        return extract("epoch", func.now() - column)
+    return (func.julianday("now") - func.julianday(column)) * 86400
+
+
+async def get_in_progress_sessions(max_idle_seconds: int) -> List[Tuple[int, float]]:
+    """
+    Незавершённые сессии, активные за последние max_idle_seconds: [(user_id, секунд простоя)]
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(User.user_id, seconds_since(session, User.updated_at)).where(
+                User.test_completed == False,  # noqa: E712
+                User.updated_at >= seconds_ago(session, max_idle_seconds),
+                User.abandoned_at.is_(None),
+            )
+        )
+        return [(user_id, max(float(idle_seconds), 0)) for user_id, idle_seconds in result.all()]
+
+
+async def get_session_idle_seconds(user_id: int) -> Optional[float]:
+    """
+    Простой незавершённой сессии по updated_at; None - тест завершён, брошен или не начат
+    """
+    async with read_session() as session:
+        result = await session.execute(
+            select(seconds_since(session, User.updated_at)).where(
+                User.user_id == user_id,
+                User.test_completed == False,  # noqa: E712
+                User.abandoned_at.is_(None),
+            )
+        )
+        idle_seconds = result.scalar_one_or_none()
+    return None if idle_seconds is None else float(idle_seconds)
+
+
+async def mark_session_abandoned(user_id: int, max_idle_seconds: float) -> bool:
+    """
+    Помечает сессию брошенной, только если по строке в БД она незавершена и простаивает дольше
+    max_idle_seconds: таймер мог остаться в процессе, который пользователя уже не обслуживает
+    """
+
+    async def mark(session: AsyncSession) -> bool:
+        result = await session.execute(
+            update(User)
+            .where(
+                User.user_id == user_id,
+                User.test_completed == False,  # noqa: E712
+                User.updated_at < seconds_ago(session, max_idle_seconds),
+                User.abandoned_at.is_(None),
+            )
+            .values(abandoned_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    return await run_write(mark)
+
+
+async def acquire_session_restore_lock() -> bool:
+    """
+    Из нескольких воркеров таймеры сессий восстанавливает один: блокировку Postgres держит отдельное
+    соединение до release_session_restore_lock. SQLite обслуживает один процесс - всегда True
+    """
+    global _restore_lock_connection
+    if engine.dialect.name != "postgresql":
+        return True
+    connection = await engine.connect()
+    acquired = (await connection.execute(select(func.pg_try_advisory_lock(SESSION_RESTORE_LOCK_KEY)))).scalar_one()
+    # Блокировка уровня сессии переживает COMMIT: соединение не остается "idle in transaction"
+    await connection.commit()
+    if acquired:
+        _restore_lock_connection = connection
+    else:
+        await connection.close()
+    return bool(acquired)
+
+
+async def release_session_restore_lock():
+    global _restore_lock_connection
+    if _restore_lock_connection is not None:
+        await _restore_lock_connection.close()
+        _restore_lock_connection = None
+
+
+async def mark_sessions_abandoned(max_idle_seconds: int) -> int:
+    """
+    Помечает брошенными незавершённые сессии без активности дольше max_idle_seconds
+    """
+
+    async def mark(session: AsyncSession) -> int:
+        result = await session.execute(
+            update(User)
+            .where(
+                User.test_completed == False,  # noqa: E712
+                User.updated_at < seconds_ago(session, max_idle_seconds),
+                User.abandoned_at.is_(None),
+            )
+            .values(abandoned_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    return await run_write(mark)
+
+
+async def get_user_stats() -> Dict[str, int]:
+    """
+    Число участников: всего, завершили тест, проходят сейчас, бросили
+    """
+    async with replica_session() as session:
+        result = await session.execute(
+            select(
+                func.count(User.id),
+                func.count(User.id).filter(User.test_completed == True),  # noqa: E712
+                func.count(User.id).filter(User.test_completed == False, User.abandoned_at.is_(None)),  # noqa: E712
+                func.count(User.id).filter(User.abandoned_at.is_not(None)),
+            )
+        )
+        total, completed, in_progress, abandoned = result.one()
+    return {"total": total, "completed": completed, "in_progress": in_progress, "abandoned": abandoned}
+
+
+async def load_score_norms(session: Optional[AsyncSession] = None) -> Dict[str, Dict[int, int]]:
+    """
+    Гистограммы баллов выборки: {metric: {value: count}}
+    """
+    if session is None:
+        async with replica_session() as session:
+            return await load_score_norms(session)
+
+    result = await session.execute(select(ScoreNorm.metric, ScoreNorm.value, ScoreNorm.count))
+    norms: Dict[str, Dict[int, int]] = {}
+    for metric, value, count in result.all():
+        norms.setdefault(metric, {})[value] = count
+    return norms
+
+
+async def increment_score_norms(values: Dict[str, int]):
+    """
+    +1 к ячейке гистограммы каждого показателя одним INSERT ... ON CONFLICT. В единице работы
+    завершения - в SAVEPOINT: сбой нормы не должен откатывать сохранение результата
+    """
+    if not values:
+        return
+
+    async def increment(session: AsyncSession):
+        dialect_insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+        stmt = dialect_insert(ScoreNorm).values(
+            [{"metric": metric, "value": value, "count": 1} for metric, value in values.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScoreNorm.metric, ScoreNorm.value], set_={"count": ScoreNorm.count + 1}
+        )
+        await session.execute(stmt)
+
+    await run_optional_write(increment)
+
+
+async def add_score_norms(delta: Dict[str, Dict[int, int]]):
+    """
+    Добавляет к ячейкам гистограмм разницу (в том числе отрицательную) и удаляет обнулившиеся ячейки.
+    Инкременты, сделанные параллельно, сохраняются
+    """
+    rows = [
+        {"metric": metric, "value": value, "count": count}
+        for metric, counts in delta.items()
+        for value, count in counts.items()
+        if count
+    ]
+    if not rows:
+        return
+
+    async def add(session: AsyncSession):
+        dialect_insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+        stmt = dialect_insert(ScoreNorm).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScoreNorm.metric, ScoreNorm.value], set_={"count": ScoreNorm.count + stmt.excluded.count}
+        )
+        await session.execute(stmt)
+        await session.execute(delete(ScoreNorm).where(ScoreNorm.count <= 0))
+
+    await run_write(add)
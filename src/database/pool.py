@@ -0,0 +1,44 @@
+import time
+from typing import Dict
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolWaitTracker:
+    """
+    Максимальное ожидание соединения из пула за последние window секунд (по секундным корзинам)
+    """
+
+    def __init__(self, window: int = 10):
+        self.window = window
+        self.buckets: Dict[int, float] = {}
+
+    def record(self, seconds: float):
+        bucket = int(time.monotonic())
+        self.buckets[bucket] = max(self.buckets.get(bucket, 0.0), seconds)
+        if len(self.buckets) > self.window:
+            self._prune(bucket)
+
+    def _prune(self, now: int):
+        for bucket in [bucket for bucket in self.buckets if bucket <= now - self.window]:
+            del self.buckets[bucket]
+
+    def recent_max(self) -> float:
+        self._prune(int(time.monotonic()))
+        return max(self.buckets.values(), default=0.0)
+
+
+pool_wait = PoolWaitTracker()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, измеряющий время ожидания свободного соединения
+    """
+
+    def _do_get(self):
+        started = time.monotonic()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.record(time.monotonic() - started)
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from src.core.metrics import metrics
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# Отставание потоковой реплики PostgreSQL; если весь полученный WAL применен, реплика не отстает
+POSTGRES_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+class ReplicaRouter:
+    """
+    Выбор БД для чтений, допускающих отставание: реплика, пока ее отставание не больше max_lag,
+    иначе основная БД. Отставание проверяется не чаще раза в check_interval секунд.
+
+    Для PostgreSQL отставание берется из состояния репликации, для остальных БД
+    (например, копии SQLite) - как разница последних users.updated_at на основной БД и реплике.
+    """
+
+    def __init__(
+        self,
+        primary_factory: async_sessionmaker,
+        replica_engine: Optional[AsyncEngine] = None,
+        max_lag: float = 5.0,
+        check_interval: float = 10.0,
+    ):
+        self.primary_factory = primary_factory
+        self.replica_engine = replica_engine
+        self.replica_factory = (
+            async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False) if replica_engine else None
+        )
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def _last_update(self, factory: async_sessionmaker):
+        async with factory() as session:
+            return (await session.execute(select(func.max(User.updated_at)))).scalar_one()
+
+    async def measure_lag(self) -> float:
+        if self.replica_engine.dialect.name == "postgresql":
+            async with self.replica_engine.connect() as conn:
+                return float((await conn.execute(POSTGRES_LAG_SQL)).scalar_one())
+
+        primary = await self._last_update(self.primary_factory)
+        replica = await self._last_update(self.replica_factory)
+        if primary is None:
+            return 0.0
+        if replica is None:
+            return float("inf")
+        return max((primary - replica).total_seconds(), 0.0)
+
+    async def refresh(self):
+        try:
+            self.lag = await self.measure_lag()
+            metrics.set("replica_lag_seconds", round(self.lag, 3))
+        except Exception as e:
+            logger.warning(f"Не удалось проверить отставание реплики: {e}")
+            self.lag = None
+        self.checked_at = time.monotonic()
+
+    async def session_factory(self, max_lag: Optional[float] = None) -> async_sessionmaker:
+        """
+        Фабрика сессий для чтения с допустимым отставанием max_lag секунд
+        """
+        if self.replica_factory is None:
+            return self.primary_factory
+
+        if self.checked_at is None or time.monotonic() - self.checked_at >= self.check_interval:
+            async with self._lock:
+                if self.checked_at is None or time.monotonic() - self.checked_at >= self.check_interval:
+                    await self.refresh()
+
+        limit = self.max_lag if max_lag is None else max_lag
+        if self.lag is None or self.lag > limit:
+            metrics.inc("replica_fallback", reason="error" if self.lag is None else "lag")
+            return self.primary_factory
+
+        metrics.inc("replica_reads")
+        return self.replica_factory
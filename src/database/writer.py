@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.tracing import create_background_task
+
+logger = logging.getLogger(__name__)
+
+WriteFunc = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteQueue:
+    """
+    Единственный писатель для SQLite.
+
+    Все записи выполняются одной фоновой задачей: накопившиеся в очереди операции
+    выполняются в одной транзакции (каждая в своём SAVEPOINT) с одним COMMIT.
+    Так SQLite не получает конкурирующих писателей и не возвращает "database is locked".
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, batch_size: int = 100):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.writes = 0
+
+    async def submit(self, write: WriteFunc) -> Any:
+        """
+        Ставит операцию в очередь и ждёт её фиксации
+        """
+        if self._task is None or self._task.done():
+            self._task = create_background_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((write, future))
+        return await future
+
+    async def stop(self):
+        if self._task is not None:
+            await self.queue.join()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            try:
+                await self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _write_batch(self, batch: List[Tuple[WriteFunc, asyncio.Future]]):
+        results = []
+        try:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    for write, future in batch:
+                        try:
+                            async with session.begin_nested():
+                                results.append((future, await write(session), None))
+                        except Exception as e:
+                            results.append((future, None, e))
+        except Exception as e:
+            logger.error(f"Ошибка записи пачки в SQLite: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        for future, result, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
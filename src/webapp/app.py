@@ -0,0 +1,89 @@
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import HTMLResponse
+from pydantic import BaseModel
+
+from config.const import MESSAGES, TaskEntity
+from config.settings import SENLER_WEBHOOK_TOKEN, WEBAPP_INIT_DATA_TTL
+from src.bot.complete import send_completed_results
+from src.bot.instances import BotInstance
+from src.core.metrics import metrics
+from src.database.operations import get_or_create_user
+from .auth import InitDataError, init_data_user, validate_init_data
+from .senler import StartBatcher, create_senler_router, senler_starts
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = Path(__file__).parent / "static" / "index.html"
+
+
+class SubmitRequest(BaseModel):
+    """
+    Ответы тестов 2 и 3 целиком: Telegram.WebApp.initData, для каждого вопроса INQ - варианты
+    в порядке выбора, для EPI - "Да"/"Нет" по порядку вопросов
+    """
+
+    init_data: str
+    inq: List[List[str]]
+    epi: List[str]
+
+
+def create_webapp(
+    bot_instances: Dict[int, BotInstance],
+    init_data_ttl: int = WEBAPP_INIT_DATA_TTL,
+    senler_token: str = SENLER_WEBHOOK_TOKEN,
+    senler_batcher: StartBatcher = senler_starts,
+) -> FastAPI:
+    """
+    Mini App: страница с тестами INQ и EPI и прием ответов одним подписанным запросом.
+    Работает в процессе ботов, чтобы ответы попадали в их TaskManager. С senler_token здесь же
+    принимаются старты из воронки Senler
+    """
+    app = FastAPI(title="Mind Style Mini App", docs_url=None, redoc_url=None, openapi_url=None)
+    if senler_token:
+        app.include_router(create_senler_router(bot_instances, senler_token, senler_batcher))
+    index_html = INDEX_PATH.read_text(encoding="utf-8")
+
+    def authenticate(init_data: str) -> Tuple[BotInstance, Dict]:
+        # Mini App открывается из любого бота процесса: подпись определяет, из какого
+        for instance in bot_instances.values():
+            try:
+                fields = validate_init_data(init_data, instance.bot.token, init_data_ttl)
+                return instance, init_data_user(fields)
+            except InitDataError:
+                continue
+        metrics.inc("webapp_auth_errors")
+        raise HTTPException(status_code=401, detail=MESSAGES["webapp_auth_error"])
+
+    @app.get("/webapp", response_class=HTMLResponse)
+    async def index():
+        return index_html
+
+    @app.get("/webapp/questions")
+    async def questions():
+        return {
+            "inq": [question["text"] for question in TaskEntity.inq.value.questions],
+            "epi": [question["text"] for question in TaskEntity.epi.value.questions],
+        }
+
+    @app.post("/webapp/submit")
+    async def submit(request: SubmitRequest):
+        instance, telegram_user = authenticate(request.init_data)
+        user = await get_or_create_user(user_id=telegram_user["id"], username=telegram_user.get("username"))
+
+        success, message_text = await instance.task_manager.submit_answer_set(user, request.inq, request.epi)
+        if not success:
+            status_code = 422 if message_text == MESSAGES["answer_set_incorrect"] else 409
+            raise HTTPException(status_code=status_code, detail=message_text)
+
+        if not await send_completed_results(instance.task_manager, instance, user):
+            raise HTTPException(status_code=500, detail=MESSAGES["summary_result_error"])
+
+        metrics.inc("webapp_submissions")
+        logger.info(f"[{instance.name}] Тесты 2 и 3 пройдены в Mini App: пользователь {user.user_id}")
+        return {"ok": True}
+
+    return app
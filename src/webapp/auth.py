@@ -0,0 +1,55 @@
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl
+
+
+class InitDataError(ValueError):
+    """
+    initData Mini App без подписи, с неверной подписью или просроченные
+    """
+
+
+def init_data_secret(bot_token: str) -> bytes:
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+def sign_init_data(fields: Dict[str, str], bot_token: str) -> str:
+    """
+    Подпись полей initData так же, как это делает Telegram (для тестов и локальной отладки)
+    """
+    check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    return hmac.new(init_data_secret(bot_token), check_string.encode(), hashlib.sha256).hexdigest()
+
+
+def validate_init_data(
+    init_data: str, bot_token: str, max_age: int = 86400, now: Optional[float] = None
+) -> Dict[str, str]:
+    """
+    Проверяет подпись Telegram.WebApp.initData токеном бота и возвращает поля без hash
+    """
+    try:
+        fields = dict(parse_qsl(init_data, keep_blank_values=True, strict_parsing=True))
+    except ValueError:
+        raise InitDataError("initData не разбирается")
+
+    received = fields.pop("hash", "")
+    if not received or not hmac.compare_digest(sign_init_data(fields, bot_token), received):
+        raise InitDataError("Неверная подпись initData")
+
+    auth_date = int(fields.get("auth_date", "0") or 0)
+    if max_age and (now if now is not None else time.time()) - auth_date > max_age:
+        raise InitDataError("initData просрочены")
+    return fields
+
+
+def init_data_user(fields: Dict[str, str]) -> Dict[str, Any]:
+    try:
+        user = json.loads(fields["user"])
+    except (KeyError, ValueError):
+        raise InitDataError("В initData нет пользователя")
+    if not isinstance(user, dict) or not isinstance(user.get("id"), int):
+        raise InitDataError("В initData нет пользователя")
+    return user
@@ -0,0 +1,174 @@
+import asyncio
+import hmac
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from config.settings import (
+    SENLER_START_BATCH_SIZE,
+    SENLER_START_DEDUP_SECONDS,
+    SENLER_START_FLUSH_MS,
+    SENLER_START_MAX_PENDING,
+)
+from src.bot.instances import BotInstance
+from src.bot.outbound import OutboundSender, outbound
+from src.bot.sender import welcome_message
+from src.core.metrics import metrics
+from src.core.tracing import create_background_task
+from src.database.operations import upsert_users
+
+logger = logging.getLogger(__name__)
+
+START_QUEUED = "queued"
+START_DUPLICATE = "duplicate"
+START_OVERLOADED = "overloaded"
+
+
+class SenlerStartRequest(BaseModel):
+    """
+    Старт теста из воронки Senler: пользователь Telegram, токен и, если ботов несколько, имя бота
+    """
+
+    user_id: int
+    username: Optional[str] = None
+    token: str
+    bot: Optional[str] = None
+
+
+class StartBatcher:
+    """
+    Прием стартов без ожидания БД и Telegram. Старт попадает в память и сразу подтверждается;
+    накопленные за flush_interval (или batch_size) старты записываются одним upsert, после чего
+    первое сообщение каждому пользователю ставится в очередь исходящих. Повтор того же старта
+    в течение dedup_seconds (Senler повторяет доставку без ответа) второго сообщения не дает
+    """
+
+    def __init__(
+        self,
+        sender: OutboundSender,
+        flush_interval: float = 0.05,
+        batch_size: int = 500,
+        max_pending: int = 20_000,
+        dedup_seconds: float = 600,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.sender = sender
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.dedup_seconds = dedup_seconds
+        self.clock = clock
+        self.pending: List[Tuple[BotInstance, int, Optional[str]]] = []
+        # (бот, user_id) -> время старта, по возрастанию
+        self.seen: "OrderedDict[Tuple[str, int], float]" = OrderedDict()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flushes: set = set()
+
+    def add(self, instance: BotInstance, user_id: int, username: Optional[str]) -> str:
+        now = self.clock()
+        while self.seen and (now - next(iter(self.seen.values())) >= self.dedup_seconds):
+            self.seen.popitem(last=False)
+
+        key = (instance.name, user_id)
+        if key in self.seen:
+            metrics.inc("senler_starts", result=START_DUPLICATE)
+            return START_DUPLICATE
+        if len(self.pending) >= self.max_pending or self.sender.queue.full():
+            metrics.inc("senler_starts", result=START_OVERLOADED)
+            return START_OVERLOADED
+
+        self.seen[key] = now
+        self.pending.append((instance, user_id, username))
+        metrics.inc("senler_starts", result=START_QUEUED)
+        if len(self.pending) >= self.batch_size:
+            self._spawn_flush(self.flush())
+        elif self._flush_task is None:
+            self._flush_task = self._spawn_flush(self._flush_later())
+        return START_QUEUED
+
+    def _spawn_flush(self, coro) -> asyncio.Task:
+        # stop() дожидается всех начатых записей: их старты уже подтверждены Senler
+        task = create_background_task(coro)
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+        return task
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        batch, self.pending = self.pending[: self.batch_size], self.pending[self.batch_size :]
+        if not batch:
+            return 0
+        if self.pending:
+            self._spawn_flush(self.flush())
+
+        users: Dict[int, Optional[str]] = {}
+        for _, user_id, username in batch:
+            users[user_id] = username or users.get(user_id)
+        try:
+            await upsert_users([{"user_id": user_id, "username": username} for user_id, username in users.items()])
+            metrics.inc("senler_start_batches")
+        except Exception as e:
+            # Пользователь создастся при первом нажатии кнопки: сообщение отправляется все равно
+            metrics.inc("senler_start_errors")
+            logger.error(f"Старты из Senler не записаны в БД ({len(users)} пользователей): {e}")
+
+        text, reply_markup = welcome_message()
+        for instance, user_id, _ in batch:
+            if not self.sender.submit(instance.bot, user_id, text, reply_markup):
+                # Ни записи, ни сообщения: повтор доставки от Senler пройдет заново
+                self.seen.pop((instance.name, user_id), None)
+        return len(batch)
+
+    async def stop(self):
+        # Таймер, который еще спит, отменяется; начатая им запись дожидается вместе с остальными
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        while self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        while self.pending:
+            await self.flush()
+
+
+def create_senler_router(bot_instances: Dict[int, BotInstance], token: str, batcher: StartBatcher) -> APIRouter:
+    """
+    POST /senler/start: проверка токена и постановка старта в очередь, без обращений к БД и Telegram
+    """
+    router = APIRouter()
+    instances = {instance.name: instance for instance in bot_instances.values()}
+    default_instance = next(iter(bot_instances.values()))
+
+    @router.post("/senler/start", status_code=202)
+    async def senler_start(request: SenlerStartRequest):
+        if not hmac.compare_digest(request.token.encode(), token.encode()):
+            metrics.inc("senler_starts", result="unauthorized")
+            raise HTTPException(status_code=401, detail="invalid token")
+
+        instance = instances.get(request.bot) if request.bot else default_instance
+        if instance is None:
+            raise HTTPException(status_code=404, detail="unknown bot")
+
+        result = batcher.add(instance, request.user_id, request.username)
+        if result == START_OVERLOADED:
+            return JSONResponse({"ok": False}, status_code=503, headers={"Retry-After": "5"})
+        return {"ok": True, "duplicate": result == START_DUPLICATE}
+
+    return router
+
+
+senler_starts = StartBatcher(
+    outbound,
+    flush_interval=SENLER_START_FLUSH_MS / 1000,
+    batch_size=SENLER_START_BATCH_SIZE,
+    max_pending=SENLER_START_MAX_PENDING,
+    dedup_seconds=SENLER_START_DEDUP_SECONDS,
+)
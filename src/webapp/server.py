@@ -0,0 +1,31 @@
+import asyncio
+import logging
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddedServer:
+    """
+    uvicorn в цикле событий бота: сигналы остаются за aiogram, остановка - вместе с ботом
+    """
+
+    def __init__(self, app: FastAPI, host: str, port: int):
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_config=None, lifespan="off"))
+        # Ctrl+C обрабатывает polling aiogram; uvicorn не должен перехватывать сигналы
+        self.server.install_signal_handlers = lambda: None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.server.serve())
+            logger.info(f"Mini App слушает {self.server.config.host}:{self.server.config.port}")
+
+    async def stop(self):
+        if self._task is not None:
+            self.server.should_exit = True
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.dispatcher.event.handler import HandlerObject
+
+from config.const import MESSAGES
+from src.bot.middlewares import AdmissionMiddleware
+from src.core.admission import AdmissionController
+from src.core.loop_monitor import LoopLagMonitor
+from src.core.metrics import metrics
+from src.database import pool
+from src.database.pool import PoolWaitTracker
+
+
+async def handler_callback():
+    pass
+
+
+def make_data(new_session: bool):
+    flags = {"new_session": True} if new_session else {}
+    return {"handler": HandlerObject(callback=handler_callback, flags=flags)}
+
+
+class TestAdmission:
+    """Тесты допуска новых сессий при перегрузке"""
+
+    def setup_method(self):
+        metrics.reset()
+        MESSAGES.setdefault("overloaded", "overloaded")
+
+    def test_admit_and_shed(self):
+        """Тест: сессия допускается, пока сигналы ниже порогов"""
+        lag = {"value": 10.0}
+        controller = AdmissionController()
+        controller.add_signal("loop_lag", lambda: lag["value"], 250)
+        controller.add_signal("outbound", lambda: 0, 0)
+
+        assert controller.admit_new_session()
+        lag["value"] = 400.0
+        assert not controller.admit_new_session()
+
+        assert [signal.name for signal in controller.signals] == ["loop_lag"]
+        assert metrics.get("admission_admitted") == 1
+        assert metrics.get("admission_shed", reason="loop_lag") == 1
+        assert metrics.get("admission_threshold", signal="loop_lag") == 250
+        assert metrics.get("admission_signal", signal="loop_lag") == 400
+
+    @pytest.mark.asyncio
+    async def test_stopped_lag_monitor_admits(self):
+        """Тест: после остановки контроля блокировок последняя большая задержка не отсекает сессии"""
+        monitor = LoopLagMonitor(threshold_ms=50, interval=0.01)
+        controller = AdmissionController()
+        controller.add_signal("loop_lag", lambda: monitor.lag * 1000, 100)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.2)
+        # Пульс измеряет задержку на ближайшей итерации цикла; до следующего замера еще interval
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert not controller.admit_new_session()
+
+        await monitor.stop()
+
+        assert controller.admit_new_session()
+
+    def test_pool_wait_decays(self, monkeypatch):
+        """Тест: ожидание пула учитывается только за последнее окно"""
+        now = {"value": 1000.0}
+        monkeypatch.setattr(pool.time, "monotonic", lambda: now["value"])
+        tracker = PoolWaitTracker(window=10)
+
+        tracker.record(0.8)
+        tracker.record(0.2)
+        assert tracker.recent_max() == 0.8
+
+        now["value"] += 11
+        assert tracker.recent_max() == 0.0
+        assert tracker.buckets == {}
+
+    @pytest.mark.asyncio
+    async def test_middleware_sheds_only_new_sessions(self):
+        """Тест: при перегрузке откладывается только начало теста"""
+        controller = AdmissionController()
+        controller.add_signal("pool_wait", lambda: 1000.0, 500)
+        middleware = AdmissionMiddleware(controller)
+        handler = AsyncMock(return_value="handled")
+        event = MagicMock()
+        event.answer = AsyncMock()
+
+        assert await middleware(handler, event, make_data(new_session=False)) == "handled"
+        assert await middleware(handler, event, make_data(new_session=True)) is None
+
+        handler.assert_awaited_once()
+        event.answer.assert_awaited_once_with(MESSAGES["overloaded"])
+        assert metrics.get("admission_shed", reason="pool_wait") == 1
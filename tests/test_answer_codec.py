@@ -0,0 +1,141 @@
+import itertools
+import json
+import random
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config.const import AnswerOptions, INQ_SCORES_PER_QUESTION, PRIORITY_CATEGORIES
+from src.core.answer_codec import AnswerCodecError, decode_answers, encode_answers, rank_partial, unrank_partial
+from src.core.task_models import EpiTask, InqTask, PrioritiesTask
+from src.database import operations
+from src.database.models import Base, User, create_engine_for_url
+from src.database.operations import answer_columns, update_user
+
+
+def inq_question(order):
+    return {option: INQ_SCORES_PER_QUESTION[step] for step, option in enumerate(order)}
+
+
+def full_answers(seed: int = 1):
+    rng = random.Random(seed)
+    return {
+        "priorities": dict(zip(PRIORITY_CATEGORIES, rng.sample(AnswerOptions.priorities.value, 4))),
+        "inq": {f"question_{num}": inq_question(rng.sample(AnswerOptions.inq.value, 5)) for num in range(1, 19)},
+        "epi": {str(num): rng.choice(AnswerOptions.epi.value) for num in range(1, 58)},
+    }
+
+
+@pytest_asyncio.fixture
+async def packed_storage(tmp_path, monkeypatch):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(operations, "write_queue", None)
+    monkeypatch.setattr(operations, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(operations, "ANSWERS_STORAGE", "packed")
+    yield factory
+    await engine.dispose()
+
+
+class TestAnswerCodec:
+    """Тесты упакованного формата ответов"""
+
+    def test_rank_all_partial_permutations(self):
+        """Тест: номера упорядоченных выборок взаимно однозначны"""
+        options = AnswerOptions.inq.value
+        for length in range(len(options) + 1):
+            ranks = set()
+            for sequence in itertools.permutations(options, length):
+                rank = rank_partial(sequence, options)
+                assert unrank_partial(rank, length, options) == list(sequence)
+                ranks.add(rank)
+            assert ranks == set(range(len(ranks)))
+
+    def test_full_roundtrip_and_size(self):
+        """Тест: полный тест упаковывается без потерь в десятки байт"""
+        for seed in range(20):
+            answers = full_answers(seed)
+            packed = encode_answers(answers)
+
+            assert decode_answers(packed) == answers
+            assert len(packed) == 32
+            assert len(json.dumps(answers, ensure_ascii=False).encode()) > 50 * len(packed)
+
+    @pytest.mark.parametrize(
+        "answers",
+        [
+            {},
+            {"priorities": {}},
+            {"priorities": {"relationships": 3}, "inq": {}},
+            {"priorities": {"personal_wellbeing": 4, "material_career": 1, "self_realization": 2}},
+            {"inq": {"question_1": inq_question("31524"), "question_2": {}}},
+            {"inq": {"question_1": inq_question("31524"), "question_2": inq_question("2514")}},
+            {"inq": {"question_1": inq_question("5")}, "epi": {}},
+            {"epi": {"1": "Да", "2": "Нет", "3": "Да"}},
+        ],
+    )
+    def test_partial_roundtrip(self, answers):
+        """Тест: незавершенные тесты восстанавливаются в прежнем виде"""
+        assert decode_answers(encode_answers(answers)) == answers
+
+    @pytest.mark.parametrize(
+        "answers",
+        [
+            {"unknown": {}},
+            {"priorities": {"relationships": 3, "material_career": 3}},
+            {"inq": {"question_2": inq_question("12345")}},
+            {"inq": {"question_1": {"1": 4}}},
+            {"epi": {"2": "Да"}},
+            {"epi": {"1": "Может быть"}},
+        ],
+    )
+    def test_nonstandard_answers_rejected(self, answers):
+        """Тест: нестандартные ответы не упаковываются"""
+        with pytest.raises(AnswerCodecError):
+            encode_answers(answers)
+
+    def test_unknown_version(self):
+        """Тест неизвестной версии формата"""
+        with pytest.raises(AnswerCodecError):
+            decode_answers(b"\x09\x00")
+
+    def test_scoring_from_packed(self):
+        """Тест: подсчет баллов принимает упакованные ответы"""
+        answers = full_answers()
+        packed = encode_answers(answers)
+        for task in (PrioritiesTask(), InqTask(), EpiTask()):
+            if isinstance(task, InqTask):
+                task.questions = task._get_default_inq_questions()
+            elif isinstance(task, EpiTask):
+                task.questions = task._get_default_epi_questions()
+            assert task.calculate_scores(packed) == task.calculate_scores(answers)
+
+    def test_answer_columns(self):
+        """Тест выбора колонок по режиму хранения"""
+        answers = {"epi": {"1": "Да"}}
+
+        assert answer_columns(answers, storage="json") == {"answers_json": answers, "answers_packed": None}
+        packed = {"answers_json": None, "answers_packed": b"\x01\x04\x01\x01"}
+        assert answer_columns(answers, storage="packed") == packed
+        assert answer_columns({"custom": {}}, storage="packed")["answers_json"] == {"custom": {}}
+
+    @pytest.mark.asyncio
+    async def test_packed_storage(self, packed_storage):
+        """Тест: в режиме packed answers_json хранится как SQL NULL, ответы читаются из answers_packed"""
+        answers = full_answers()
+        async with packed_storage() as session:
+            session.add(User(user_id=1, answers_json={"epi": {"1": "Нет"}}))
+            await session.commit()
+
+        await update_user(user_id=1, answers_json=answers)
+
+        async with packed_storage() as session:
+            user = (await session.execute(select(User))).scalar_one()
+            raw = (await session.execute(text("SELECT answers_json IS NULL FROM users"))).scalar_one()
+        assert raw == 1
+        assert user.load_answers() == answers
@@ -0,0 +1,212 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from config.const import TaskType
+from src.core.task_manager import TaskManager
+from src.database.models import Base, User
+from src.database.answer_log import (
+    AnswerEvent,
+    AnswerLog,
+    EVENT_RESET,
+    EVENT_SET,
+    EVENT_UNSET,
+    apply_event,
+    read_records,
+)
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'log.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(User(user_id=12345, username="test_user", answers_json={"epi": {"1": "Нет"}}))
+        await session.commit()
+
+    yield factory
+    await engine.dispose()
+
+
+async def load_user(session_factory, user_id=12345) -> User:
+    async with session_factory() as session:
+        result = await session.execute(select(User).where(User.user_id == user_id))
+        return result.scalar_one()
+
+
+class TestAnswerLog:
+    """Тесты лога ответов с групповым fsync"""
+
+    def test_event_roundtrip(self):
+        """Тест кодирования и разбора события"""
+        event = AnswerEvent(
+            kind=EVENT_SET,
+            user_id=12345,
+            task_type=TaskType.inq.value,
+            current_task_type=2,
+            current_question=3,
+            current_step=1,
+            key="question_4:2",
+            score=5,
+            timestamp=1.5,
+        )
+
+        data = event.encode() + event.encode()
+        events, size = read_records(data)
+
+        assert size == len(data)
+        assert [e for _, e in events] == [event, event]
+
+    def test_read_records_torn_tail(self):
+        """Тест отбрасывания недописанной записи"""
+        record = AnswerEvent(kind=EVENT_SET, user_id=1, task_type=TaskType.epi.value, key="1", value="Да").encode()
+
+        events, size = read_records(record + record[:-3])
+
+        assert len(events) == 1
+        assert size == len(record)
+
+    def test_apply_event(self):
+        """Тест применения событий к answers_json"""
+        answers = {}
+        answers = apply_event(
+            answers, AnswerEvent(kind=EVENT_SET, user_id=1, task_type=TaskType.priorities.value, key="relationships", score=4)
+        )
+        answers = apply_event(
+            answers, AnswerEvent(kind=EVENT_SET, user_id=1, task_type=TaskType.inq.value, key="question_1:3", score=5)
+        )
+        answers = apply_event(
+            answers, AnswerEvent(kind=EVENT_SET, user_id=1, task_type=TaskType.epi.value, key="7", value="Нет")
+        )
+
+        assert answers == {
+            "priorities": {"relationships": 4},
+            "inq": {"question_1": {"3": 5}},
+            "epi": {"7": "Нет"},
+        }
+
+        answers = apply_event(
+            answers, AnswerEvent(kind=EVENT_UNSET, user_id=1, task_type=TaskType.inq.value, key="question_1:3")
+        )
+        assert answers["inq"] == {}
+
+        assert apply_event(answers, AnswerEvent(kind=EVENT_RESET, user_id=1)) == {}
+
+    @pytest.mark.asyncio
+    async def test_append_and_apply(self, session_factory, tmp_path):
+        """Тест записи событий и переноса их в БД"""
+        log = AnswerLog(str(tmp_path / "answers.log"), apply_interval_ms=10_000, session_factory=session_factory)
+        await log.start()
+
+        await log.append(AnswerEvent(kind=EVENT_RESET, user_id=12345))
+        await log.append(
+            AnswerEvent(
+                kind=EVENT_SET,
+                user_id=12345,
+                task_type=TaskType.epi.value,
+                current_task_type=3,
+                current_question=1,
+                key="1",
+                value="Да",
+            )
+        )
+        assert log.pending_count == 2
+
+        await log.stop()
+
+        user = await load_user(session_factory)
+        assert user.answers_json == {"epi": {"1": "Да"}}
+        assert user.current_task_type == 3
+        assert user.current_question == 1
+        assert (tmp_path / "answers.log").stat().st_size == 0
+
+    @pytest.mark.asyncio
+    async def test_replay_after_crash(self, session_factory, tmp_path):
+        """Тест проигрывания неприменённых событий при старте"""
+        path = str(tmp_path / "answers.log")
+        log = AnswerLog(path, apply_interval_ms=10_000, session_factory=session_factory)
+        await log.start()
+        await log.append(
+            AnswerEvent(kind=EVENT_SET, user_id=12345, task_type=TaskType.epi.value, key="2", value="Да")
+        )
+        # Процесс "упал": applier не успел отработать
+        for task in log._tasks:
+            task.cancel()
+        log._file.close()
+
+        user = await load_user(session_factory)
+        assert user.answers_json == {"epi": {"1": "Нет"}}
+
+        restarted = AnswerLog(path, session_factory=session_factory)
+        await restarted.start()
+        await restarted.stop()
+
+        user = await load_user(session_factory)
+        assert user.answers_json == {"epi": {"1": "Нет", "2": "Да"}}
+
+    @pytest.mark.asyncio
+    async def test_failed_write_truncated(self, session_factory, tmp_path):
+        """Тест: недописанная при ошибке группа обрезается, следующие события проигрываются"""
+        path = str(tmp_path / "answers.log")
+        log = AnswerLog(path, apply_interval_ms=10_000, session_factory=session_factory)
+        await log.start()
+        write_and_sync = log._write_and_sync
+
+        def torn_write(data: bytes):
+            log._file.write(data[: len(data) // 2])
+            raise OSError("No space left on device")
+
+        def answer(key: str) -> AnswerEvent:
+            return AnswerEvent(kind=EVENT_SET, user_id=12345, task_type=TaskType.epi.value, key=key, value="Да")
+
+        log._write_and_sync = torn_write
+        with pytest.raises(OSError):
+            await log.append(answer("2"))
+        log._write_and_sync = write_and_sync
+        await log.append(answer("3"))
+
+        for task in log._tasks:
+            task.cancel()
+        log._file.close()
+
+        restarted = AnswerLog(path, session_factory=session_factory)
+        await restarted.start()
+        await restarted.stop()
+
+        user = await load_user(session_factory)
+        assert user.answers_json == {"epi": {"1": "Нет", "3": "Да"}}
+
+    @pytest.mark.asyncio
+    async def test_append_after_stop_fails(self, session_factory, tmp_path):
+        """Тест: запись в остановленный лог - ошибка, а не вечное ожидание fsync"""
+        log = AnswerLog(str(tmp_path / "answers.log"), session_factory=session_factory)
+        await log.start()
+        await log.stop()
+
+        with pytest.raises(RuntimeError):
+            await log.append(AnswerEvent(kind=EVENT_RESET, user_id=12345))
+
+    @pytest.mark.asyncio
+    async def test_task_manager_writes_to_log(self, session_factory, tmp_path, mocker):
+        """Тест записи ответов TaskManager через лог вместо update_user"""
+        update_user = mocker.patch("src.core.task_manager.update_user")
+        log = AnswerLog(str(tmp_path / "answers.log"), apply_interval_ms=10_000, session_factory=session_factory)
+        await log.start()
+
+        manager = TaskManager(answer_log=log)
+        user = User(user_id=12345)
+        await manager.start_tasks(user)
+        manager.active_tasks[user.user_id]["current_task_type"] = TaskType.epi.value
+
+        success, _ = await manager.process_epi_answer(user, "Да")
+        await log.stop()
+
+        assert success is True
+        update_user.assert_not_called()
+        stored = await load_user(session_factory)
+        assert stored.answers_json == {"epi": {"1": "Да"}}
+        assert stored.current_question == 1
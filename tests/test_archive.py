@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.answer_codec import encode_answers
+from src.database import operations
+from src.database.archive import (
+    archive_attempt,
+    load_latest_answers,
+    move_completed_payloads,
+    pack_attempt,
+    purge_attempts,
+    unpack_attempt,
+)
+from src.database.models import Base, User, UserAttempt, create_engine_for_url
+
+ANSWERS = {"inq": {"question_1": {"1": 5, "2": 4, "3": 3, "4": 2, "5": 1}}, "epi": {"1": "Да", "2": "Нет"}}
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path, monkeypatch):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(operations, "write_queue", None)
+    monkeypatch.setattr(operations, "AsyncSessionLocal", factory)
+    yield factory
+    await engine.dispose()
+
+
+async def add_user(factory, user_id: int, completed: bool, **fields) -> User:
+    async with factory() as session:
+        user = User(user_id=user_id, answers_json=ANSWERS, test_completed=completed, **fields)
+        session.add(user)
+        await session.commit()
+        return user
+
+
+async def age_users(factory, seconds: int):
+    async with factory() as session:
+        await session.execute(update(User).values(updated_at=func.datetime("now", f"-{seconds} seconds")))
+        await session.commit()
+
+
+class TestAttemptArchive:
+    """Тесты архива завершенных попыток"""
+
+    def test_pack_roundtrip(self):
+        """Тест сжатия попытки"""
+        payload = pack_attempt(ANSWERS, {"relationships": 2}, {"Синтетический": 5}, {"temperament": "Флегматик"})
+
+        assert unpack_attempt(payload)["answers"] == ANSWERS
+        assert unpack_attempt(payload)["epi_scores"] == {"temperament": "Флегматик"}
+
+    @pytest.mark.asyncio
+    async def test_every_attempt_archived(self, session_factory):
+        """Тест: каждая попытка сохраняется, последняя доступна для выгрузки"""
+        user = await add_user(session_factory, 1, completed=True)
+        await archive_attempt(user, {"epi": {"1": "Да"}}, {}, {}, {"temperament": "Холерик"})
+        await archive_attempt(user, ANSWERS, {}, {}, {"temperament": "Флегматик"})
+
+        async with session_factory() as session:
+            attempts = (await session.execute(select(UserAttempt))).scalars().all()
+            latest = await load_latest_answers(session, [1, 2])
+
+        assert [attempt.temperament for attempt in attempts] == ["Холерик", "Флегматик"]
+        assert latest == {1: ANSWERS}
+
+    @pytest.mark.asyncio
+    async def test_move_completed_payloads(self, session_factory):
+        """Тест: ответы завершенных строк переносятся пачками, незавершенные не трогаются"""
+        await add_user(session_factory, 1, completed=True, archived_at=datetime.now())
+        await add_user(session_factory, 2, completed=True)
+        await add_user(session_factory, 3, completed=False)
+
+        # Недавно завершенные строки остаются до истечения задержки
+        assert await move_completed_payloads(batch_size=10, grace_seconds=300) == 0
+
+        await age_users(session_factory, 600)
+        assert await move_completed_payloads(batch_size=1, grace_seconds=300) == 1
+        assert await move_completed_payloads(batch_size=10, grace_seconds=300) == 1
+        assert await move_completed_payloads(batch_size=10, grace_seconds=300) == 0
+
+        async with session_factory() as session:
+            users = {user.user_id: user for user in (await session.execute(select(User))).scalars()}
+            attempts = (await session.execute(select(UserAttempt))).scalars().all()
+
+        assert users[1].answers_json is None and users[2].answers_json is None
+        assert users[3].answers_json == ANSWERS
+        assert users[2].archived_at is not None
+        # Строка без archived_at (завершена до архива) скопирована в user_attempts перед переносом
+        assert [(attempt.user_id, unpack_attempt(attempt.payload)["answers"]) for attempt in attempts] == [(2, ANSWERS)]
+
+    @pytest.mark.asyncio
+    async def test_move_packed_payloads(self, session_factory):
+        """Тест: ответы в answers_packed (ANSWERS_STORAGE=packed) тоже переносятся и удаляются"""
+        async with session_factory() as session:
+            session.add(User(user_id=1, answers_json=None, answers_packed=encode_answers(ANSWERS), test_completed=True))
+            await session.commit()
+
+        await age_users(session_factory, 600)
+        assert await move_completed_payloads(batch_size=10, grace_seconds=300) == 1
+        assert await move_completed_payloads(batch_size=10, grace_seconds=300) == 0
+
+        async with session_factory() as session:
+            user = (await session.execute(select(User))).scalar_one()
+            attempt = (await session.execute(select(UserAttempt))).scalar_one()
+
+        assert user.answers_packed is None and user.answers_json is None
+        assert unpack_attempt(attempt.payload)["answers"] == ANSWERS
+
+    @pytest.mark.asyncio
+    async def test_purge_by_retention(self, session_factory):
+        """Тест: удаление старых попыток пачками"""
+        user = await add_user(session_factory, 1, completed=True)
+        for _ in range(5):
+            await archive_attempt(user, ANSWERS, {}, {}, {})
+        async with session_factory() as session:
+            await session.execute(
+                update(UserAttempt)
+                .where(UserAttempt.id <= 3)
+                .values(completed_at=datetime.now() - timedelta(days=400))
+            )
+            await session.commit()
+
+        assert await purge_attempts(retention_days=365, batch_size=2) == 3
+
+        async with session_factory() as session:
+            remaining = (await session.execute(select(UserAttempt.id))).scalars().all()
+        assert remaining == [4, 5]
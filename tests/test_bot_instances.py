@@ -0,0 +1,79 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from aiogram.client.session.aiohttp import AiohttpSession
+
+from src.bot.instances import BotConfig, create_bot_instances, load_bot_configs
+from src.bot.middlewares import BotContextMiddleware
+from src.core.metrics import metrics
+
+
+class TestBotInstances:
+    """Тесты нескольких ботов в одном процессе"""
+
+    def test_load_configs(self, tmp_path):
+        """Тест чтения списка ботов из файла"""
+        path = tmp_path / "bots.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "bots": [
+                        {"name": "first", "token": "1:AAA", "admin_user_id": 10},
+                        {"name": "second", "token": "2:BBB"},
+                    ]
+                }
+            )
+        )
+
+        configs = load_bot_configs(str(path))
+
+        assert configs == [BotConfig("first", "1:AAA", 10), BotConfig("second", "2:BBB", 0)]
+
+    def test_duplicate_names_rejected(self, tmp_path):
+        """Тест запрета одинаковых имен ботов"""
+        path = tmp_path / "bots.json"
+        path.write_text(json.dumps({"bots": [{"name": "a", "token": "1:A"}, {"name": "a", "token": "2:B"}]}))
+
+        with pytest.raises(ValueError):
+            load_bot_configs(str(path))
+
+    def test_default_config(self):
+        """Тест одного бота из BOT_TOKEN без файла"""
+        configs = load_bot_configs("")
+
+        assert len(configs) == 1
+        assert configs[0].name == "default"
+
+    @pytest.mark.asyncio
+    async def test_instances_share_session(self):
+        """Тест общего HTTP пула и отдельного состояния тестов у каждого бота"""
+        session = AiohttpSession()
+        instances = create_bot_instances(
+            [BotConfig("first", "1:AAA", 10), BotConfig("second", "2:BBB", 20)], session=session
+        )
+        await session.close()
+
+        first, second = instances[1], instances[2]
+        assert first.bot.session is second.bot.session
+        assert first.task_manager is not second.task_manager
+        assert first.task_manager.reminder_callback == first.send_session_reminder
+
+    @pytest.mark.asyncio
+    async def test_middleware_injects_bot_context(self):
+        """Тест передачи TaskManager бота хендлеру и метки бота в метриках"""
+        metrics.reset()
+        instances = create_bot_instances([BotConfig("first", "1:AAA"), BotConfig("second", "2:BBB")])
+        middleware = BotContextMiddleware(instances)
+
+        async def handler(event, data):
+            metrics.inc("telegram_edits_full")
+            return data["task_manager"]
+
+        result = await middleware(handler, MagicMock(), {"bot": instances[2].bot})
+        await instances[1].bot.session.close()
+
+        assert result is instances[2].task_manager
+        assert metrics.get("telegram_edits_full", bot="second") == 1
+        assert metrics.total("telegram_edits_full") == 1
+        metrics.reset()
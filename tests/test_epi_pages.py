@@ -0,0 +1,132 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+import pytest_asyncio
+
+from config.const import TaskEntity, TaskSection, TaskType
+from src.core.task_manager import TaskManager
+from src.database.models import User
+
+
+@pytest_asyncio.fixture
+async def epi_questions():
+    await TaskEntity.epi.value.load_questions()
+    return TaskEntity.epi.value.get_total_questions()
+
+
+@pytest.fixture
+def user():
+    user = Mock(spec=User)
+    user.user_id = 12345
+    user.abandoned_at = None
+    return user
+
+
+def epi_state() -> dict:
+    return {
+        "current_task_type": TaskType.epi.value,
+        "current_question": 0,
+        "current_step": 0,
+        "answers": {},
+        "history": [],
+    }
+
+
+def answer_for(question_num: int) -> str:
+    return "Да" if question_num % 3 else "Нет"
+
+
+class TestEpiPages:
+    """Тесты EPI страницами: выбор ответов в памяти, одна запись на страницу"""
+
+    @pytest.mark.asyncio
+    async def test_page_saved_with_one_write(self, monkeypatch, epi_questions, user):
+        """Выбор ответов не пишет в БД, "Далее" сохраняет страницу одним update_user"""
+        update_user = AsyncMock()
+        monkeypatch.setattr("src.core.task_manager.update_user", update_user)
+        manager = TaskManager(epi_page_size=5)
+        manager.active_tasks[user.user_id] = epi_state()
+
+        for question_num in manager.epi_page(0):
+            success, _ = await manager.select_epi_page_answer(user, 0, question_num, answer_for(question_num))
+            assert success
+        update_user.assert_not_awaited()
+
+        success, _ = await manager.submit_epi_page(user, 0)
+
+        assert success
+        update_user.assert_awaited_once()
+        state = manager.get_task_state(user.user_id)
+        assert state["current_question"] == 5
+        assert "epi_page" not in state
+        assert update_user.await_args.kwargs["current_question"] == 5
+        assert state["answers"][TaskSection.epi.value] == {str(num + 1): answer_for(num) for num in range(5)}
+
+    @pytest.mark.asyncio
+    async def test_incomplete_and_stale_pages_rejected(self, monkeypatch, epi_questions, user):
+        """Неполная страница и кнопки уже сохраненной страницы не меняют состояние"""
+        update_user = AsyncMock()
+        monkeypatch.setattr("src.core.task_manager.update_user", update_user)
+        manager = TaskManager(epi_page_size=5)
+        manager.active_tasks[user.user_id] = epi_state()
+
+        await manager.select_epi_page_answer(user, 0, 0, "Да")
+        success, message = await manager.submit_epi_page(user, 0)
+        assert not success
+        assert manager.get_task_state(user.user_id)["current_question"] == 0
+
+        for question_num in manager.epi_page(0):
+            await manager.select_epi_page_answer(user, 0, question_num, "Да")
+        assert (await manager.submit_epi_page(user, 0))[0]
+
+        assert not (await manager.submit_epi_page(user, 0))[0]
+        assert not (await manager.select_epi_page_answer(user, 0, 1, "Нет"))[0]
+        assert not (await manager.select_epi_page_answer(user, 5, 11, "Нет"))[0]
+        assert update_user.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_scores_match_single_question_mode(self, monkeypatch, epi_questions, user):
+        """Страницы дают те же ответы и баллы EPI, что и режим по одному вопросу, за ceil(N/K) записей"""
+        update_user = AsyncMock()
+        monkeypatch.setattr("src.core.task_manager.update_user", update_user)
+
+        single = TaskManager()
+        single.active_tasks[user.user_id] = epi_state()
+        for question_num in range(epi_questions):
+            await single.process_epi_answer(user, answer_for(question_num))
+        assert update_user.await_count == epi_questions
+
+        update_user.reset_mock()
+        paged = TaskManager(epi_page_size=8)
+        paged.active_tasks[user.user_id] = epi_state()
+        page = paged.epi_page(0)
+        while page:
+            for question_num in page:
+                await paged.select_epi_page_answer(user, page.start, question_num, answer_for(question_num))
+            assert (await paged.submit_epi_page(user, page.start))[0]
+            page = paged.epi_page(page.stop)
+
+        assert update_user.await_count == -(-epi_questions // 8)
+        single_answers = single.get_task_state(user.user_id)["answers"]
+        paged_answers = paged.get_task_state(user.user_id)["answers"]
+        assert paged_answers == single_answers
+        assert TaskEntity.epi.value.calculate_scores(paged_answers) == TaskEntity.epi.value.calculate_scores(
+            single_answers
+        )
+
+    @pytest.mark.asyncio
+    async def test_answer_log_gets_page_in_one_append(self, epi_questions, user):
+        """С логом ответов страница уходит одним append_many со всеми событиями"""
+        answer_log = Mock()
+        answer_log.append_many = AsyncMock()
+        manager = TaskManager(answer_log=answer_log, epi_page_size=5)
+        manager.active_tasks[user.user_id] = epi_state()
+
+        for question_num in manager.epi_page(0):
+            await manager.select_epi_page_answer(user, 0, question_num, "Да")
+        await manager.submit_epi_page(user, 0)
+
+        answer_log.append_many.assert_awaited_once()
+        events = answer_log.append_many.await_args.args[0]
+        assert [event.key for event in events] == ["1", "2", "3", "4", "5"]
+        assert all(event.current_question == 5 for event in events)
@@ -0,0 +1,186 @@
+import csv
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.database.archive import pack_attempt
+from src.database.models import Base, User, UserAttempt
+from src.database.export import EXPORT_COLUMNS, export_results, flatten_user_row
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'export.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        for i in range(1, 8):
+            session.add(
+                User(
+                    user_id=1000 + i,
+                    username=f"user_{i}",
+                    answers_json={
+                        "inq": {"question_1": {"1": 5, "2": 4, "3": 3, "4": 2, "5": 1}},
+                        "epi": {"1": "Да", "2": "Нет"},
+                    },
+                    inq_scores_json={"Синтетический": 5, "Аналитический": 2},
+                    epi_scores_json={"E": 1, "N": 0, "L": 0, "temperament": "Флегматик"},
+                    priorities_json={"personal_wellbeing": 4},
+                    test_completed=i % 2 == 0,
+                )
+            )
+        await session.commit()
+
+    yield factory
+    await engine.dispose()
+
+
+class TestExport:
+    """Тесты потоковой выгрузки результатов"""
+
+    def test_flatten_user_row(self):
+        """Тест разворачивания JSON полей в колонки"""
+        row = {
+            "id": 1,
+            "user_id": 42,
+            "answers_json": {"inq": {"question_2": {"3": 5}}, "epi": {"57": "Нет"}},
+            "inq_scores_json": {"Реалистический": 10},
+            "epi_scores_json": {"E": 3, "temperament": "Сангвиник"},
+            "priorities_json": {"relationships": 2},
+        }
+
+        flat = flatten_user_row(row)
+
+        assert set(flat.keys()) == {name for name, _ in EXPORT_COLUMNS}
+        assert flat["user_id"] == 42
+        assert flat["answer_inq_2_3"] == 5
+        assert flat["answer_inq_1_1"] is None
+        assert flat["answer_epi_57"] == "Нет"
+        assert flat["inq_Реалистический"] == 10
+        assert flat["epi_temperament"] == "Сангвиник"
+        assert flat["priority_relationships"] == 2
+
+    def test_flatten_empty_row(self):
+        """Тест пользователя без ответов"""
+        flat = flatten_user_row({"id": 1, "user_id": 42})
+
+        assert flat["answer_epi_1"] is None
+        assert flat["inq_Синтетический"] is None
+
+    @pytest.mark.asyncio
+    async def test_export_csv(self, session_factory, tmp_path):
+        """Тест выгрузки в CSV чанками"""
+        output = tmp_path / "results.csv"
+
+        exported = await export_results(str(output), chunk_size=3, session_factory=session_factory)
+
+        assert exported == 7
+        with open(output, encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 7
+        assert rows[0]["user_id"] == "1001"
+        assert rows[0]["answer_inq_1_1"] == "5"
+        assert rows[0]["answer_epi_2"] == "Нет"
+
+    @pytest.mark.asyncio
+    async def test_export_resume_from_checkpoint(self, session_factory, tmp_path):
+        """Тест продолжения выгрузки по чекпоинту"""
+        output = tmp_path / "results.csv"
+        checkpoint = tmp_path / "results.ckpt"
+
+        await export_results(str(output), chunk_size=3, checkpoint_path=str(checkpoint), session_factory=session_factory)
+
+        async with session_factory() as session:
+            session.add(User(user_id=2000, username="late_user"))
+            await session.commit()
+
+        exported = await export_results(
+            str(output), chunk_size=3, checkpoint_path=str(checkpoint), session_factory=session_factory
+        )
+
+        assert exported == 1
+        with open(output, encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert [row["user_id"] for row in rows][-2:] == ["1007", "2000"]
+        assert len(rows) == 8
+
+    @pytest.mark.asyncio
+    async def test_resume_truncates_rows_after_checkpoint(self, session_factory, tmp_path):
+        """Тест: строки, записанные после последнего чекпоинта, отрезаются и выгружаются заново"""
+        output = tmp_path / "results.csv"
+        checkpoint = tmp_path / "results.ckpt"
+        await export_results(
+            str(output), chunk_size=3, checkpoint_path=str(checkpoint), session_factory=session_factory
+        )
+
+        with open(output, "a", encoding="utf-8") as f:
+            f.write("99,2000,torn")
+        async with session_factory() as session:
+            session.add(User(user_id=2000, username="late_user"))
+            await session.commit()
+
+        await export_results(
+            str(output), chunk_size=3, checkpoint_path=str(checkpoint), session_factory=session_factory
+        )
+
+        with open(output, encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert [row["user_id"] for row in rows] == [str(1000 + i) for i in range(1, 8)] + ["2000"]
+
+    @pytest.mark.asyncio
+    async def test_resume_without_output_restarts(self, session_factory, tmp_path):
+        """Тест: чекпоинт без файла выгрузки отбрасывается, выгрузка начинается заново"""
+        output = tmp_path / "results.csv"
+        checkpoint = tmp_path / "results.ckpt"
+        await export_results(
+            str(output), chunk_size=3, checkpoint_path=str(checkpoint), session_factory=session_factory
+        )
+        output.unlink()
+
+        exported = await export_results(
+            str(output), chunk_size=3, checkpoint_path=str(checkpoint), session_factory=session_factory
+        )
+
+        assert exported == 7
+        with open(output, encoding="utf-8") as f:
+            assert len(list(csv.DictReader(f))) == 7
+
+    @pytest.mark.asyncio
+    async def test_export_archived_answers(self, session_factory, tmp_path):
+        """Тест: ответы, перенесенные в архив попыток, попадают в выгрузку"""
+        output = tmp_path / "results.csv"
+        async with session_factory() as session:
+            session.add(User(user_id=3000, test_completed=True))
+            session.add(UserAttempt(user_id=3000, payload=pack_attempt({"epi": {"1": "Нет"}}, {}, {}, {})))
+            await session.commit()
+
+        await export_results(str(output), chunk_size=3, session_factory=session_factory)
+
+        with open(output, encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert rows[-1]["user_id"] == "3000"
+        assert rows[-1]["answer_epi_1"] == "Нет"
+
+    @pytest.mark.asyncio
+    async def test_export_parquet(self, session_factory, tmp_path):
+        """Тест выгрузки в Parquet"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        output = tmp_path / "results.parquet"
+
+        exported = await export_results(str(output), fmt="parquet", chunk_size=2, session_factory=session_factory)
+
+        table = pq.read_table(output)
+        assert exported == 7
+        assert pq.ParquetFile(output).num_row_groups == 4
+        assert not list(tmp_path.glob("results.part*")) and not list(tmp_path.glob("*.tmp"))
+        assert table.num_rows == 7
+        assert table.column("answer_inq_1_2").to_pylist()[0] == 4
+
+    @pytest.mark.asyncio
+    async def test_export_unknown_format(self, tmp_path):
+        """Тест неизвестного формата выгрузки"""
+        with pytest.raises(ValueError):
+            await export_results(str(tmp_path / "results.xml"), fmt="xml")
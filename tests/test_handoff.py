@@ -0,0 +1,182 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.handoff import HandoffDispatcher
+from src.core.metrics import metrics
+from src.database import operations
+from src.database.handoff_queue import count_handoffs, enqueue_handoff
+from src.database.models import Base, User, create_engine_for_url
+from src.database.operations import get_or_create_user, unit_of_work, update_user
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path, monkeypatch):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(operations, "write_queue", None)
+    monkeypatch.setattr(operations, "AsyncSessionLocal", factory)
+    metrics.reset()
+    yield factory
+    await engine.dispose()
+
+
+class StubSenler:
+    """
+    Локальный HTTP сервер вместо Senler: отвечает статусами из списка, потом 200
+    """
+
+    def __init__(self):
+        self.statuses = []
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        self.requests.append({"authorization": request.headers.get("Authorization"), "body": await request.json()})
+        await asyncio.sleep(0.02)
+        self.active -= 1
+        return web.json_response({}, status=self.statuses.pop(0) if self.statuses else 200)
+
+
+@pytest_asyncio.fixture
+async def stub():
+    senler = StubSenler()
+    app = web.Application()
+    app.router.add_post("/handoff", senler.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    senler.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/handoff"
+    yield senler
+    await runner.cleanup()
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with httpx.AsyncClient() as http_client:
+        yield http_client
+
+
+def dispatcher(url: str, client: httpx.AsyncClient, **kwargs) -> HandoffDispatcher:
+    kwargs.setdefault("backoff_base", 0)
+    return HandoffDispatcher(url=url, token="secret", step="after_test", client_factory=lambda: client, **kwargs)
+
+
+def user(user_id: int) -> SimpleNamespace:
+    return SimpleNamespace(user_id=user_id, username=f"user_{user_id}")
+
+
+class TestHandoffDispatcher:
+    """Тесты передачи пользователей в Senler через локальный сервер-заглушку"""
+
+    @pytest.mark.asyncio
+    async def test_delivered_and_removed(self, session_factory, stub, client):
+        """Событие уходит с токеном и event_id и удаляется из очереди"""
+        handoff = dispatcher(stub.url, client)
+        await handoff.enqueue(user(1), "Сангвиник")
+
+        assert await handoff.run_once() == 1
+
+        request = stub.requests[0]
+        assert request["authorization"] == "Bearer secret"
+        assert request["body"]["user_id"] == 1
+        assert request["body"]["step"] == "after_test"
+        assert request["body"]["temperament"] == "Сангвиник"
+        assert "event_id" in request["body"]
+        assert await count_handoffs() == {"pending": 0, "failed": 0}
+        assert metrics.get("handoff_delivered") == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_after_server_error(self, session_factory, stub, client):
+        """5xx - повтор с задержкой, затем доставка"""
+        stub.statuses = [503]
+        handoff = dispatcher(stub.url, client)
+        await handoff.enqueue(user(1), None)
+
+        await handoff.run_once()
+        assert await count_handoffs() == {"pending": 1, "failed": 0}
+        await handoff.run_once()
+
+        assert await count_handoffs() == {"pending": 0, "failed": 0}
+        assert metrics.get("handoff_errors", reason="503") == 1
+        assert metrics.get("handoff_retries") == 1
+        assert metrics.get("handoff_delivered") == 1
+
+    @pytest.mark.asyncio
+    async def test_rejected_not_retried(self, session_factory, stub, client):
+        """4xx - событие помечается недоставленным без повторов"""
+        stub.statuses = [400]
+        handoff = dispatcher(stub.url, client)
+        await handoff.enqueue(user(1), None)
+
+        await handoff.run_once()
+
+        assert await handoff.run_once() == 0
+        assert await count_handoffs() == {"pending": 0, "failed": 1}
+        assert metrics.get("handoff_failed") == 1
+
+    @pytest.mark.asyncio
+    async def test_attempts_exhausted(self, session_factory, client):
+        """Недоступный адрес: повторы до max_attempts, затем событие недоставлено"""
+        handoff = dispatcher("http://127.0.0.1:1/handoff", client, max_attempts=2)
+        await handoff.enqueue(user(1), None)
+
+        await handoff.run_once()
+        await handoff.run_once()
+
+        assert await count_handoffs() == {"pending": 0, "failed": 1}
+        assert metrics.get("handoff_errors", reason="network") == 2
+
+    @pytest.mark.asyncio
+    async def test_batches_and_concurrency(self, session_factory, stub, client):
+        """События уходят пачками, одновременных запросов на адрес не больше concurrency"""
+        handoff = dispatcher(stub.url, client, batch_size=2, concurrency=2)
+        for user_id in range(5):
+            await handoff.enqueue(user(user_id), None)
+
+        assert await handoff.run_once() == 4
+        assert await handoff.run_once() == 1
+
+        assert [len(request["body"]["events"]) for request in stub.requests] == [2, 2, 1]
+        assert stub.max_active <= 2
+        assert metrics.get("handoff_delivered") == 5
+
+    @pytest.mark.asyncio
+    async def test_disabled_without_url(self, session_factory):
+        """Без SENLER_HANDOFF_URL очередь не пополняется"""
+        handoff = HandoffDispatcher(url="")
+        await handoff.enqueue(user(1), None)
+        assert await count_handoffs() == {"pending": 0, "failed": 0}
+
+    @pytest.mark.asyncio
+    async def test_enqueue_error_keeps_completion(self, session_factory, client, monkeypatch):
+        """Тест: сбой записи в очередь теряет только строку очереди, завершение фиксируется"""
+        handoff = dispatcher("http://senler.invalid/handoff", client)
+        # NOT NULL endpoint: ошибка INSERT в БД при flush
+        def enqueue_without_endpoint(endpoint, user_id, payload):
+            return enqueue_handoff(None, user_id, payload)
+
+        monkeypatch.setattr("src.core.handoff.enqueue_handoff", enqueue_without_endpoint)
+
+        async with unit_of_work():
+            await get_or_create_user(user_id=1)
+            await update_user(user_id=1, test_completed=True)
+            await handoff.enqueue(user(1), "Флегматик")
+
+        async with session_factory() as session:
+            stored = (await session.execute(User.__table__.select())).one()
+        assert stored.test_completed is True
+        assert await count_handoffs() == {"pending": 0, "failed": 0}
+        assert metrics.get("handoff_enqueue_errors") == 1
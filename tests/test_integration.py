@@ -78,7 +78,9 @@ class TestIntegration:
         """Тест полного цикла прохождения всех тестов"""
 
         # Мокаем update_user
-        with patch("src.core.task_manager.update_user", new_callable=AsyncMock):
+        with patch("src.core.task_manager.update_user", new_callable=AsyncMock), patch(
+            "src.core.task_manager.archive_attempt", new_callable=AsyncMock
+        ):
 
             # 1. Начинаем тестирование
             success = await task_manager.start_tasks(mock_user)
@@ -205,7 +207,9 @@ class TestIntegration:
     async def test_scoring_calculations(self, task_manager, mock_user):
         """Тест правильности подсчета баллов"""
 
-        with patch("src.core.task_manager.update_user", new_callable=AsyncMock):
+        with patch("src.core.task_manager.update_user", new_callable=AsyncMock), patch(
+            "src.core.task_manager.archive_attempt", new_callable=AsyncMock
+        ):
 
             await task_manager.start_tasks(mock_user)
 
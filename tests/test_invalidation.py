@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+import pytest
+
+from src.core.invalidation import (
+    InvalidationBus,
+    LocalSocketTransport,
+    TOPIC_QUESTIONS,
+    TOPIC_USER,
+    create_invalidation_transport,
+)
+from src.core.metrics import metrics
+from src.core.task_manager import TIMER_ABANDON, TIMER_EVICT, TaskManager
+
+
+class MemoryTransport:
+    def __init__(self):
+        self.sent = []
+
+    async def start(self, on_message, on_reconnect):
+        self.on_message = on_message
+        self.on_reconnect = on_reconnect
+
+    async def send(self, payload):
+        self.sent.append(json.loads(payload))
+
+    async def close(self):
+        pass
+
+
+class TestInvalidationBus:
+    """Тесты шины инвалидации кэшей"""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_publications_coalesced(self):
+        """Повторы ключа за интервал уходят одним сообщением на тему"""
+        bus = InvalidationBus(flush_interval=0.01)
+        transport = MemoryTransport()
+        await bus.start(transport)
+
+        for _ in range(100):
+            bus.publish(TOPIC_USER, 1)
+        bus.publish(TOPIC_USER, 2)
+        bus.publish(TOPIC_QUESTIONS)
+        await asyncio.sleep(0.05)
+
+        messages = {message["t"]: message["k"] for message in transport.sent}
+        assert len(transport.sent) == 2
+        assert messages == {TOPIC_USER: ["1", "2"], TOPIC_QUESTIONS: None}
+        assert metrics.get("invalidation_coalesced") == 99
+        await bus.stop()
+
+    @pytest.mark.asyncio
+    async def test_too_many_keys_invalidate_topic(self):
+        """Больше max_keys ключей заменяются инвалидацией всей темы"""
+        bus = InvalidationBus(flush_interval=10, max_keys=3)
+        transport = MemoryTransport()
+        await bus.start(transport)
+
+        for user_id in range(10):
+            bus.publish(TOPIC_USER, user_id)
+        await bus.stop()
+
+        assert transport.sent == [{"o": bus.origin, "t": TOPIC_USER, "k": None}]
+
+    @pytest.mark.asyncio
+    async def test_dispatch_ignores_own_messages(self):
+        """Подписчики получают чужие инвалидации, собственные сообщения процесса пропускаются"""
+        bus = InvalidationBus()
+        received = []
+        bus.subscribe(TOPIC_USER, received.append)
+        await bus.start(MemoryTransport())
+
+        bus._on_message(json.dumps({"o": bus.origin, "t": TOPIC_USER, "k": ["1"]}))
+        bus._on_message(json.dumps({"o": "other", "t": TOPIC_USER, "k": ["2", "3"]}))
+        await asyncio.sleep(0)
+
+        assert received == [{"2", "3"}]
+        await bus.stop()
+
+    @pytest.mark.asyncio
+    async def test_disabled_bus_does_not_queue(self):
+        """Без транспорта публикации не копятся"""
+        bus = InvalidationBus()
+        bus.publish(TOPIC_USER, 1)
+        assert bus.pending == {} and not bus.enabled
+        assert create_invalidation_transport("off") is None
+
+    @pytest.mark.asyncio
+    async def test_local_socket_transport(self, tmp_path):
+        """Unix сокеты: сообщение доходит до других процессов каталога, сокет завершенного удаляется"""
+        first, second = InvalidationBus(flush_interval=0.01), InvalidationBus(flush_interval=0.01)
+        received = asyncio.Queue()
+        second.subscribe(TOPIC_USER, received.put_nowait)
+        await first.start(LocalSocketTransport(str(tmp_path)))
+        await second.start(LocalSocketTransport(str(tmp_path)))
+        stale = tmp_path / "0-dead.sock"
+        stale.touch()
+
+        first.publish(TOPIC_USER, 42)
+        assert await asyncio.wait_for(received.get(), timeout=1) == {"42"}
+        assert not stale.exists()
+
+        await first.stop()
+        await second.stop()
+        assert list(tmp_path.glob("*.sock")) == []
+
+
+class TestEvictSessions:
+    """Тесты выгрузки сессий по инвалидации"""
+
+    def test_evict_selected_and_all(self):
+        """Тест: выгружаются указанные сессии вместе с таймерами, None - все"""
+        manager = TaskManager()
+        for user_id in (1, 2, 3):
+            manager.active_tasks[user_id] = {"answers": {}}
+            manager.touch_session(user_id)
+
+        assert manager.evict_sessions({1, 5}) == 1
+        assert set(manager.active_tasks) == {2, 3}
+        assert manager.timers.remaining((1, TIMER_EVICT)) is None
+
+        assert manager.evict_sessions() == 2
+        assert manager.active_tasks == {}
+
+    def test_evict_cancels_timers_of_idle_sessions(self):
+        """Тест: таймеры сессии, выгруженной по простою, снимаются по инвалидации"""
+        manager = TaskManager()
+        for user_id in (1, 2):
+            manager.touch_session(user_id)
+
+        assert manager.evict_sessions([1]) == 0
+        assert manager.timers.remaining((1, TIMER_ABANDON)) is None
+        assert manager.timers.remaining((2, TIMER_ABANDON)) is not None
+
+        manager.evict_sessions()
+        assert len(manager.timers) == 0
@@ -0,0 +1,98 @@
+import io
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+from src.core.logging_setup import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    SamplingFilter,
+    parse_sample_rates,
+    setup_logging,
+    stop_logging,
+)
+from src.core.metrics import metrics
+
+
+class Unformattable:
+    def __str__(self):
+        raise AssertionError("запись не должна форматироваться")
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    stop_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+class TestLoggingSetup:
+    """Тесты неблокирующего структурированного логирования"""
+
+    def test_json_lines_through_queue(self, restore_root_logger):
+        """Тест записи в JSON-lines через фоновый поток"""
+        stream = io.StringIO()
+        setup_logging(level="INFO", fmt="json", sample_rates="", stream=stream)
+
+        logging.getLogger("test").info("Ответ: пользователь %s", 42, extra={"event": "answer", "user_id": 42})
+        stop_logging()
+
+        record = json.loads(stream.getvalue())
+        assert record["message"] == "Ответ: пользователь 42"
+        assert record["event"] == "answer"
+        assert record["user_id"] == 42
+        assert record["level"] == "INFO"
+
+    def test_sampled_out_records_are_not_formatted(self, restore_root_logger):
+        """Тест: отброшенные выборкой записи не форматируются и не попадают в вывод"""
+        stream = io.StringIO()
+        setup_logging(level="INFO", fmt="json", sample_rates="answer=0", stream=stream)
+
+        logger = logging.getLogger("test")
+        for _ in range(100):
+            logger.info("Ответ %s", Unformattable(), extra={"event": "answer"})
+        logger.info("Тесты начаты")
+        stop_logging()
+
+        lines = stream.getvalue().splitlines()
+        assert [json.loads(line)["message"] for line in lines] == ["Тесты начаты"]
+
+    def test_parse_sample_rates(self):
+        """Тест разбора долей выборки"""
+        assert parse_sample_rates("answer=0.1, timer=0.5") == {"answer": 0.1, "timer": 0.5}
+        assert parse_sample_rates("") == {}
+
+    def test_sampling_filter_passes_other_events(self):
+        """Тест: события без доли выборки проходят всегда"""
+        sampling = SamplingFilter({"answer": 0.0})
+        record = logging.LogRecord("test", logging.INFO, "", 0, "Сообщение", None, None)
+
+        assert sampling.filter(record) is True
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Тест: переполненная очередь отбрасывает запись, а не блокирует"""
+        metrics.reset()
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord("test", logging.INFO, "", 0, "Сообщение", None, None)
+
+        handler.handle(record)
+        handler.handle(record)
+
+        assert metrics.get("log_records_dropped") == 1
+        metrics.reset()
+
+    def test_json_formatter_exception(self):
+        """Тест записи исключения в JSON"""
+        try:
+            raise ValueError("сбой")
+        except ValueError:
+            record = logging.LogRecord("test", logging.ERROR, "", 0, "Ошибка", None, sys.exc_info())
+
+        data = json.loads(JsonFormatter().format(record))
+        assert "ValueError: сбой" in data["exc_info"]
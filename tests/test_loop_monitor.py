@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+
+from src.core.loop_monitor import LoopLagMonitor, SamplingProfiler
+
+
+def blocking_call(seconds: float):
+    time.sleep(seconds)
+
+
+class TestLoopMonitor:
+    """Тесты профайлера и контроля блокировок цикла событий"""
+
+    @pytest.mark.asyncio
+    async def test_profiler_collapsed_output(self):
+        """Тест семплирования стеков в формате collapsed"""
+        profiler = SamplingProfiler(interval=0.001)
+
+        async def busy():
+            await asyncio.sleep(0.02)
+            blocking_call(0.1)
+
+        task = asyncio.create_task(busy())
+        stacks = await profiler.profile(0.2)
+        await task
+
+        lines = [line.rsplit(" ", 1) for line in stacks.splitlines()]
+        assert all(int(count) > 0 for _, count in lines)
+        assert any("blocking_call" in stack for stack, _ in lines)
+
+    @pytest.mark.asyncio
+    async def test_profiler_single_run(self):
+        """Тест запрета параллельного профилирования"""
+        profiler = SamplingProfiler(interval=0.001)
+        first = asyncio.create_task(profiler.profile(0.05))
+        await asyncio.sleep(0)
+
+        with pytest.raises(RuntimeError):
+            await profiler.profile(0.05)
+        await first
+
+    @pytest.mark.asyncio
+    async def test_blocking_call_detected(self):
+        """Тест записи стека блокирующего вызова"""
+        monitor = LoopLagMonitor(threshold_ms=50, interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+
+        blocking_call(0.2)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        assert len(monitor.blocks) == 1
+        assert "blocking_call" in monitor.blocks[0].stack
+        assert monitor.blocks[0].duration >= 0.05
+        assert monitor.max_lag >= 0.1
+
+    @pytest.mark.asyncio
+    async def test_threshold_change_at_runtime(self):
+        """Тест включения и выключения контроля без перезапуска"""
+        monitor = LoopLagMonitor(threshold_ms=0, interval=0.01)
+        monitor.start()
+        assert not monitor.running
+
+        await monitor.set_threshold(100)
+        assert monitor.running
+
+        await monitor.set_threshold(0)
+        assert not monitor.running
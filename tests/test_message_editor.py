@@ -0,0 +1,123 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageText
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from src.bot.message_editor import MessageEditor
+from src.core.metrics import metrics
+
+
+def make_message(message_id: int = 1, bot_id: int = 1):
+    message = MagicMock()
+    message.bot.id = bot_id
+    message.chat.id = 100
+    message.message_id = message_id
+    message.text = None
+    message.edit_text = AsyncMock()
+    message.edit_reply_markup = AsyncMock()
+    return message
+
+
+def keyboard(*options):
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text=option, callback_data=f"inq_0_{option}") for option in options]]
+    )
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestMessageEditor:
+    """Тесты редактирования сообщений по разнице"""
+
+    @pytest.mark.asyncio
+    async def test_first_edit_sends_text(self):
+        """Тест первого редактирования полным текстом"""
+        editor = MessageEditor()
+        message = make_message()
+
+        await editor.edit(message, "Вопрос", reply_markup=keyboard("1", "2"))
+
+        message.edit_text.assert_awaited_once()
+        message.edit_reply_markup.assert_not_awaited()
+        assert metrics.get("telegram_edits_full") == 1
+
+    @pytest.mark.asyncio
+    async def test_markup_only_change(self):
+        """Тест отправки только клавиатуры, если текст не изменился"""
+        editor = MessageEditor()
+        message = make_message()
+
+        await editor.edit(message, "Длинный текст вопроса", reply_markup=keyboard("1", "2"))
+        await editor.edit(message, "Длинный текст вопроса", reply_markup=keyboard("2"))
+
+        assert message.edit_text.await_count == 1
+        message.edit_reply_markup.assert_awaited_once()
+        assert metrics.get("telegram_bytes_saved") == len("Длинный текст вопроса".encode())
+
+    @pytest.mark.asyncio
+    async def test_noop_edit_skipped(self):
+        """Тест пропуска редактирования без изменений"""
+        editor = MessageEditor()
+        message = make_message()
+
+        await editor.edit(message, "Вопрос", reply_markup=keyboard("1"))
+        await editor.edit(message, "Вопрос", reply_markup=keyboard("1"))
+
+        assert message.edit_text.await_count == 1
+        message.edit_reply_markup.assert_not_awaited()
+        assert metrics.get("telegram_calls_saved") == 1
+
+    @pytest.mark.asyncio
+    async def test_state_from_callback_message(self):
+        """Тест сравнения с содержимым сообщения из колбэка после перезапуска"""
+        editor = MessageEditor()
+        message = make_message()
+        message.text = "Вопрос"
+        message.html_text = "Вопрос"
+        message.reply_markup = keyboard("1", "2")
+
+        await editor.edit(message, "Вопрос", reply_markup=keyboard("2"))
+
+        message.edit_text.assert_not_awaited()
+        message.edit_reply_markup.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_not_modified_error_ignored(self):
+        """Тест обработки ошибки 'message is not modified'"""
+        editor = MessageEditor()
+        message = make_message()
+        message.edit_text.side_effect = TelegramBadRequest(
+            method=EditMessageText(text="Вопрос"), message="Bad Request: message is not modified"
+        )
+
+        await editor.edit(message, "Вопрос")
+
+        assert metrics.get("telegram_edits_not_modified") == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded(self):
+        """Тест ограничения размера кэша сообщений"""
+        editor = MessageEditor(max_messages=2)
+        for message_id in range(5):
+            await editor.edit(make_message(message_id), "Вопрос")
+
+        assert len(editor.sent) == 2
+
+    @pytest.mark.asyncio
+    async def test_same_message_id_in_other_bot(self):
+        """Сообщение другого бота с тем же номером в том же чате редактируется полностью"""
+        editor = MessageEditor()
+        await editor.edit(make_message(bot_id=1), "Вопрос")
+
+        other = make_message(bot_id=2)
+        await editor.edit(other, "Вопрос")
+
+        other.edit_text.assert_awaited_once()
+        assert metrics.get("telegram_edits_skipped") == 0
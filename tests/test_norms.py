@@ -0,0 +1,144 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config.const import TaskEntity
+from src.core import norms as norms_module
+from src.core.norms import PopulationNorms, rebuild_norms
+from src.database import operations
+from src.database.archive import pack_attempt
+from src.database.models import Base, User, UserAttempt, create_engine_for_url
+from src.database.operations import (
+    get_or_create_user,
+    increment_score_norms,
+    load_score_norms,
+    unit_of_work,
+    update_user,
+)
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path, monkeypatch):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(operations, "write_queue", None)
+    monkeypatch.setattr(operations, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(operations.replica_router, "primary_factory", factory)
+    yield factory
+    await engine.dispose()
+
+
+class TestPopulationNorms:
+    """Тесты норм выборки"""
+
+    def test_top_percent(self):
+        """Тест доли выборки с баллом не ниже заданного"""
+        population = PopulationNorms(min_population=4)
+        population.set_counts({"E": {10: 1, 12: 2, 20: 1}})
+
+        assert population.top_percent("E", 20) == 25
+        assert population.top_percent("E", 12) == 75
+        assert population.top_percent("E", 11) == 75
+        assert population.top_percent("E", 5) == 100
+        assert population.top_percent("E", 24) == 0
+        assert population.format_top("E", 20) == " (топ 25%)"
+        assert population.format_top("E", 24) == " (топ 1%)"
+
+    def test_small_population_hidden(self):
+        """Тест: при малой выборке процент не показывается"""
+        population = PopulationNorms(min_population=5)
+        population.add({"E": 10, "N": 3})
+
+        assert population.top_percent("E", 10) is None
+        assert population.format_top("E", 10) == ""
+        assert population.format_top("Аналитический", 50) == ""
+
+    @pytest.mark.asyncio
+    async def test_record_persists(self, session_factory):
+        """Тест: завершение учитывается в памяти и в БД"""
+        population = PopulationNorms(min_population=1)
+        await population.record({"Аналитический": 60, "E": 12, "temperament": "Флегматик"})
+        await population.record({"Аналитический": 60, "E": 15})
+
+        assert population.top_percent("E", 15) == 50
+        assert await load_score_norms() == {"Аналитический": {60: 2}, "E": {12: 1, 15: 1}}
+
+    @pytest.mark.asyncio
+    async def test_record_error_keeps_completion(self, session_factory, monkeypatch):
+        """Тест: сбой записи нормы в единице работы не мешает COMMIT завершения"""
+        population = PopulationNorms(min_population=1)
+        # metric NOT NULL: INSERT нормы падает в БД
+        monkeypatch.setattr(norms_module, "norm_values", lambda scores: {None: 12})
+
+        # SQLite, в отличие от Postgres, не прерывает транзакцию после ошибки оператора: проверяем и SAVEPOINT
+        statements = []
+        event.listen(
+            session_factory.kw["bind"].sync_engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+
+        async with unit_of_work():
+            await get_or_create_user(user_id=1)
+            await update_user(user_id=1, test_completed=True)
+            await population.record({"E": 12})
+
+        async with session_factory() as session:
+            assert (await session.execute(User.__table__.select())).one().test_completed is True
+        assert await load_score_norms() == {}
+        assert any(statement.startswith("ROLLBACK TO SAVEPOINT") for statement in statements)
+
+    @pytest.mark.asyncio
+    async def test_rebuild_from_attempts(self, session_factory, monkeypatch):
+        """Тест пересчета по архиву и завершенным строкам users"""
+        monkeypatch.setattr(TaskEntity.inq.value, "questions", TaskEntity.inq.value._get_default_inq_questions())
+        monkeypatch.setattr(TaskEntity.epi.value, "questions", TaskEntity.epi.value._get_default_epi_questions())
+        monkeypatch.setattr(norms_module, "norms", PopulationNorms(min_population=1))
+        inq_answers = {"inq": {"question_1": {"4": 5, "1": 4, "2": 3, "3": 2, "5": 1}}}
+        async with session_factory() as session:
+            session.add(UserAttempt(user_id=1, payload=pack_attempt(inq_answers, {}, {}, {})))
+            session.add(UserAttempt(user_id=2, payload=pack_attempt({}, {}, {}, {})))
+            session.add(User(user_id=3, test_completed=True, answers_json=inq_answers))
+            session.add(User(user_id=4, test_completed=False, answers_json=inq_answers))
+            await session.commit()
+
+        assert await rebuild_norms(batch_size=1) == 3
+
+        stored = await load_score_norms()
+        assert stored["Аналитический"] == {5: 2, 0: 1}
+        assert stored["E"] == {0: 3}
+        assert norms_module.norms.top_percent("Аналитический", 5) == pytest.approx(200 / 3)
+
+    @pytest.mark.asyncio
+    async def test_rebuild_keeps_concurrent_completions(self, session_factory, monkeypatch):
+        """Тест: завершение во время пересчета не теряется, расхождение сохраненных норм исправляется"""
+        monkeypatch.setattr(TaskEntity.inq.value, "questions", TaskEntity.inq.value._get_default_inq_questions())
+        monkeypatch.setattr(TaskEntity.epi.value, "questions", TaskEntity.epi.value._get_default_epi_questions())
+        monkeypatch.setattr(norms_module, "norms", PopulationNorms(min_population=1))
+        async with session_factory() as session:
+            session.add(UserAttempt(user_id=1, payload=pack_attempt({}, {}, {}, {})))
+            await session.commit()
+        # Лишний инкремент до пересчета: сохраненные нормы разошлись с архивом
+        await increment_score_norms({"E": 5})
+
+        iter_completed_answers = norms_module.iter_completed_answers
+
+        async def iter_with_completion(session, batch_size):
+            async for batch in iter_completed_answers(session, batch_size):
+                yield batch
+                # Завершение в другом процессе: строка и инкремент зафиксированы после снимка
+                async with session_factory() as other:
+                    other.add(User(user_id=2, test_completed=True, answers_json={}))
+                    await other.commit()
+                await increment_score_norms({"E": 0})
+
+        monkeypatch.setattr(norms_module, "iter_completed_answers", iter_with_completion)
+
+        assert await rebuild_norms() == 1
+
+        assert (await load_score_norms())["E"] == {0: 2}
+        assert norms_module.norms.totals["E"] == 2
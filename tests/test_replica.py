@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.metrics import metrics
+from src.database.models import Base, User, create_engine_for_url
+from src.database.replica import ReplicaRouter
+
+UPDATED_AT = datetime(2024, 1, 1, 12, 0, 0)
+
+
+async def create_database(path) -> async_sessionmaker:
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(User(user_id=1, username="user", updated_at=UPDATED_AT))
+        await session.commit()
+    return factory
+
+
+async def set_updated_at(factory: async_sessionmaker, value: datetime):
+    async with factory() as session:
+        await session.execute(update(User).values(updated_at=value))
+        await session.commit()
+
+
+@pytest_asyncio.fixture
+async def databases(tmp_path):
+    primary = await create_database(tmp_path / "primary.db")
+    replica = await create_database(tmp_path / "replica.db")
+    yield primary, replica
+    await primary.kw["bind"].dispose()
+    await replica.kw["bind"].dispose()
+
+
+class TestReplicaRouter:
+    """Тесты маршрутизации чтений на реплику"""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_without_replica_reads_primary(self, databases):
+        """Тест: без реплики все чтения идут в основную БД"""
+        primary, _ = databases
+        router = ReplicaRouter(primary)
+
+        assert await router.session_factory() is primary
+
+    @pytest.mark.asyncio
+    async def test_fresh_replica_is_used(self, databases):
+        """Тест: реплика без отставания получает чтения"""
+        primary, replica = databases
+        router = ReplicaRouter(primary, replica.kw["bind"], max_lag=5)
+
+        assert await router.session_factory() is router.replica_factory
+        assert router.lag == 0
+        assert metrics.get("replica_reads") == 1
+
+    @pytest.mark.asyncio
+    async def test_lagging_replica_falls_back(self, databases):
+        """Тест: при отставании больше порога чтения уходят в основную БД, пока реплика не догонит"""
+        primary, replica = databases
+        router = ReplicaRouter(primary, replica.kw["bind"], max_lag=5, check_interval=0)
+        await set_updated_at(primary, UPDATED_AT + timedelta(seconds=30))
+
+        assert await router.session_factory() is primary
+        assert router.lag == 30
+        assert metrics.get("replica_fallback", reason="lag") == 1
+        # Запрос с большим допустимым отставанием все равно читает реплику
+        assert await router.session_factory(max_lag=60) is router.replica_factory
+
+        await set_updated_at(replica, UPDATED_AT + timedelta(seconds=30))
+        assert await router.session_factory() is router.replica_factory
+
+    @pytest.mark.asyncio
+    async def test_lag_checked_once_per_interval(self, databases):
+        """Тест: отставание проверяется не чаще раза в check_interval"""
+        primary, replica = databases
+        router = ReplicaRouter(primary, replica.kw["bind"], max_lag=5, check_interval=60)
+
+        assert await router.session_factory() is router.replica_factory
+        await set_updated_at(primary, UPDATED_AT + timedelta(seconds=30))
+        assert await router.session_factory() is router.replica_factory
+
+    @pytest.mark.asyncio
+    async def test_unavailable_replica_falls_back(self, databases, tmp_path):
+        """Тест: ошибка проверки реплики переключает чтения на основную БД"""
+        primary, _ = databases
+        broken = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+        router = ReplicaRouter(primary, broken)
+
+        assert await router.session_factory() is primary
+        assert router.lag is None
+        assert metrics.get("replica_fallback", reason="error") == 1
+        await broken.dispose()
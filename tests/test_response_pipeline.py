@@ -0,0 +1,80 @@
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.bot.response_pipeline import ResponsePipeline
+
+ROUND_TRIP = 0.05
+
+
+def make_callback(answer_error: Exception = None):
+    calls = []
+
+    async def answer(text=None, show_alert=False):
+        calls.append("answer")
+        await asyncio.sleep(ROUND_TRIP)
+        if answer_error:
+            raise answer_error
+
+    callback = MagicMock()
+    callback.id = "1"
+    callback.answer = answer
+    return callback, calls
+
+
+async def round_trip(calls, name, error: Exception = None):
+    calls.append(name)
+    await asyncio.sleep(ROUND_TRIP)
+    if error:
+        raise error
+
+
+class TestResponsePipeline:
+    """Тесты параллельного ответа на колбэк"""
+
+    @pytest.mark.asyncio
+    async def test_answer_and_edit_run_concurrently(self):
+        """Тест: ответ на колбэк уходит первым, редактирование идет параллельно"""
+        pipeline = ResponsePipeline()
+        callback, calls = make_callback()
+
+        started = time.perf_counter()
+        await pipeline.respond(callback, "✅", round_trip(calls, "edit"), round_trip(calls, "write"))
+        elapsed = time.perf_counter() - started
+
+        assert calls == ["answer", "edit", "write"]
+        assert elapsed < ROUND_TRIP * 1.8
+        assert not pipeline.tasks
+
+    @pytest.mark.asyncio
+    async def test_work_error_propagates(self):
+        """Тест проброса ошибки редактирования или записи в хендлер"""
+        pipeline = ResponsePipeline()
+        callback, calls = make_callback()
+
+        with pytest.raises(RuntimeError):
+            await pipeline.respond(callback, None, round_trip(calls, "edit", RuntimeError("ошибка")))
+
+    @pytest.mark.asyncio
+    async def test_answer_error_does_not_cancel_work(self):
+        """Тест: ошибка ответа на колбэк не отменяет редактирование"""
+        pipeline = ResponsePipeline()
+        callback, calls = make_callback(answer_error=RuntimeError("query is too old"))
+
+        await pipeline.respond(callback, None, round_trip(calls, "edit"))
+
+        assert "edit" in calls
+
+    @pytest.mark.asyncio
+    async def test_in_flight_is_bounded(self):
+        """Тест ограничения числа одновременных ответов"""
+        pipeline = ResponsePipeline(max_in_flight=2)
+        callbacks = [make_callback()[0] for _ in range(4)]
+
+        started = time.perf_counter()
+        await asyncio.gather(*(pipeline.respond(callback) for callback in callbacks))
+        elapsed = time.perf_counter() - started
+
+        assert elapsed >= ROUND_TRIP * 2
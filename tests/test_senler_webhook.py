@@ -0,0 +1,220 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+import pytest_asyncio
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.bot.instances import BotInstance
+from src.bot.outbound import OutboundSender
+from src.core.metrics import metrics
+from src.core.task_manager import TaskManager
+from src.database import operations
+from src.database.models import Base, User, create_engine_for_url
+from src.webapp.app import create_webapp
+from src.webapp.senler import StartBatcher
+
+TOKEN = "senler-secret"
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path, monkeypatch):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(operations, "write_queue", None)
+    monkeypatch.setattr(operations, "AsyncSessionLocal", factory)
+    metrics.reset()
+    yield factory
+    await engine.dispose()
+
+
+class FakeSender:
+    """Очередь исходящих без Telegram: запоминает поставленные сообщения"""
+
+    def __init__(self, max_queue: int = 1000):
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.messages = []
+
+    def submit(self, bot, chat_id, text, reply_markup=None) -> bool:
+        self.queue.put_nowait(chat_id)
+        self.messages.append((bot.id, chat_id, text))
+        return True
+
+
+def bot_instance(name: str = "default", bot_id: int = 1) -> BotInstance:
+    return BotInstance(name=name, bot=SimpleNamespace(id=bot_id), admin_user_id=0, task_manager=TaskManager())
+
+
+@pytest_asyncio.fixture
+async def webhook(session_factory):
+    sender = FakeSender()
+    batcher = StartBatcher(sender, flush_interval=0.01, batch_size=100)
+    app = create_webapp({1: bot_instance(), 2: bot_instance("second", 2)}, senler_token=TOKEN, senler_batcher=batcher)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client, batcher, sender
+    await batcher.stop()
+
+
+async def user_ids(factory) -> list:
+    async with factory() as session:
+        return sorted(user.user_id for user in (await session.execute(User.__table__.select())).all())
+
+
+class TestSenlerStartWebhook:
+    """Тесты приема стартов из Senler"""
+
+    @pytest.mark.asyncio
+    async def test_start_creates_user_and_queues_message(self, session_factory, webhook):
+        """Старт подтверждается сразу, затем пользователь записывается и получает первое сообщение"""
+        client, batcher, sender = webhook
+
+        response = await client.post("/senler/start", json={"user_id": 7, "username": "seven", "token": TOKEN})
+
+        assert response.status_code == 202
+        assert response.json() == {"ok": True, "duplicate": False}
+        await batcher.stop()
+        assert await user_ids(session_factory) == [7]
+        assert [message[:2] for message in sender.messages] == [(1, 7)]
+
+    @pytest.mark.asyncio
+    async def test_bad_token_and_unknown_bot(self, session_factory, webhook):
+        """Чужой токен - 401, неизвестный бот - 404, в очередь ничего не попадает"""
+        client, batcher, sender = webhook
+
+        assert (await client.post("/senler/start", json={"user_id": 7, "token": "wrong"})).status_code == 401
+        response = await client.post("/senler/start", json={"user_id": 7, "token": TOKEN, "bot": "missing"})
+        assert response.status_code == 404
+
+        await batcher.stop()
+        assert await user_ids(session_factory) == []
+        assert sender.messages == []
+
+    @pytest.mark.asyncio
+    async def test_duplicate_delivery_sends_once(self, session_factory, webhook):
+        """Повтор доставки того же старта не дает второго сообщения; другой бот - отдельный старт"""
+        client, batcher, sender = webhook
+
+        first = await client.post("/senler/start", json={"user_id": 7, "token": TOKEN})
+        second = await client.post("/senler/start", json={"user_id": 7, "token": TOKEN})
+        other_bot = await client.post("/senler/start", json={"user_id": 7, "token": TOKEN, "bot": "second"})
+
+        assert first.json()["duplicate"] is False
+        assert second.status_code == 202 and second.json()["duplicate"] is True
+        assert other_bot.json()["duplicate"] is False
+        await batcher.stop()
+        assert [message[:2] for message in sender.messages] == [(1, 7), (2, 7)]
+        assert await user_ids(session_factory) == [7]
+
+    @pytest.mark.asyncio
+    async def test_burst_written_in_batches(self, session_factory, webhook, monkeypatch):
+        """Пачка стартов записывается одним upsert на batch_size пользователей"""
+        client, batcher, sender = webhook
+        upsert = AsyncMock(wraps=operations.upsert_users)
+        monkeypatch.setattr("src.webapp.senler.upsert_users", upsert)
+
+        await asyncio.gather(
+            *(client.post("/senler/start", json={"user_id": user_id, "token": TOKEN}) for user_id in range(250))
+        )
+        await batcher.stop()
+
+        assert upsert.await_count == 3
+        assert len(await user_ids(session_factory)) == 250
+        assert len(sender.messages) == 250
+
+    @pytest.mark.asyncio
+    async def test_stop_waits_for_running_timed_flush(self, session_factory, monkeypatch):
+        """stop() дожидается записи, начатой таймером, и ее сообщений"""
+        started = asyncio.Event()
+
+        async def slow_upsert(users):
+            started.set()
+            await asyncio.sleep(0.05)
+
+        monkeypatch.setattr("src.webapp.senler.upsert_users", slow_upsert)
+        sender = FakeSender()
+        batcher = StartBatcher(sender, flush_interval=0)
+        batcher.add(bot_instance(), 7, None)
+        await started.wait()
+
+        await batcher.stop()
+
+        assert [message[:2] for message in sender.messages] == [(1, 7)]
+
+    @pytest.mark.asyncio
+    async def test_overloaded_returns_503(self, session_factory):
+        """Заполненная очередь - 503 с Retry-After, старт не запоминается как принятый"""
+        batcher = StartBatcher(FakeSender(), flush_interval=10, max_pending=1)
+        app = create_webapp({1: bot_instance()}, senler_token=TOKEN, senler_batcher=batcher)
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            assert (await client.post("/senler/start", json={"user_id": 1, "token": TOKEN})).status_code == 202
+            response = await client.post("/senler/start", json={"user_id": 2, "token": TOKEN})
+        await batcher.stop()
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+        assert ("default", 2) not in batcher.seen
+
+    @pytest.mark.asyncio
+    async def test_disabled_without_token(self):
+        """Без SENLER_WEBHOOK_TOKEN эндпоинта нет"""
+        app = create_webapp({1: bot_instance()}, senler_token="")
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            assert (await client.post("/senler/start", json={"user_id": 1, "token": ""})).status_code == 404
+
+
+class TestOutboundSender:
+    """Тесты очереди исходящих сообщений"""
+
+    @pytest.mark.asyncio
+    async def test_rate_and_queue_limit(self):
+        """Отправка не чаще rate в секунду на бота, сверх max_queue сообщения отклоняются"""
+        metrics.reset()
+        bot = SimpleNamespace(id=1, send_message=AsyncMock())
+        sender = OutboundSender(rate=50, workers=4, max_queue=5)
+        results = [sender.submit(bot, chat_id, "hi") for chat_id in range(6)]
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        sender.start()
+        assert await sender.drain(5) == 0
+        await sender.stop()
+
+        assert results == [True] * 5 + [False]
+        assert bot.send_message.await_count == 5
+        assert loop.time() - started >= 4 / 50
+        assert metrics.get("outbound_sent") == 5
+        assert metrics.get("outbound_rejected") == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_after_and_blocked(self):
+        """RetryAfter - повтор после паузы, заблокировавший бота пользователь пропускается"""
+        metrics.reset()
+        method = SimpleNamespace()
+        bot = SimpleNamespace(
+            id=1,
+            send_message=AsyncMock(
+                side_effect=[
+                    TelegramRetryAfter(method, "Flood control", 0),
+                    None,
+                    TelegramForbiddenError(method, "blocked"),
+                ]
+            ),
+        )
+        sender = OutboundSender(rate=0, workers=1)
+        sender.submit(bot, 1, "hi")
+        sender.submit(bot, 2, "hi")
+
+        sender.start()
+        await sender.drain(5)
+        await sender.stop()
+
+        assert bot.send_message.await_count == 3
+        assert metrics.get("outbound_sent") == 1
+        assert metrics.get("outbound_retry_after") == 1
+        assert metrics.get("outbound_blocked") == 1
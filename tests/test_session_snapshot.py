@@ -0,0 +1,131 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from config.const import TaskSection, TaskType
+from src.core.drain import InFlightTracker
+from src.core.session_snapshot import dump_sessions, load_sessions, pack_sessions, unpack_sessions
+from src.core.task_manager import TIMER_EVICT, TaskManager
+
+
+def inq_state() -> dict:
+    return {
+        "current_task_type": TaskType.inq.value,
+        "current_question": 1,
+        "current_step": 2,
+        "answers": {
+            TaskSection.priorities.value: {
+                "personal_wellbeing": 4,
+                "material_career": 3,
+                "relationships": 2,
+                "self_realization": 1,
+            },
+            TaskSection.inq.value: {
+                "question_1": {"1": 5, "2": 4, "3": 3, "4": 2, "5": 1},
+                "question_2": {"3": 5, "1": 4},
+            },
+        },
+        "history": [{"task": TaskType.inq.value, "question": 1, "step": 1, "option": "1", "score": 4}],
+    }
+
+
+class TestSessionSnapshot:
+    """Тесты снимка активных сессий при остановке и загрузки при старте"""
+
+    def test_pack_roundtrip(self):
+        """Состояние, включая нестандартные ответы, восстанавливается без изменений"""
+        manager = TaskManager()
+        manager.active_tasks[1] = inq_state()
+        manager.active_tasks[2] = {**inq_state(), "answers": {"custom": {"x": 1}}}
+
+        snapshot = unpack_sessions(pack_sessions({"default": manager}, saved_at=100.0))
+
+        assert snapshot["saved_at"] == 100.0
+        sessions = snapshot["bots"]["default"]
+        assert sessions[1]["state"] == inq_state()
+        assert sessions[2]["state"]["answers"] == {"custom": {"x": 1}}
+
+    def test_dump_and_load(self, tmp_path, monkeypatch):
+        """Сессии переходят в новый процесс со своими таймерами, файл снимка удаляется"""
+        monkeypatch.setattr("src.core.task_manager.SESSION_IDLE_TTL", 1800)
+        path = str(tmp_path / "sessions.snapshot")
+        first, second = TaskManager(), TaskManager()
+        first.active_tasks[1] = inq_state()
+        first.touch_session(1, elapsed=100)
+        second.active_tasks[2] = inq_state()
+        second.touch_session(2, elapsed=1790)
+
+        assert dump_sessions(path, {"a": first, "b": second}) == 2
+
+        restarted = {"a": TaskManager(), "b": TaskManager()}
+        assert load_sessions(path, restarted, max_age=600) == 2
+        assert not os.path.exists(path)
+        assert restarted["a"].active_tasks[1] == inq_state()
+        assert restarted["a"].timers.remaining((1, TIMER_EVICT)) == pytest.approx(1700, abs=2)
+        assert restarted["b"].timers.remaining((2, TIMER_EVICT)) == pytest.approx(10, abs=2)
+
+    def test_idle_and_stale_sessions_skipped(self, tmp_path, monkeypatch):
+        """Сессии, простоявшие дольше SESSION_IDLE_TTL, и старый снимок не загружаются"""
+        monkeypatch.setattr("src.core.task_manager.SESSION_IDLE_TTL", 1800)
+        path = str(tmp_path / "sessions.snapshot")
+        manager = TaskManager()
+        manager.active_tasks[1] = inq_state()
+
+        with open(path, "wb") as f:
+            f.write(pack_sessions({"default": manager}, saved_at=time.time() - 1900))
+        restarted = TaskManager()
+        assert load_sessions(path, {"default": restarted}, max_age=3600) == 0
+        assert restarted.active_tasks == {}
+
+        with open(path, "wb") as f:
+            f.write(pack_sessions({"default": manager}, saved_at=time.time() - 700))
+        assert load_sessions(path, {"default": restarted}, max_age=600) == 0
+        assert not os.path.exists(path)
+
+    def test_corrupted_snapshot_ignored(self, tmp_path):
+        """Поврежденный снимок не мешает старту"""
+        path = tmp_path / "sessions.snapshot"
+        path.write_bytes(b"garbage")
+        assert load_sessions(str(path), {"default": TaskManager()}, max_age=600) == 0
+        assert not path.exists()
+
+
+class TestInFlightTracker:
+    """Тесты ожидания начатых обработчиков при остановке"""
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_for_handlers(self):
+        """drain дожидается обработчика, завершившегося до дедлайна"""
+        tracker = InFlightTracker()
+        finished = []
+
+        async def handler():
+            with tracker.track():
+                await asyncio.sleep(0.05)
+                finished.append(True)
+
+        task = asyncio.create_task(handler())
+        await asyncio.sleep(0)
+
+        assert len(tracker) == 1
+        assert await tracker.drain(timeout=1) == 0
+        assert finished and len(tracker) == 0
+        await task
+
+    @pytest.mark.asyncio
+    async def test_drain_deadline(self):
+        """Обработчик дольше дедлайна не задерживает остановку"""
+        tracker = InFlightTracker()
+
+        async def handler():
+            with tracker.track():
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(handler())
+        await asyncio.sleep(0)
+
+        assert await tracker.drain(timeout=0.05) == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database.models import Base, User, create_engine_for_url
+from src.database.writer import WriteQueue
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class TestSQLiteProfile:
+    """Тесты профиля SQLite и очереди единственного писателя"""
+
+    @pytest.mark.asyncio
+    async def test_pragmas(self, engine):
+        """Тест настроек соединения SQLite"""
+        async with engine.connect() as conn:
+            journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+            busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+
+        assert journal_mode == "wal"
+        assert synchronous == 1  # NORMAL
+        assert busy_timeout > 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_are_batched(self, session_factory):
+        """Тест пакетной записи конкурентных операций одним писателем"""
+        queue = WriteQueue(session_factory, batch_size=50)
+
+        def insert(user_id):
+            async def write(session):
+                session.add(User(user_id=user_id))
+                return user_id
+
+            return write
+
+        results = await asyncio.gather(*(queue.submit(insert(i)) for i in range(200)))
+        await queue.stop()
+
+        assert results == list(range(200))
+        assert queue.writes == 200
+        assert queue.batches < 200
+
+        async with session_factory() as session:
+            count = len((await session.execute(select(User.user_id))).all())
+        assert count == 200
+
+    @pytest.mark.asyncio
+    async def test_failed_write_is_isolated(self, session_factory):
+        """Тест изоляции ошибки одной операции в пачке"""
+        queue = WriteQueue(session_factory)
+
+        async def good(session):
+            session.add(User(user_id=1))
+            await session.flush()
+
+        async def bad(session):
+            session.add(User(user_id=1))
+            await session.flush()
+
+        results = await asyncio.gather(queue.submit(good), queue.submit(bad), return_exceptions=True)
+        await queue.stop()
+
+        assert results[0] is None
+        assert isinstance(results[1], Exception)
+
+        async with session_factory() as session:
+            users = (await session.execute(select(User))).scalars().all()
+        assert [user.user_id for user in users] == [1]
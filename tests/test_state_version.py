@@ -0,0 +1,103 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config.const import TaskSection
+from src.core.metrics import metrics
+from src.core.task_manager import StateConflict, TaskManager
+from src.database import operations
+from src.database.models import Base, create_engine_for_url
+from src.database.operations import get_or_create_user, get_user_fresh
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path, monkeypatch):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(operations, "write_queue", None)
+    monkeypatch.setattr(operations, "AsyncSessionLocal", factory)
+    metrics.reset()
+    yield factory
+    await engine.dispose()
+
+
+def priorities(user) -> dict:
+    return user.load_answers().get(TaskSection.priorities.value, {})
+
+
+class TestVersionedState:
+    """Тесты записи состояния с проверкой state_version"""
+
+    @pytest.mark.asyncio
+    async def test_workers_share_user(self, session_factory):
+        """Воркеры по очереди обслуживают пользователя: устаревший кэш перечитывается без конфликтов"""
+        first, second = TaskManager(state_mode="versioned"), TaskManager(state_mode="versioned")
+
+        assert await first.start_tasks(await get_or_create_user(1))
+        ok, _ = await second.process_priorities_answer(await get_or_create_user(1), "material_career", 3)
+        assert ok
+        ok, _ = await first.process_priorities_answer(await get_or_create_user(1), "personal_wellbeing", 4)
+        assert ok
+
+        user = await get_user_fresh(1)
+        assert user.state_version == 3
+        assert priorities(user) == {"material_career": 3, "personal_wellbeing": 4}
+        assert metrics.get("state_cache_stale") == 1
+        assert metrics.get("state_conflicts") == 0
+
+    @pytest.mark.asyncio
+    async def test_conflict_rereads_and_retries(self, session_factory):
+        """Одновременная запись другого воркера: CAS не проходит, операция повторяется на свежем состоянии"""
+        first, second = TaskManager(state_mode="versioned"), TaskManager(state_mode="versioned")
+        assert await first.start_tasks(await get_or_create_user(1))
+
+        # Строка прочитана первым воркером до записи второго
+        stale_user = await get_or_create_user(1)
+        ok, _ = await second.process_priorities_answer(await get_or_create_user(1), "material_career", 3)
+        assert ok
+
+        ok, _ = await first.process_priorities_answer(stale_user, "personal_wellbeing", 4)
+        assert ok
+
+        user = await get_user_fresh(1)
+        assert user.state_version == 3
+        assert priorities(user) == {"material_career": 3, "personal_wellbeing": 4}
+        assert first.get_task_state(1)["state_version"] == 3
+        assert metrics.get("state_conflicts") == 1
+        assert metrics.get("state_conflict_retries") == 1
+
+    @pytest.mark.asyncio
+    async def test_conflict_retries_exhausted(self, session_factory, monkeypatch):
+        """После STATE_CONFLICT_RETRIES повторов конфликт выходит наружу и учитывается"""
+        manager = TaskManager(state_mode="versioned", conflict_retries=2)
+        assert await manager.start_tasks(await get_or_create_user(1))
+        monkeypatch.setattr("src.core.task_manager.compare_and_set_user", AsyncMock(return_value=False))
+
+        with pytest.raises(StateConflict):
+            await manager.process_priorities_answer(await get_or_create_user(1), "material_career", 3)
+
+        assert metrics.get("state_conflicts") == 3
+        assert metrics.get("state_conflict_retries") == 2
+        assert metrics.get("state_conflict_failures") == 1
+
+    @pytest.mark.asyncio
+    async def test_memory_mode_does_not_version(self, session_factory):
+        """В режиме memory версия не проверяется и не меняется"""
+        manager = TaskManager(state_mode="memory")
+        assert await manager.start_tasks(await get_or_create_user(1))
+        ok, _ = await manager.process_priorities_answer(await get_or_create_user(1), "material_career", 3)
+        assert ok
+
+        user = await get_user_fresh(1)
+        assert user.state_version == 0
+        assert "state_version" not in manager.get_task_state(1)
+
+    def test_versioned_requires_direct_writes(self):
+        """Лог ответов применяет записи позже и несовместим с проверкой версии"""
+        with pytest.raises(ValueError):
+            TaskManager(answer_log=MagicMock(), state_mode="versioned")
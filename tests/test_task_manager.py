@@ -159,3 +159,27 @@ class TestTaskManager:
         answers = task_manager.active_tasks[mock_user.user_id]["answers"]
         assert answers[TaskSection.epi.value]["1"] == "Да"
         assert task_manager.active_tasks[mock_user.user_id]["current_question"] == 1
+
+    @pytest.mark.asyncio
+    async def test_deferred_writes(self, task_manager, mock_user):
+        """Тест отложенной записи состояния: память меняется сразу, БД - в flush_writes"""
+        import src.core.task_manager
+
+        src.core.task_manager.update_user = AsyncMock()
+
+        task_manager.active_tasks[mock_user.user_id] = {
+            "current_task_type": TaskType.epi.value,
+            "current_question": 0,
+            "answers": {},
+        }
+
+        with task_manager.defer_writes() as writes:
+            success, _ = await task_manager.process_epi_answer(mock_user, "Да")
+
+        assert success is True
+        assert task_manager.active_tasks[mock_user.user_id]["current_question"] == 1
+        src.core.task_manager.update_user.assert_not_awaited()
+        assert len(writes) == 1
+
+        await task_manager.flush_writes(writes)
+        src.core.task_manager.update_user.assert_awaited_once()
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from config.const import MESSAGES
+from src.bot.middlewares import ThrottlingMiddleware
+from src.core.metrics import metrics
+from src.core.throttle import FloodThrottle
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestFloodThrottle:
+    """Тесты ограничения частоты обновлений"""
+
+    def setup_method(self):
+        metrics.reset()
+        MESSAGES.setdefault("throttled", "throttled")
+
+    def test_burst_then_rate(self):
+        """Тест: запас burst сразу, дальше - rate в секунду"""
+        clock = Clock()
+        throttle = FloodThrottle(rate=2, burst=3, clock=clock)
+
+        assert [throttle.check(1) for _ in range(4)] == [None, None, None, "user"]
+        clock.now += 0.5
+        assert throttle.check(1) is None
+        assert throttle.check(1) == "user"
+        assert metrics.get("throttle_rejected", reason="user") == 2
+        assert metrics.get("throttle_allowed") == 4
+
+    def test_users_are_independent(self):
+        """Тест: флуд одного пользователя не ограничивает другого"""
+        throttle = FloodThrottle(rate=1, burst=2, clock=Clock())
+
+        for _ in range(10):
+            throttle.check(1)
+        assert throttle.check(2) is None
+
+    def test_idle_buckets_expire(self):
+        """Тест: корзины, простоявшие burst / rate секунд, удаляются из таблицы"""
+        clock = Clock()
+        throttle = FloodThrottle(rate=1, burst=5, clock=clock)
+        throttle.check(1)
+        clock.now += 3
+        throttle.check(2)
+
+        clock.now += 2.5
+        throttle.check(3)
+
+        assert list(throttle.buckets) == [2, 3]
+        assert metrics.get("throttle_tracked_users") == 2
+
+    def test_table_size_limited(self):
+        """Тест: таблица не растет больше max_users"""
+        throttle = FloodThrottle(rate=1, burst=5, max_users=100, clock=Clock())
+        for user_id in range(1000):
+            throttle.check(user_id)
+        assert len(throttle.buckets) == 100
+
+    def test_global_limit(self):
+        """Тест: общий предел процесса; отказ по личному лимиту его не расходует"""
+        clock = Clock()
+        throttle = FloodThrottle(rate=1, burst=1, global_rate=2, clock=clock)
+
+        assert throttle.check(1) is None
+        assert throttle.check(1) == "user"
+        assert throttle.check(2) is None
+        assert throttle.check(3) == "global"
+        assert metrics.get("throttle_rejected", reason="global") == 1
+
+    @pytest.mark.asyncio
+    async def test_middleware_rejects_before_handler(self):
+        """Тест: лишний колбэк получает короткий ответ, хендлер и БД не вызываются"""
+        middleware = ThrottlingMiddleware(FloodThrottle(rate=1, burst=1, clock=Clock()))
+        handler = AsyncMock(return_value="handled")
+        event = MagicMock()
+        event.callback_query.answer = AsyncMock()
+        data = {"event_from_user": SimpleNamespace(id=1)}
+
+        assert await middleware(handler, event, data) == "handled"
+        assert await middleware(handler, event, data) is None
+
+        handler.assert_awaited_once()
+        event.callback_query.answer.assert_awaited_once_with(MESSAGES["throttled"])
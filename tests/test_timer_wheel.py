@@ -0,0 +1,248 @@
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.timer_wheel import TimerWheel
+from src.core.task_manager import TaskManager, TIMER_EVICT, TIMER_ABANDON, TIMER_REMINDER
+from src.database import operations
+from src.database.models import Base, User, create_engine_for_url
+from config.const import TaskType, TaskEntity
+
+
+def fired_keys(timers):
+    return [timer.key for timer in timers]
+
+
+class TestTimerWheel:
+    """Тесты иерархического колеса таймеров"""
+
+    def test_fires_on_time(self):
+        """Тест срабатывания таймера на нужном тике"""
+        wheel = TimerWheel(tick=1, slots=4, levels=3)
+        wheel.schedule("a", 3, Mock())
+
+        assert fired_keys(wheel.advance(2)) == []
+        assert fired_keys(wheel.advance(1)) == ["a"]
+        assert len(wheel) == 0
+
+    def test_cascade_from_upper_levels(self):
+        """Тест переноса таймеров с верхних уровней"""
+        wheel = TimerWheel(tick=1, slots=4, levels=3)
+        for delay in (5, 17, 40):
+            wheel.schedule(delay, delay, Mock())
+
+        fired = {}
+        for tick in range(1, 41):
+            for key in fired_keys(wheel.advance()):
+                fired[key] = tick
+
+        assert fired == {5: 5, 17: 17, 40: 40}
+
+    def test_beyond_horizon(self):
+        """Тест таймера дальше горизонта колеса"""
+        wheel = TimerWheel(tick=1, slots=4, levels=2)
+        wheel.schedule("far", 50, Mock())
+
+        fired = []
+        for tick in range(1, 51):
+            if fired_keys(wheel.advance()):
+                fired.append(tick)
+
+        assert fired == [50]
+
+    def test_reschedule_and_cancel(self):
+        """Тест перевзвода и отмены таймера по ключу"""
+        wheel = TimerWheel(tick=1, slots=4, levels=3)
+        wheel.schedule("a", 2, Mock())
+        wheel.advance(1)
+        wheel.schedule("a", 10, Mock())
+
+        assert fired_keys(wheel.advance(5)) == []
+        assert "a" in wheel
+
+        assert wheel.cancel("a") is True
+        assert wheel.cancel("a") is False
+        assert fired_keys(wheel.advance(10)) == []
+
+    @pytest.mark.asyncio
+    async def test_fire_calls_callbacks(self):
+        """Тест вызова синхронных и асинхронных обработчиков"""
+        wheel = TimerWheel(tick=1, slots=4, levels=2)
+        sync_callback = Mock()
+        async_callback = AsyncMock()
+        wheel.schedule("sync", 1, sync_callback)
+        wheel.schedule("async", 1, async_callback)
+
+        await wheel.fire(wheel.advance())
+
+        sync_callback.assert_called_once_with("sync")
+        async_callback.assert_awaited_once_with("async")
+
+
+class TestSessionTimers:
+    """Тесты таймеров сессий в TaskManager"""
+
+    @pytest.fixture
+    def task_manager(self, mocker):
+        mocker.patch("src.core.task_manager.update_user", AsyncMock())
+        mocker.patch("src.core.task_manager.archive_attempt", AsyncMock())
+        mocker.patch("src.core.task_manager.mark_session_abandoned", AsyncMock(return_value=True))
+        manager = TaskManager()
+        manager.reminder_callback = AsyncMock()
+        return manager
+
+    @pytest.mark.asyncio
+    async def test_answer_rearms_timers(self, task_manager, mocker):
+        """Тест перевзвода таймеров при ответе"""
+        mocker.patch("src.core.task_manager.SESSION_REMINDER_AFTER", 60)
+        user = User(user_id=12345)
+        task_manager.active_tasks[user.user_id] = {
+            "current_task_type": TaskType.epi.value,
+            "current_question": 0,
+            "answers": {},
+        }
+
+        await task_manager.process_epi_answer(user, "Да")
+
+        assert (user.user_id, TIMER_REMINDER) in task_manager.timers
+        assert (user.user_id, TIMER_EVICT) in task_manager.timers
+        assert (user.user_id, TIMER_ABANDON) in task_manager.timers
+
+    @pytest.mark.asyncio
+    async def test_idle_eviction_and_restore(self, task_manager):
+        """Тест выгрузки неактивной сессии и восстановления из строки БД"""
+        task_manager.active_tasks[12345] = {"current_task_type": TaskType.epi.value}
+        task_manager.touch_session(12345, elapsed=task_manager.timers.tick * 10**9)
+
+        await task_manager.timers.fire(task_manager.timers.advance())
+        assert 12345 not in task_manager.active_tasks
+
+        user = User(
+            user_id=12345,
+            test_completed=False,
+            current_task_type=TaskType.epi.value,
+            current_question=4,
+            current_step=0,
+            answers_json={"epi": {"1": "Да", "2": "Да", "3": "Нет", "4": "Да"}},
+        )
+        success, _ = await task_manager.process_epi_answer(user, "Нет")
+
+        assert success is True
+        assert task_manager.active_tasks[12345]["answers"]["epi"]["5"] == "Нет"
+
+    @pytest.mark.asyncio
+    async def test_abandon_marks_user(self, task_manager):
+        """Тест пометки брошенного теста"""
+        import src.core.task_manager
+
+        task_manager.active_tasks[12345] = {"current_task_type": TaskType.inq.value}
+
+        await task_manager._on_abandon((12345, TIMER_ABANDON))
+
+        assert 12345 not in task_manager.active_tasks
+        assert src.core.task_manager.mark_session_abandoned.await_args.args[0] == 12345
+
+    @pytest.mark.asyncio
+    async def test_complete_cancels_timers(self, task_manager, mocker):
+        """Тест отмены таймеров после завершения тестов"""
+        for entity in TaskEntity:
+            mocker.patch.object(entity.value, "calculate_scores", return_value={})
+        user = User(user_id=12345)
+        task_manager.active_tasks[user.user_id] = {"current_task_type": 4, "answers": {}}
+        task_manager.touch_session(user.user_id)
+
+        await task_manager.complete_all_tasks(user)
+
+        assert len(task_manager.timers) == 0
+
+
+    def test_restore_without_reminders(self, task_manager, mocker):
+        """Тест: при нескольких ботах восстанавливаются таймеры без напоминаний"""
+        mocker.patch("src.core.task_manager.SESSION_REMINDER_AFTER", 60)
+
+        task_manager.touch_session(12345, elapsed=10, reminder=False)
+
+        assert (12345, TIMER_REMINDER) not in task_manager.timers
+        assert (12345, TIMER_ABANDON) in task_manager.timers
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path, monkeypatch):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(operations, "write_queue", None)
+    monkeypatch.setattr(operations, "AsyncSessionLocal", factory)
+    yield factory
+    await engine.dispose()
+
+
+async def add_session(factory, user_id: int, idle_seconds: int, completed: bool = False):
+    async with factory() as session:
+        session.add(User(user_id=user_id, test_completed=completed))
+        await session.flush()
+        await session.execute(
+            update(User)
+            .where(User.user_id == user_id)
+            .values(updated_at=func.datetime("now", f"-{idle_seconds} seconds"))
+        )
+        await session.commit()
+
+
+class TestSessionQueries:
+    """Тесты выборки сессий для восстановления таймеров: время считается на стороне БД"""
+
+    @pytest.mark.asyncio
+    async def test_in_progress_sessions_idle_seconds(self, session_factory):
+        """Тест: незавершенные сессии в окне и их простой в секундах"""
+        await add_session(session_factory, 1, idle_seconds=100)
+        await add_session(session_factory, 2, idle_seconds=5000)
+        await add_session(session_factory, 3, idle_seconds=100, completed=True)
+
+        sessions = await operations.get_in_progress_sessions(3600)
+
+        assert [user_id for user_id, _ in sessions] == [1]
+        assert 99 <= sessions[0][1] <= 110
+
+    @pytest.mark.asyncio
+    async def test_mark_sessions_abandoned(self, session_factory):
+        """Тест: брошенными помечаются только незавершенные сессии старше порога"""
+        await add_session(session_factory, 1, idle_seconds=100)
+        await add_session(session_factory, 2, idle_seconds=5000)
+        await add_session(session_factory, 3, idle_seconds=5000, completed=True)
+
+        assert await operations.mark_sessions_abandoned(3600) == 1
+
+        async with session_factory() as session:
+            abandoned = (await session.execute(select(User.user_id).where(User.abandoned_at.is_not(None)))).all()
+        assert abandoned == [(2,)]
+
+    @pytest.mark.asyncio
+    async def test_stale_abandon_timer_skips_active_user(self, session_factory):
+        """Тест: таймер другого воркера не помечает брошенным пользователя, который продолжил тест"""
+        await add_session(session_factory, 1, idle_seconds=60)
+        await add_session(session_factory, 2, idle_seconds=5000)
+        await add_session(session_factory, 3, idle_seconds=5000, completed=True)
+
+        assert await operations.mark_session_abandoned(1, 3600) is False
+        assert await operations.mark_session_abandoned(2, 3600) is True
+        assert await operations.mark_session_abandoned(3, 3600) is False
+
+    @pytest.mark.asyncio
+    async def test_versioned_reminder_checks_row(self, session_factory, mocker):
+        """Тест: в versioned напоминание уходит, только если строка в БД простаивает"""
+        mocker.patch("src.core.task_manager.SESSION_REMINDER_AFTER", 600)
+        manager = TaskManager(state_mode="versioned")
+        manager.reminder_callback = AsyncMock()
+        await add_session(session_factory, 1, idle_seconds=60)
+        await add_session(session_factory, 2, idle_seconds=900)
+        await add_session(session_factory, 3, idle_seconds=900, completed=True)
+
+        for user_id in (1, 2, 3):
+            await manager._on_reminder((user_id, TIMER_REMINDER))
+
+        manager.reminder_callback.assert_awaited_once_with(2)
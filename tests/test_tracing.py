@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.core import tracing
+from src.core.tracing import JsonLinesExporter, Tracer, instrument_engine, traced
+from src.database.writer import WriteQueue
+
+
+class ListExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append([span.to_dict() for span in spans])
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = ListExporter()
+    monkeypatch.setattr(tracing, "tracer", Tracer(sample_rate=1.0, exporter=exporter))
+    return exporter
+
+
+class TestTracing:
+    """Тесты трассировки обновлений"""
+
+    @pytest.mark.asyncio
+    async def test_child_spans(self, exporter):
+        """Тест дерева спанов: обновление, хендлер, рендеринг и задачи пайплайна"""
+
+        @traced("render.test")
+        async def render():
+            await asyncio.sleep(0)
+
+        with tracing.tracer.trace("update", update_id=1) as root:
+            with tracing.tracer.span("handler"):
+                await asyncio.gather(render(), render())
+
+        spans = {span["name"]: span for span in exporter.traces[0]}
+        assert len(exporter.traces[0]) == 4
+        assert spans["update"]["parent_id"] is None
+        assert spans["handler"]["parent_id"] == root.span_id
+        assert spans["render.test"]["parent_id"] == spans["handler"]["span_id"]
+        assert {span["trace_id"] for span in exporter.traces[0]} == {root.trace.trace_id}
+
+    @pytest.mark.asyncio
+    async def test_db_spans(self, exporter):
+        """Тест спанов SQL запросов через события SQLAlchemy"""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        instrument_engine(engine)
+
+        with tracing.tracer.trace("update"):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        await engine.dispose()
+
+        db_spans = [span for span in exporter.traces[0] if span["name"] == "db.query"]
+        assert [span["attributes"]["statement"] for span in db_spans] == ["SELECT 1"]
+
+    @pytest.mark.asyncio
+    async def test_background_task_outside_trace(self, exporter):
+        """Тест: писатель, запущенный из трассы, работает вне ее и не дописывает в нее спаны"""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        writer = WriteQueue(async_sessionmaker(engine))
+
+        async def write(session):
+            return tracing.current_span.get()
+
+        with tracing.tracer.trace("update"):
+            assert await writer.submit(write) is None
+        await writer.stop()
+        await engine.dispose()
+
+        assert [span["name"] for span in exporter.traces[0]] == ["update"]
+
+    def test_error_recorded(self, exporter):
+        """Тест записи ошибки в спан"""
+        with pytest.raises(ValueError):
+            with tracing.tracer.trace("update"):
+                with tracing.tracer.span("handler"):
+                    raise ValueError("сбой")
+
+        assert all(span["error"] == "ValueError: сбой" for span in exporter.traces[0])
+
+    def test_head_sampling(self):
+        """Тест выборки трасс в начале обновления"""
+        exporter = ListExporter()
+        tracer = Tracer(sample_rate=0.0, exporter=exporter)
+
+        with tracer.trace("update") as root:
+            with tracer.span("handler") as span:
+                assert root is None and span is None
+        assert exporter.traces == []
+
+    def test_disabled_overhead(self):
+        """Тест: выключенная трассировка почти ничего не стоит"""
+        tracer = Tracer(sample_rate=0.0)
+
+        started = time.perf_counter()
+        for _ in range(100_000):
+            with tracer.span("handler"):
+                pass
+        per_span = (time.perf_counter() - started) / 100_000
+
+        assert per_span < 5e-6
+
+    def test_jsonl_exporter(self, tmp_path):
+        """Тест записи трасс в JSON-lines файл"""
+        path = tmp_path / "traces.jsonl"
+        tracer = Tracer(sample_rate=1.0, exporter=JsonLinesExporter(str(path)))
+
+        with tracer.trace("update"):
+            with tracer.span("handler"):
+                pass
+        tracer.close()
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["name"] for line in lines] == ["handler", "update"]
@@ -0,0 +1,197 @@
+from unittest.mock import Mock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.bot import complete
+from src.bot.middlewares import CommitBeforeRequestMiddleware
+from src.bot.response_pipeline import ResponsePipeline
+from src.core import task_manager as task_manager_module
+from src.core.invalidation import TOPIC_USER
+from src.core.task_manager import TaskManager
+from src.database import operations
+from src.database.models import Base, User, create_engine_for_url
+from src.database.operations import (
+    commit_unit_of_work,
+    get_or_create_user,
+    read_session,
+    unit_of_work,
+    update_user,
+)
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path, monkeypatch):
+    engine = create_engine_for_url(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # Путь единицы работы как в PostgreSQL: без очереди писателя
+    monkeypatch.setattr(operations, "write_queue", None)
+    monkeypatch.setattr(
+        operations, "AsyncSessionLocal", async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def counters(engine):
+    counters = {"checkouts": 0, "commits": 0}
+
+    @event.listens_for(engine.sync_engine.pool, "checkout")
+    def on_checkout(*args):
+        counters["checkouts"] += 1
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def on_commit(*args):
+        counters["commits"] += 1
+
+    return counters
+
+
+class TestUnitOfWork:
+    """Тесты единицы работы на одно обновление"""
+
+    @pytest.mark.asyncio
+    async def test_single_checkout_and_commit(self, engine, counters):
+        """Тест одного соединения и одного COMMIT на все обращения обновления"""
+        async with unit_of_work():
+            user = await get_or_create_user(user_id=1, username="test")
+            await update_user(user_id=1, current_question=1)
+            await update_user(user_id=1, current_question=2, test_completed=True)
+            refreshed = await get_or_create_user(user_id=1)
+
+        assert refreshed is user
+        assert counters == {"checkouts": 1, "commits": 1}
+
+        async with operations.AsyncSessionLocal() as session:
+            stored = (await session.execute(select(User).where(User.user_id == 1))).scalar_one()
+        assert stored.current_question == 2
+        assert stored.test_completed is True
+
+    @pytest.mark.asyncio
+    async def test_rollback_on_error(self, engine):
+        """Тест отката всех записей обновления при ошибке хендлера"""
+        with pytest.raises(RuntimeError):
+            async with unit_of_work():
+                await get_or_create_user(user_id=1)
+                raise RuntimeError("ошибка хендлера")
+
+        async with operations.AsyncSessionLocal() as session:
+            assert (await session.execute(select(User))).scalars().all() == []
+
+    @pytest.mark.asyncio
+    async def test_nested_unit_reuses_session(self, engine):
+        """Тест повторного входа в единицу работы"""
+        async with unit_of_work() as outer:
+            async with unit_of_work() as inner:
+                assert inner is outer
+
+
+async def stored_question(user_id: int = 1):
+    async with operations.AsyncSessionLocal() as session:
+        user = (await session.execute(select(User).where(User.user_id == user_id))).scalar_one_or_none()
+    return None if user is None else user.current_question
+
+
+class TestCommitBeforeTelegram:
+    """Тесты фиксации записей до запросов к Telegram"""
+
+    @pytest.mark.asyncio
+    async def test_request_middleware_commits(self, engine):
+        """Тест: запрос к Bot API уходит после COMMIT записей хендлера"""
+        seen = []
+
+        async def make_request(bot, method):
+            seen.append(await stored_question())
+
+        async with unit_of_work():
+            await get_or_create_user(user_id=1)
+            await update_user(user_id=1, current_question=3)
+            await CommitBeforeRequestMiddleware()(make_request, Mock(), Mock())
+            await update_user(user_id=1, current_question=4)
+
+        assert seen == [3]
+        assert await stored_question() == 4
+
+    @pytest.mark.asyncio
+    async def test_pipeline_commits_before_answer(self, engine):
+        """Тест: ответ на колбэк и параллельная работа начинаются после COMMIT"""
+        seen = []
+
+        async def answer(*args, **kwargs):
+            seen.append(await stored_question())
+
+        callback = Mock(id="1", answer=answer)
+        async with unit_of_work():
+            await get_or_create_user(user_id=1)
+            await update_user(user_id=1, current_question=3)
+            await ResponsePipeline().respond(callback, "✅")
+
+        assert seen == [3]
+
+    @pytest.mark.asyncio
+    async def test_admin_report_without_transaction(self, engine, monkeypatch):
+        """Тест: отчет администратору после COMMIT не открывает новую транзакцию на время отправки"""
+        in_transaction = []
+
+        async def send_to_admin(user, scores, **kwargs):
+            in_transaction.append(operations.current_session.get().in_transaction())
+
+        monkeypatch.setattr(complete.admin_reports, "send_to_admin", send_to_admin)
+        bot_instance = Mock(admin_user_id=1)
+
+        async with unit_of_work():
+            user = await get_or_create_user(user_id=1)
+            await update_user(user_id=1, test_completed=True)
+            await commit_unit_of_work()
+            await complete.report_to_admin(bot_instance, user, {})
+
+        assert in_transaction == [False]
+
+    @pytest.mark.asyncio
+    async def test_rollback_after_caught_db_error(self, engine):
+        """Тест: после перехваченной ошибки БД единица работы продолжает работать и фиксируется"""
+        async with unit_of_work():
+            user = await get_or_create_user(user_id=1)
+            try:
+                async with read_session() as session:
+                    await session.execute(text("SELECT * FROM missing_table"))
+            except Exception as e:
+                await TaskManager._abort_unit_of_work(e)
+
+            assert user.user_id == 1
+            await get_or_create_user(user_id=2)
+
+        async with operations.AsyncSessionLocal() as session:
+            assert sorted((await session.execute(select(User.user_id))).scalars().all()) == [2]
+
+
+class TestInvalidationAfterCommit:
+    """Тесты публикации инвалидаций только после COMMIT"""
+
+    @pytest.mark.asyncio
+    async def test_state_write_published_after_commit(self, engine, monkeypatch):
+        """Тест: инвалидация записи состояния уходит после COMMIT, откаченная запись не публикуется"""
+        publish = Mock()
+        monkeypatch.setattr(task_manager_module.invalidation_bus, "publish", publish)
+        # Тесты TaskManager подменяют update_user без восстановления
+        monkeypatch.setattr(task_manager_module, "update_user", update_user)
+        task_manager = TaskManager()
+
+        async with unit_of_work():
+            await get_or_create_user(user_id=1)
+            await task_manager._persist_state(1, [], {"current_question": 2})
+            assert publish.call_count == 0
+        publish.assert_called_once_with(TOPIC_USER, 1)
+
+        publish.reset_mock()
+        with pytest.raises(RuntimeError):
+            async with unit_of_work():
+                await task_manager._persist_state(1, [], {"current_question": 3})
+                raise RuntimeError("handler failed")
+        assert publish.call_count == 0
+        assert await stored_question() == 2
@@ -0,0 +1,165 @@
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+from urllib.parse import urlencode
+
+import pytest
+from fastapi.testclient import TestClient
+
+from config.const import INQ_STYLES, TaskEntity, TaskSection, TaskType
+from src.bot.instances import BotInstance
+from src.core.task_manager import TaskManager
+from src.database.models import User
+from src.webapp.app import create_webapp
+from src.webapp.auth import InitDataError, init_data_user, sign_init_data, validate_init_data
+
+BOT_TOKEN = "123456:TEST"
+
+
+def signed_init_data(user_id: int = 12345, token: str = BOT_TOKEN, auth_date: int = None) -> str:
+    fields = {
+        "auth_date": str(auth_date if auth_date is not None else int(time.time())),
+        "query_id": "AAH",
+        "user": json.dumps({"id": user_id, "username": "test_user"}),
+    }
+    return urlencode({**fields, "hash": sign_init_data(fields, token)})
+
+
+def inq_state() -> dict:
+    return {
+        "current_task_type": TaskType.inq.value,
+        "current_question": 0,
+        "current_step": 0,
+        "answers": {TaskSection.priorities.value: {"personal_wellbeing": 4}},
+        "history": [],
+    }
+
+
+def answer_set():
+    inq = [["1", "2", "3", "4", "5"] if num % 2 else ["5", "4", "3", "2", "1"] for num in range(18)]
+    epi = ["Да" if num % 3 else "Нет" for num in range(57)]
+    return inq, epi
+
+
+@pytest.fixture(autouse=True)
+def questions(monkeypatch):
+    mapping = dict(zip(["1", "2", "3", "4", "5"], INQ_STYLES))
+    monkeypatch.setattr(
+        TaskEntity.inq.value, "questions", [{"text": f"INQ {num}", "mapping": mapping} for num in range(18)]
+    )
+    monkeypatch.setattr(TaskEntity.epi.value, "questions", [{"text": f"EPI {num}"} for num in range(57)])
+
+
+class TestInitData:
+    """Тесты проверки подписи initData Mini App"""
+
+    def test_valid_init_data(self):
+        """Подписанные токеном бота initData принимаются и дают пользователя"""
+        fields = validate_init_data(signed_init_data(), BOT_TOKEN)
+        assert init_data_user(fields)["id"] == 12345
+
+    def test_tampered_or_foreign_init_data_rejected(self):
+        """Подпись другого бота или измененный пользователь отклоняются"""
+        with pytest.raises(InitDataError):
+            validate_init_data(signed_init_data(token="999:OTHER"), BOT_TOKEN)
+
+        tampered = signed_init_data().replace("12345", "54321")
+        with pytest.raises(InitDataError):
+            validate_init_data(tampered, BOT_TOKEN)
+
+    def test_expired_init_data_rejected(self):
+        """initData старше max_age отклоняются"""
+        init_data = signed_init_data(auth_date=int(time.time()) - 3600)
+        with pytest.raises(InitDataError):
+            validate_init_data(init_data, BOT_TOKEN, max_age=60)
+        assert validate_init_data(init_data, BOT_TOKEN, max_age=0)
+
+
+class TestSubmitAnswerSet:
+    """Тесты приема ответов INQ и EPI целиком"""
+
+    @pytest.mark.asyncio
+    async def test_answer_set_saved_with_one_write(self, monkeypatch):
+        """Ответы раскладываются как при ответах в боте и сохраняются одной записью"""
+        update_user = AsyncMock()
+        monkeypatch.setattr("src.core.task_manager.update_user", update_user)
+        manager = TaskManager()
+        user = Mock(spec=User, user_id=12345, abandoned_at=None)
+        manager.active_tasks[user.user_id] = inq_state()
+        inq, epi = answer_set()
+
+        success, _ = await manager.submit_answer_set(user, inq, epi)
+
+        assert success
+        update_user.assert_awaited_once()
+        state = manager.get_task_state(user.user_id)
+        assert state["current_task_type"] == TaskType.epi.value
+        assert state["answers"][TaskSection.inq.value]["question_2"] == {"1": 5, "2": 4, "3": 3, "4": 2, "5": 1}
+        assert state["answers"][TaskSection.epi.value]["1"] == "Нет"
+        assert len(state["answers"][TaskSection.epi.value]) == 57
+        scores = TaskEntity.inq.value.calculate_scores(state["answers"])
+        assert set(INQ_STYLES) <= set(scores)
+
+    @pytest.mark.asyncio
+    async def test_invalid_answer_set_rejected(self, monkeypatch):
+        """Неполные ответы и повтор варианта в вопросе INQ не меняют состояние"""
+        update_user = AsyncMock()
+        monkeypatch.setattr("src.core.task_manager.update_user", update_user)
+        manager = TaskManager()
+        user = Mock(spec=User, user_id=12345, abandoned_at=None)
+        manager.active_tasks[user.user_id] = inq_state()
+        inq, epi = answer_set()
+
+        assert not (await manager.submit_answer_set(user, inq[:-1], epi))[0]
+        assert not (await manager.submit_answer_set(user, [["1", "1", "2", "3", "4"]] + inq[1:], epi))[0]
+        assert not (await manager.submit_answer_set(user, inq, epi[:-1] + ["Может"]))[0]
+        update_user.assert_not_awaited()
+        assert manager.get_task_state(user.user_id)["current_task_type"] == TaskType.inq.value
+
+
+class TestWebAppEndpoint:
+    """Тесты эндпоинтов Mini App"""
+
+    @pytest.fixture
+    def setup(self, monkeypatch):
+        monkeypatch.setattr("src.core.task_manager.update_user", AsyncMock())
+        user = Mock(spec=User, user_id=12345, abandoned_at=None)
+        monkeypatch.setattr("src.webapp.app.get_or_create_user", AsyncMock(return_value=user))
+        send_results = AsyncMock(return_value=True)
+        monkeypatch.setattr("src.webapp.app.send_completed_results", send_results)
+
+        manager = TaskManager()
+        manager.active_tasks[user.user_id] = inq_state()
+        instance = BotInstance(
+            name="default", bot=SimpleNamespace(token=BOT_TOKEN), admin_user_id=0, task_manager=manager
+        )
+        return TestClient(create_webapp({1: instance})), send_results
+
+    def test_questions_and_page(self, setup):
+        """Страница и вопросы отдаются без авторизации"""
+        client, _ = setup
+        assert client.get("/webapp").status_code == 200
+        data = client.get("/webapp/questions").json()
+        assert len(data["inq"]) == 18 and len(data["epi"]) == 57
+
+    def test_submit_completes_tests(self, setup):
+        """Один подписанный запрос завершает тесты 2 и 3"""
+        client, send_results = setup
+        inq, epi = answer_set()
+
+        response = client.post("/webapp/submit", json={"init_data": signed_init_data(), "inq": inq, "epi": epi})
+
+        assert response.status_code == 200
+        send_results.assert_awaited_once()
+
+    def test_submit_rejects_bad_signature_and_answers(self, setup):
+        """Чужая подпись - 401, неверные ответы - 422, тесты не завершаются"""
+        client, send_results = setup
+        inq, epi = answer_set()
+
+        foreign = signed_init_data(token="999:OTHER")
+        assert client.post("/webapp/submit", json={"init_data": foreign, "inq": inq, "epi": epi}).status_code == 401
+        response = client.post("/webapp/submit", json={"init_data": signed_init_data(), "inq": inq, "epi": epi[:5]})
+        assert response.status_code == 422
+        send_results.assert_not_awaited()